@@ -0,0 +1,29 @@
+"""
+gunicorn 配置 (启动命令通过 -c gunicorn.conf.py 指定)
+
+preload_app: master 进程先加载 Django 应用和 URL 配置 (视图、序列化器等模块) 再 fork worker,
+worker 直接共享已导入的模块, 部署重启和扩容时每个 worker 不需要各自导入一遍,
+第一个请求也不需要等待 URL 配置加载。
+
+监听地址和 worker 数量使用 gunicorn 的默认规则: 读取 PORT 和 WEB_CONCURRENCY 环境变量。
+"""
+
+worker_class = 'uvicorn_worker.UvicornWorker'
+preload_app = True
+
+
+def when_ready(server):
+    # preload_app 时在 master 中执行, 视图模块在第一个请求时才导入, 这里提前加载
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # 在 fork 之前关闭加载过程中打开的数据库连接, worker 不会继承 master 的连接
+    connections.close_all()
+
+
+def pre_fork(server, worker):
+    # worker 重启时 master 也会 fork, 再确认一次没有打开的连接
+    from django.db import connections
+
+    connections.close_all()
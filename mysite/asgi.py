@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+# ASGI 下同步 ORM 调用分散在多个线程中, 持久连接会按线程累积且不会在请求结束时关闭,
+# Web 进程默认每次请求后关闭连接 (Celery Worker 仍使用 settings 中的持久连接)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -24,6 +24,18 @@ app.conf.beat_schedule = {
         'task': 'twitter_monitor.tasks.monitor_all_users_task',
         'schedule': crontab(minute='*/30'),  # 每30分钟执行一次
     },
+    'resume-backfills-hourly': {
+        'task': 'twitter_monitor.tasks.resume_backfills_task',
+        'schedule': crontab(minute=15),  # 每小时检查一次中断的回填
+    },
+    'deliver-notifications-every-minute': {
+        'task': 'twitter_monitor.tasks.deliver_notifications_task',
+        'schedule': crontab(),  # 每分钟兜底投递一次 Webhook 通知
+    },
+    'flush-api-usage-every-5-minutes': {
+        'task': 'twitter_monitor.tasks.flush_api_usage_task',
+        'schedule': crontab(minute='*/5'),  # 每5分钟写入一次 API 用量
+    },
     'cleanup-old-data-daily': {
         'task': 'twitter_monitor.tasks.cleanup_old_data_task',
         'schedule': crontab(hour=3, minute=0),  # 每天凌晨3点执行
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from kombu import Queue
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -76,6 +77,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'twitter_monitor.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
@@ -113,8 +115,22 @@ if os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('PGDATABASE'):
             'PASSWORD': os.environ.get("PGPASSWORD"),
             'HOST': os.environ.get("PGHOST"),
             'PORT': os.environ.get("PGPORT"),
+            # 持久连接, 每个 Celery Worker 进程复用一个连接; ASGI Web 进程默认为 0 (见 mysite/asgi.py)
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
+    
+    # 只读副本: PG_REPLICA_HOSTS=host1:5432,host2:5432 (库名、用户、密码与主库相同)
+    for index, replica in enumerate(filter(None, os.environ.get('PG_REPLICA_HOSTS', '').split(',')), start=1):
+        host, _, port = replica.strip().partition(':')
+        DATABASES[f'replica{index}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'CONN_MAX_AGE': int(os.environ.get('DB_REPLICA_CONN_MAX_AGE', DATABASES['default']['CONN_MAX_AGE'])),
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
     # 开发环境 - SQLite
     DATABASES = {
@@ -124,6 +140,14 @@ else:
         }
     }
 
+# 读写分离: Web/API 的只读请求从副本读取, 写请求、Celery 任务和管理命令使用主库
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['twitter_monitor.db_router.ReplicaRouter']
+# 写请求之后固定读取主库的秒数 (应大于副本的复制延迟)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '15'))
+# async 视图并发查询的线程池大小 (twitter_monitor.async_db), 每个 Web 进程最多多出这么多个数据库连接
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', '4'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -163,6 +187,62 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# 媒体缓存配置（推文媒体和头像的副本）
+MEDIA_CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', os.path.join(BASE_DIR, "media_cache"))
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+MEDIA_CACHE_WORKERS = int(os.environ.get('MEDIA_CACHE_WORKERS', '8'))
+# 媒体缓存的公开访问地址 (CDN 或公开读的存储桶, 对应 media_cache 存储的根目录);
+# 未设置时由 Web 进程的 /media-cache/<文件名> 从存储中读取返回
+MEDIA_CACHE_PUBLIC_URL = os.environ.get('MEDIA_CACHE_PUBLIC_URL', '').rstrip('/')
+
+# 冷存储（清理任务归档的过期推文、回复和日志）
+# 配置了 OBJECT_STORAGE_BUCKET 时写入存储桶的 archive/ 目录，否则写入 ARCHIVE_DIR
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(BASE_DIR, "archive"))
+
+# 文件存储: Web 与 Worker 是不同的服务时 (各自的容器磁盘不共享, 重启后丢失),
+# 设置 OBJECT_STORAGE_BUCKET 使用 S3 兼容的对象存储 (django-storages), 两边读写同一个存储桶;
+# 未设置时使用本地目录, 只适用于单机部署或 Web 与 Worker 挂载了同一个持久卷
+OBJECT_STORAGE_BUCKET = os.environ.get('OBJECT_STORAGE_BUCKET', '')
+
+
+def _object_storage(location):
+    return {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': OBJECT_STORAGE_BUCKET,
+            'location': location,
+            'endpoint_url': os.environ.get('OBJECT_STORAGE_ENDPOINT') or None,
+            'region_name': os.environ.get('OBJECT_STORAGE_REGION') or None,
+            'access_key': os.environ.get('OBJECT_STORAGE_ACCESS_KEY') or None,
+            'secret_key': os.environ.get('OBJECT_STORAGE_SECRET_KEY') or None,
+            # 文件名是内容哈希或带随机串, 同名即同内容
+            'file_overwrite': True,
+        },
+    }
+
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'media_cache': (
+        _object_storage('media_cache') if OBJECT_STORAGE_BUCKET
+        else {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': MEDIA_CACHE_DIR}}
+    ),
+    'archive': (
+        _object_storage('archive') if OBJECT_STORAGE_BUCKET
+        else {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': ARCHIVE_DIR}}
+    ),
+}
+# 归档后会删除数据库中的行，只有归档存储是持久的、Web 进程也能读取时才执行；
+# 使用本地目录时需要确认它是 Web 与 Worker 共享的持久卷，并设置 ARCHIVE_DURABLE=1
+ARCHIVE_DURABLE = bool(OBJECT_STORAGE_BUCKET) or os.environ.get('ARCHIVE_DURABLE', '') == '1'
+
+
+# Prometheus 指标配置
+# 设置后 /metrics 需要携带 Authorization: Bearer <METRICS_TOKEN>
+# Celery worker 的指标端口由 CELERY_METRICS_PORT 指定, 多进程部署需设置 PROMETHEUS_MULTIPROC_DIR
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -176,6 +256,63 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Celery 队列：交互请求、定时监控、通知投递和维护任务使用独立队列和 Worker，
+# "立即监控"不会排在批量监控或回填后面，Webhook 重试也不会占用交互 Worker
+# 启动方式见 Procfile 和 deploy/railway/；不加 -Q 启动的 Worker 会消费全部队列
+CELERY_TASK_QUEUES = (
+    Queue('interactive'),
+    Queue('periodic'),
+    Queue('notifications'),
+    Queue('maintenance'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_ROUTES = {
+    'twitter_monitor.tasks.monitor_single_user_task': {'queue': 'interactive'},
+    'twitter_monitor.tasks.monitor_all_users_task': {'queue': 'periodic'},
+    'twitter_monitor.tasks.backfill_user_task': {'queue': 'maintenance'},
+    'twitter_monitor.tasks.resume_backfills_task': {'queue': 'maintenance'},
+    'twitter_monitor.tasks.cache_media_task': {'queue': 'maintenance'},
+    'twitter_monitor.tasks.deliver_notifications_task': {'queue': 'notifications'},
+    'twitter_monitor.tasks.flush_api_usage_task': {'queue': 'maintenance'},
+    'twitter_monitor.tasks.cleanup_old_data_task': {'queue': 'maintenance'},
+}
+# 每个 Worker 进程只预取一个任务，避免长任务后面压着已预取的短任务
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# 缓存配置：有 Redis 时使用 Redis（Web 与 Worker 进程共享），否则使用本地内存
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 实时推送 (Redis Stream) 保留的事件数，断线重连时最多补发这么多条
+LIVE_STREAM_MAXLEN = int(os.environ.get('LIVE_STREAM_MAXLEN', '10000'))
+
+# 热门推文排行：速度的半衰期（小时）、参与排行的推文最长发布时间（小时）、排行保留的条目数
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '6'))
+TRENDING_MAX_AGE_HOURS = int(os.environ.get('TRENDING_MAX_AGE_HOURS', '48'))
+TRENDING_MAX_SIZE = int(os.environ.get('TRENDING_MAX_SIZE', '5000'))
+
+# Webhook 通知配置
+# 新事件入队后等待的秒数，窗口内的事件合并为一批投递
+NOTIFY_BATCH_SECONDS = int(os.environ.get('NOTIFY_BATCH_SECONDS', '5'))
+# 并发投递的线程数
+NOTIFY_WORKERS = int(os.environ.get('NOTIFY_WORKERS', '4'))
+# 单次请求超时（秒）
+NOTIFY_TIMEOUT = int(os.environ.get('NOTIFY_TIMEOUT', '10'))
+# 失败多少次后移入投递失败列表
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '6'))
+
 # Twitter API 配置
 TWITTER_BEARER_TOKEN = os.environ.get('TWITTER_BEARER_TOKEN', '')
 TWITTER_API_KEY = os.environ.get('TWITTER_API_KEY', '')
@@ -183,6 +320,28 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET', '')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN', '')
 TWITTER_ACCESS_SECRET = os.environ.get('TWITTER_ACCESS_SECRET', '')
 
+# API 配额配置
+# 每月推文读取上限（Basic 级别 10,000），设为 0 表示不限制
+TWITTER_MONTHLY_TWEET_CAP = int(os.environ.get('TWITTER_MONTHLY_TWEET_CAP', '10000'))
+# 计费周期开始日（每月几号）
+TWITTER_BILLING_CYCLE_DAY = int(os.environ.get('TWITTER_BILLING_CYCLE_DAY', '1'))
+# 定时监控的基础间隔（分钟），额度消耗超速时按比例拉长
+TWITTER_POLL_INTERVAL_MINUTES = int(os.environ.get('TWITTER_POLL_INTERVAL_MINUTES', '30'))
+
+# 监控任务锁的租约时长（秒），持有期间自动续约，进程崩溃后最多这么久释放
+MONITOR_LOCK_TTL = int(os.environ.get('MONITOR_LOCK_TTL', '300'))
+
+# 每个进程到 Twitter API 的 keep-alive 连接池大小
+TWITTER_HTTP_POOL_SIZE = int(os.environ.get('TWITTER_HTTP_POOL_SIZE', '10'))
+
+# 历史回填配置
+# 为常规监控保留的时间线接口请求数，剩余额度低于此值时回填暂停到窗口重置
+TWITTER_BACKFILL_RESERVE = int(os.environ.get('TWITTER_BACKFILL_RESERVE', '5'))
+# 每次回填任务最多抓取的页数，之后重新排队，让出 Worker 给实时监控
+TWITTER_BACKFILL_PAGES_PER_RUN = int(os.environ.get('TWITTER_BACKFILL_PAGES_PER_RUN', '5'))
+# 临时错误 (网络、5xx) 时按指数退避重试的最多次数，超过后标记为失败；404/401/403 直接失败
+TWITTER_BACKFILL_MAX_ATTEMPTS = int(os.environ.get('TWITTER_BACKFILL_MAX_ATTEMPTS', '8'))
+
 # REST Framework 配置
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
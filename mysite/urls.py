@@ -20,5 +20,6 @@ from twitter_monitor import web_views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('twitter/', include('twitter_monitor.urls')),
+    path('metrics', web_views.metrics_endpoint, name='metrics'),  # Prometheus 指标
     path('', web_views.dashboard, name='home'),  # 首页直接显示管理界面
 ]
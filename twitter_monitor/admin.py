@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import MonitoredUser, Tweet, Reply, MonitorLog
+from .models import (
+    MonitoredUser, Tweet, Reply, MonitorLog, UserBackfill,
+    ReferencedTweet, Media, MediaCacheFile, TwitterAccount, ApiUsage,
+    Webhook, DeadLetterNotification, AlertRule, RuleMatch,
+    TweetEntity, EntityDailyCount, TweetFingerprint, ArchiveSegment
+)
 
 
 @admin.register(MonitoredUser)
@@ -41,7 +46,7 @@ class TweetAdmin(admin.ModelAdmin):
     list_display = ['tweet_preview', 'author', 'tweet_type', 'created_at', 'stats_summary', 'has_media']
     list_filter = ['tweet_type', 'has_media', 'created_at', 'author']
     search_fields = ['text', 'tweet_id', 'author__username']
-    readonly_fields = ['tweet_id', 'author', 'created_at', 'fetched_at', 'updated_at']
+    readonly_fields = ['tweet_id', 'author', 'original', 'created_at', 'fetched_at', 'updated_at']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -52,7 +57,7 @@ class TweetAdmin(admin.ModelAdmin):
             'fields': ('retweet_count', 'reply_count', 'like_count', 'quote_count')
         }),
         ('引用信息', {
-            'fields': ('referenced_tweet_id', 'retweeted_tweet_id'),
+            'fields': ('referenced_tweet_id', 'retweeted_tweet_id', 'original'),
             'classes': ('collapse',)
         }),
         ('媒体信息', {
@@ -77,12 +82,49 @@ class TweetAdmin(admin.ModelAdmin):
     stats_summary.short_description = '统计'
 
 
+@admin.register(TwitterAccount)
+class TwitterAccountAdmin(admin.ModelAdmin):
+    list_display = ['username', 'display_name', 'user_id', 'updated_at']
+    search_fields = ['username', 'display_name', 'user_id']
+    readonly_fields = ['user_id', 'created_at', 'updated_at']
+
+
+@admin.register(ReferencedTweet)
+class ReferencedTweetAdmin(admin.ModelAdmin):
+    list_display = ['tweet_preview', 'author_username', 'created_at', 'like_count', 'retweet_count']
+    search_fields = ['text', 'tweet_id', 'author_username']
+    readonly_fields = ['tweet_id', 'author_user_id', 'fetched_at', 'updated_at']
+    
+    def tweet_preview(self, obj):
+        return obj.text[:100] + '...' if len(obj.text) > 100 else obj.text
+    tweet_preview.short_description = '推文内容'
+
+
+@admin.register(Media)
+class MediaAdmin(admin.ModelAdmin):
+    list_display = ['media_key', 'media_type', 'tweet', 'width', 'height', 'cache_name', 'cache_failed']
+    list_filter = ['media_type', 'cache_failed']
+    search_fields = ['media_key', 'tweet__tweet_id']
+    readonly_fields = ['media_key', 'tweet', 'cache_name', 'created_at']
+
+
+@admin.register(MediaCacheFile)
+class MediaCacheFileAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size_bytes', 'last_used_at', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['name', 'size_bytes', 'last_used_at', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Reply)
 class ReplyAdmin(admin.ModelAdmin):
-    list_display = ['reply_preview', 'author', 'tweet_preview', 'created_at', 'like_count']
+    list_display = ['reply_preview', 'account', 'tweet_preview', 'created_at', 'like_count']
     list_filter = ['created_at', 'author']
-    search_fields = ['text', 'reply_id', 'author__username']
-    readonly_fields = ['reply_id', 'tweet', 'author', 'created_at', 'fetched_at', 'updated_at']
+    search_fields = ['text', 'reply_id', 'account__username']
+    list_select_related = ['account', 'tweet']
+    readonly_fields = ['reply_id', 'tweet', 'author', 'account', 'created_at', 'fetched_at', 'updated_at']
     date_hierarchy = 'created_at'
     
     def reply_preview(self, obj):
@@ -96,10 +138,14 @@ class ReplyAdmin(admin.ModelAdmin):
 
 @admin.register(MonitorLog)
 class MonitorLogAdmin(admin.ModelAdmin):
-    list_display = ['user', 'status', 'tweets_fetched', 'replies_fetched', 'created_at']
+    list_display = ['user', 'status', 'tweets_fetched', 'replies_fetched', 'duration_ms', 'api_calls', 'created_at']
     list_filter = ['status', 'created_at', 'user']
     search_fields = ['user__username', 'error_message']
-    readonly_fields = ['user', 'status', 'tweets_fetched', 'replies_fetched', 'error_message', 'created_at']
+    readonly_fields = [
+        'user', 'status', 'tweets_fetched', 'replies_fetched', 'error_message',
+        'duration_ms', 'fetch_tweets_ms', 'fetch_replies_ms', 'db_write_ms',
+        'rate_limit_wait_ms', 'api_calls', 'bytes_received', 'created_at',
+    ]
     date_hierarchy = 'created_at'
     
     def has_add_permission(self, request):
@@ -107,3 +153,145 @@ class MonitorLogAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(UserBackfill)
+class UserBackfillAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'pages_fetched', 'tweets_fetched', 'attempts', 'updated_at', 'completed_at']
+    list_filter = ['status']
+    search_fields = ['user__username']
+    readonly_fields = ['pagination_token', 'until_id', 'pages_fetched', 'tweets_fetched', 'attempts', 'next_attempt_at', 'created_at', 'updated_at', 'completed_at']
+
+
+@admin.register(ApiUsage)
+class ApiUsageAdmin(admin.ModelAdmin):
+    list_display = ['date', 'endpoint', 'requests', 'tweets', 'rate_limited']
+    list_filter = ['endpoint', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = ['date', 'endpoint', 'requests', 'tweets', 'rate_limited']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Webhook)
+class WebhookAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'include_replies', 'is_active', 'pending_count', 'created_at']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name', 'url']
+    filter_horizontal = ['users']
+    
+    def pending_count(self, obj):
+        return obj.notifications.count()
+    pending_count.short_description = '待投递'
+    
+    def save_related(self, request, form, formsets, change):
+        # 监控用户 (多对多) 在这里保存, 之后再清除路由缓存
+        super().save_related(request, form, formsets, change)
+        from . import notifications
+        notifications.invalidate_routes()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        from . import notifications
+        notifications.invalidate_routes()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        from . import notifications
+        notifications.invalidate_routes()
+
+
+@admin.register(DeadLetterNotification)
+class DeadLetterNotificationAdmin(admin.ModelAdmin):
+    list_display = ['webhook', 'event_count', 'attempts', 'error_preview', 'created_at']
+    list_filter = ['webhook', 'created_at']
+    list_select_related = ['webhook']
+    readonly_fields = ['webhook', 'events', 'attempts', 'error', 'created_at']
+    actions = ['requeue']
+    
+    def event_count(self, obj):
+        return len(obj.events)
+    event_count.short_description = '事件数'
+    
+    def error_preview(self, obj):
+        return obj.error[:80] + '...' if len(obj.error) > 80 else obj.error
+    error_preview.short_description = '错误信息'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='重新投递选中的通知')
+    def requeue(self, request, queryset):
+        from . import notifications
+        count = notifications.requeue(queryset)
+        self.message_user(request, f'已重新入队 {count} 条事件')
+
+
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'tweet_types', 'is_active', 'match_count', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'keywords', 'regex']
+    filter_horizontal = ['users']
+    readonly_fields = ['created_at', 'updated_at']
+    
+    def match_count(self, obj):
+        return obj.matches.count()
+    match_count.short_description = '命中数'
+
+
+@admin.register(RuleMatch)
+class RuleMatchAdmin(admin.ModelAdmin):
+    list_display = ['rule', 'tweet', 'reply', 'matched', 'created_at']
+    list_filter = ['rule']
+    list_select_related = ['rule', 'tweet', 'reply']
+    raw_id_fields = ['tweet', 'reply']
+    readonly_fields = ['rule', 'tweet', 'reply', 'matched', 'created_at']
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TweetEntity)
+class TweetEntityAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'value', 'tweet', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['value']
+    raw_id_fields = ['tweet']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(EntityDailyCount)
+class EntityDailyCountAdmin(admin.ModelAdmin):
+    list_display = ['date', 'kind', 'value', 'count']
+    list_filter = ['kind', 'date']
+    search_fields = ['value']
+    ordering = ['-date', '-count']
+
+
+@admin.register(TweetFingerprint)
+class TweetFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['tweet', 'cluster', 'simhash']
+    list_select_related = ['tweet__author']
+    raw_id_fields = ['tweet']
+    search_fields = ['tweet__tweet_id']
+    readonly_fields = ['tweet', 'simhash', 'band0', 'band1', 'band2', 'band3', 'cluster']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ArchiveSegment)
+class ArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'month', 'author_id', 'rows', 'size_bytes', 'min_created_at', 'max_created_at', 'created_at']
+    list_filter = ['kind', 'month']
+    search_fields = ['path']
+    readonly_fields = [
+        'kind', 'month', 'author_id', 'path', 'rows', 'size_bytes', 'checksum', 'min_created_at', 'max_created_at',
+        'created_at',
+    ]
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,278 @@
+"""
+推文互动分析
+
+按列取出推文数据 (发布时间在数据库中转为 Unix 秒数, 推文类型转为整数编码), 用 NumPy
+向量化计算, 不创建模型实例, 也不逐条推文循环:
+- 发布时间热力图: 星期 × 小时 (按指定时区)
+- 点赞/转发数的滚动中位数和 p90
+- 互动率: 每条推文的平均互动数 (点赞 + 转发 + 回复 + 引用), 没有曝光量和粉丝数时以此衡量
+- 推文类型构成
+
+结果按参数缓存 ANALYTICS_CACHE_SECONDS 秒, 同一页面反复刷新不会重复查询。
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import BigIntegerField, Case, Func, IntegerField, Value, When
+
+from .models import Tweet
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_CACHE_SECONDS = 60
+DAY_SECONDS = 86400
+# 1970-01-01 是星期四, 换算为星期一为 0 的编号
+EPOCH_WEEKDAY = 3
+# 推文类型的整数编码, 不在列表中的类型计为 other
+TWEET_TYPES = [tweet_type for tweet_type, _ in Tweet.TWEET_TYPE_CHOICES]
+
+
+class EpochSeconds(Func):
+    """
+    时间转为 Unix 秒数 (向下取整), 在数据库中完成, 不需要逐行构造 datetime 对象
+
+    必须向下取整, 否则 59.6 秒会被算进下一个小时/下一天。
+    """
+    template = 'CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s)) AS BIGINT)'
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite 以 UTC 文本保存时间, strftime('%s') 直接截取整秒 (模板和参数替换各转义一次 %);
+        # 不用儒略日换算: 儒略日是浮点数, 整秒可能算成略小于整数 (例如 ...599.99998) 而落到上一秒
+        return self.as_sql(
+            compiler, connection,
+            template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)",
+            **extra_context,
+        )
+
+
+def _columns(user, start, end):
+    """
+    按列取出窗口内的推文数据 (不排序)
+
+    推文类型在 SQL 中编码为整数, 所有列都是整数, 游标结果一次转换为二维数组,
+    跳过 ORM 逐行的类型转换。
+
+    Returns:
+        dict: 列名 -> NumPy 数组, 没有推文时返回 None
+    """
+    queryset = (
+        Tweet.objects
+        .filter(author=user, created_at__gte=start, created_at__lt=end)
+        .annotate(
+            type_code=Case(
+                *[When(tweet_type=tweet_type, then=Value(code)) for code, tweet_type in enumerate(TWEET_TYPES)],
+                default=Value(len(TWEET_TYPES)),
+                output_field=IntegerField(),
+            ),
+            ts=EpochSeconds('created_at'),
+        )
+        .order_by()
+        # SELECT 中注解列排在模型字段之后, 按注解顺序与生成的 SQL 列顺序保持一致
+        .values_list('like_count', 'retweet_count', 'reply_count', 'quote_count', 'type_code', 'ts')
+    )
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+    likes, retweets, replies, quotes, types, ts = np.array(rows, dtype=np.int64).T
+    return {
+        'likes': likes,
+        'retweets': retweets,
+        'replies': replies,
+        'quotes': quotes,
+        'types': types,
+        'ts': ts,
+    }
+
+
+def _local_seconds(ts, tz):
+    """
+    UTC 秒数转为指定时区的本地秒数
+
+    时区偏移只按不同的整点计算一次 (窗口内最多 24 × 天数 个), 夏令时切换也能正确处理。
+    """
+    hours, inverse = np.unique(ts // 3600, return_inverse=True)
+    offsets = np.array([
+        datetime.fromtimestamp(int(hour) * 3600, tz).utcoffset().total_seconds()
+        for hour in hours
+    ], dtype=np.int64)
+    return ts + offsets[inverse]
+
+
+def _rolling_sum(daily, window):
+    """按天的滚动求和 (含当天在内的 window 天)"""
+    cumulative = np.cumsum(daily)
+    shifted = np.concatenate([np.zeros(window, dtype=cumulative.dtype), cumulative[:-window]])
+    return cumulative - shifted[:len(cumulative)]
+
+
+def _rolling_percentiles(day, values, days, window):
+    """
+    每天之前 window 天内推文的中位数和 p90
+
+    推文已按天排序, 每个窗口是一段连续切片, 用 searchsorted 定位边界;
+    循环次数为输出的天数, 与推文数量无关。
+
+    Args:
+        day: 每条推文的天序号 (已排序)
+        values: (指标数, 推文数) 的数组
+        days: 输出的天数
+        window: 滚动窗口天数
+
+    Returns:
+        ndarray: (天数, 2, 指标数), 没有推文的天为 NaN
+    """
+    index = np.arange(days)
+    lows = np.searchsorted(day, index - window + 1, side='left')
+    highs = np.searchsorted(day, index, side='right')
+    result = np.full((days, 2, values.shape[0]), np.nan)
+    for i in np.flatnonzero(highs > lows):
+        result[i] = np.percentile(values[:, lows[i]:highs[i]], [50, 90], axis=1)
+    return result
+
+
+def _nullable(array):
+    """NaN 转为 None, 便于序列化为 JSON"""
+    return [None if np.isnan(v) else round(float(v), 2) for v in array]
+
+
+def engagement(user, start, end, tz, rolling=7):
+    """
+    用户在时间窗口内的互动分析
+
+    Args:
+        user: MonitoredUser
+        start: 窗口开始 (含, 本地时区的 datetime)
+        end: 窗口结束 (不含)
+        tz: 热力图和按天统计使用的时区 (ZoneInfo)
+        rolling: 滚动窗口天数
+
+    Returns:
+        dict: 可直接序列化为 JSON 的结果
+    """
+    key = f'analytics:engagement:{user.pk}:{start.isoformat()}:{end.isoformat()}:{tz.key}:{rolling}'
+    result = cache.get(key)
+    if result is None:
+        result = _engagement(user, start, end, tz, rolling)
+        cache.set(key, result, timeout=ANALYTICS_CACHE_SECONDS)
+    return result
+
+
+def _engagement(user, start, end, tz, rolling):
+    first_day = (start.replace(tzinfo=None) - datetime(1970, 1, 1)).days
+    days = max((end - start).days, 1)
+    result = {
+        'user': user.pk,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'timezone': tz.key,
+        'rolling_days': rolling,
+        'tweets': 0,
+        'heatmap': [[0] * 24 for _ in range(7)],
+        'tweet_types': {},
+        'totals': {},
+        'daily': [],
+    }
+
+    columns = _columns(user, start, end)
+    if columns is None:
+        return result
+
+    local = _local_seconds(columns['ts'], tz)
+    local_day = local // DAY_SECONDS
+    hour = (local % DAY_SECONDS) // 3600
+    weekday = (local_day + EPOCH_WEEKDAY) % 7
+
+    # 星期 × 小时热力图 (星期一为第一行)
+    heatmap = np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+    type_counts = np.bincount(columns['types'], minlength=len(TWEET_TYPES) + 1)
+
+    interactions = columns['likes'] + columns['retweets'] + columns['replies'] + columns['quotes']
+
+    # 按天的滚动统计, day 为相对窗口第一天的序号
+    day = local_day - first_day
+    order = np.argsort(day, kind='stable')
+    day = day[order]
+    daily_tweets = np.bincount(day, minlength=days)[:days]
+    daily_interactions = np.bincount(day, weights=interactions[order], minlength=days)[:days]
+    rolling_tweets = _rolling_sum(daily_tweets, rolling)
+    rolling_interactions = _rolling_sum(daily_interactions, rolling)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(rolling_tweets > 0, rolling_interactions / rolling_tweets, np.nan)
+
+    metrics = np.stack([columns['likes'][order], columns['retweets'][order]])
+    percentiles = _rolling_percentiles(day, metrics, days, rolling)
+    dates = [(start + timedelta(days=i)).date().isoformat() for i in range(days)]
+
+    result.update({
+        'tweets': int(len(local)),
+        'heatmap': heatmap.tolist(),
+        'tweet_types': {
+            tweet_type: count
+            for tweet_type, count in zip(TWEET_TYPES + ['other'], type_counts.tolist()) if count
+        },
+        'totals': {
+            'likes': int(columns['likes'].sum()),
+            'retweets': int(columns['retweets'].sum()),
+            'replies': int(columns['replies'].sum()),
+            'quotes': int(columns['quotes'].sum()),
+            'engagement_rate': round(float(interactions.mean()), 2),
+            'likes_median': float(np.median(columns['likes'])),
+            'likes_p90': float(np.percentile(columns['likes'], 90)),
+            'retweets_median': float(np.median(columns['retweets'])),
+            'retweets_p90': float(np.percentile(columns['retweets'], 90)),
+        },
+        'daily': [
+            {
+                'date': date,
+                'tweets': tweets,
+                'likes_median': likes_median,
+                'likes_p90': likes_p90,
+                'retweets_median': retweets_median,
+                'retweets_p90': retweets_p90,
+                'engagement_rate': engagement_rate,
+            }
+            for date, tweets, likes_median, likes_p90, retweets_median, retweets_p90, engagement_rate in zip(
+                dates,
+                daily_tweets.tolist(),
+                _nullable(percentiles[:, 0, 0]),
+                _nullable(percentiles[:, 1, 0]),
+                _nullable(percentiles[:, 0, 1]),
+                _nullable(percentiles[:, 1, 1]),
+                _nullable(rate),
+            )
+        ],
+    })
+    return result
+
+
+def window(tz, days=30, start=None, end=None):
+    """
+    计算分析窗口, 边界为 tz 时区的零点
+
+    Args:
+        tz: 时区
+        days: 最近天数 (含今天), 与 start/end 二选一
+        start: 开始日期 (date)
+        end: 结束日期 (date, 含)
+
+    Returns:
+        tuple: (开始 datetime, 结束 datetime)
+    """
+    today = datetime.now(dt_timezone.utc).astimezone(tz).date()
+    if start is None:
+        end = end or today
+        start = end - timedelta(days=days - 1)
+    end = end or today
+    return (
+        datetime(start.year, start.month, start.day, tzinfo=tz),
+        datetime(end.year, end.month, end.day, tzinfo=tz) + timedelta(days=1),
+    )
@@ -0,0 +1,505 @@
+"""
+冷存储 (过期数据归档)
+
+清理任务不再直接删除过期数据, 而是先归档到 STORAGES['archive'] (S3 兼容的对象存储或共享目录)
+中的分段文件再从数据库删除:
+- 按 (类型, 月份, 监控用户) 分区, 路径为 {类型}/{YYYY-MM}/author-{id}/{时间戳}-{随机串}.ndjson.zst
+- 每行是与 API 返回格式相同的 JSON (推文含媒体和回复数), 读取时不需要再查询关联数据
+- 分段内按 (created_at, id) 升序, 每 BLOCK_ROWS 行压缩为一个独立的 zstd 帧; 各块的偏移、长度和
+  时间范围记录在 ArchiveSegment.blocks 中, 查询时按索引跳过时间范围外的分段和块, 只读取需要的字节范围
+- 分段只追加: 每次清理写入新文件, 已有文件不会被修改
+- 只有 ARCHIVE_DURABLE (归档存储是持久的、Web 进程也能读取) 时才归档并删除
+- 文件写入后从存储重新读取, 校验 SHA-256 和行数一致后, 才在同一个事务中写入 ArchiveSegment 索引
+  并删除数据库中的行; 事务失败时留下的文件没有索引, 不会被读取
+- 索引中的分段在存储中缺失时查询抛出 ArchiveUnavailable, 不返回不完整的结果
+
+列表 API 查询归档范围时按 (created_at, id) 游标分页 (page_rows): 数据库和归档各取一页再归并,
+每页的开销与页码无关; 多个分段按时间范围上界延迟打开, 只读取归并到的块。
+
+推文和它的所有回复一起归档 (删除推文会级联删除回复), 回复按原推文作者分区。
+媒体文件缓存、实体、指纹、告警命中等派生数据随推文一起删除, 不归档。
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import count, islice
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchiveSegment, MonitorLog, Reply, Tweet
+from .serializers import MonitorLogSerializer, ReplySerializer, TweetSerializer
+
+logger = logging.getLogger(__name__)
+
+# 每个分段文件最多的行数 (同一分区超过时分成多个文件)
+SEGMENT_ROWS = 10000
+# 每个压缩块的行数, 查询时以块为单位读取
+BLOCK_ROWS = 500
+COMPRESSION_LEVEL = 10
+# 查询参数中对应分区的过滤条件, 可以直接按索引排除其它用户的分段
+PARTITION_PARAMS = {'tweet': 'author', 'log': 'user'}
+SEARCH_FIELDS = {'tweet': ['text', 'tweet_id'], 'reply': ['text', 'reply_id'], 'log': []}
+
+
+class ArchiveUnavailable(Exception):
+    """归档存储不可用: 未配置为持久存储, 或索引中的分段文件缺失、内容不一致"""
+
+
+class _ArchivedTweetSerializer(TweetSerializer):
+    """回复数取自注解, 避免逐条推文查询"""
+
+    def get_replies_count(self, obj):
+        return obj.archived_replies_count
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _partitions(queryset, field):
+    """queryset 中的 (监控用户 ID, 月份开始时间), 按月份升序"""
+    return list(
+        queryset
+        .annotate(month=TruncMonth('created_at'))
+        .values_list(field, 'month')
+        .distinct()
+        .order_by('month', field)
+    )
+
+
+def storage():
+    return storages['archive']
+
+
+def _position(row):
+    """归档行的排序位置: (created_at 的 UTC 微秒数, 主键)"""
+    return _microseconds(parse_datetime(row['created_at'])), row['id']
+
+
+def _microseconds(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _compress(rows):
+    """
+    每 BLOCK_ROWS 行压缩为一个独立的 zstd 帧
+
+    Returns:
+        tuple: (文件内容, 块索引 [{'offset', 'length', 'rows', 'min', 'max'}, ...]),
+            min / max 为块内 created_at 的 UTC 微秒数
+    """
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    data = bytearray()
+    blocks = []
+    for offset in range(0, len(rows), BLOCK_ROWS):
+        chunk = rows[offset:offset + BLOCK_ROWS]
+        frame = compressor.compress(b''.join(
+            json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode() + b'\n' for row in chunk
+        ))
+        blocks.append({
+            'offset': len(data),
+            'length': len(frame),
+            'rows': len(chunk),
+            'min': _position(chunk[0])[0],
+            'max': _position(chunk[-1])[0],
+        })
+        data += frame
+    return bytes(data), blocks
+
+
+def _write_segment(kind, author_id, rows):
+    """
+    把已按 (created_at, id) 升序排列的行写入新的分段文件, 并从存储重新读取校验
+
+    Returns:
+        ArchiveSegment: 未保存的索引
+
+    Raises:
+        ArchiveUnavailable: 重新读取的内容与写入的不一致
+    """
+    first = parse_datetime(rows[0]['created_at'])
+    last = parse_datetime(rows[-1]['created_at'])
+    month = timezone.localtime(first).date().replace(day=1)
+    path = '/'.join([
+        kind,
+        f'{month:%Y-%m}',
+        f'author-{author_id}',
+        f'{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson.zst',
+    ])
+    data, blocks = _compress(rows)
+    segment = ArchiveSegment(
+        kind=kind,
+        month=month,
+        author_id=author_id,
+        path=storage().save(path, ContentFile(data)),
+        rows=len(rows),
+        size_bytes=len(data),
+        checksum=hashlib.sha256(data).hexdigest(),
+        blocks=blocks,
+        min_created_at=first,
+        max_created_at=last,
+    )
+    try:
+        _verify(segment)
+    except ArchiveUnavailable:
+        _discard([segment])
+        raise
+    return segment
+
+
+def _verify(segment):
+    """从存储重新读取分段, 内容的 SHA-256 和每个块的行数都与写入时一致才允许删除数据库中的行"""
+    try:
+        with storage().open(segment.path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError as e:
+        raise ArchiveUnavailable(f"归档分段写入后读取不到: {segment.path}") from e
+    if hashlib.sha256(data).hexdigest() != segment.checksum:
+        raise ArchiveUnavailable(f"归档分段内容校验失败: {segment.path}")
+    for block in _blocks(segment):
+        rows = _decompress(data[block['offset']:block['offset'] + block['length']]).count(b'\n')
+        if rows != block['rows']:
+            raise ArchiveUnavailable(f"归档分段行数不一致: {segment.path} ({rows} != {block['rows']})")
+
+
+def _discard(segments):
+    """删除未写入索引的分段文件 (归档中途失败时)"""
+    for segment in segments:
+        try:
+            storage().delete(segment.path)
+        except Exception as e:
+            logger.warning(f"删除未索引的归档分段失败 {segment.path}: {str(e)}")
+
+
+def _archive_tweets(ids, author_id):
+    """
+    归档一批推文和它们的全部回复, 然后从数据库删除
+
+    Returns:
+        tuple: (推文数, 回复数)
+    """
+    tweets = (
+        Tweet.objects
+        .filter(id__in=ids)
+        .select_related('author', 'original')
+        .prefetch_related('media')
+        .annotate(archived_replies_count=Count('replies'))
+        .order_by('created_at', 'id')
+    )
+    replies = Reply.objects.filter(tweet_id__in=ids).select_related('account', 'tweet').order_by('created_at', 'id')
+    by_month = {}
+    for row in ReplySerializer(replies, many=True).data:
+        month = timezone.localtime(parse_datetime(row['created_at'])).date().replace(day=1)
+        by_month.setdefault(month, []).append(row)
+
+    segments = []
+    try:
+        segments.append(_write_segment('tweet', author_id, _ArchivedTweetSerializer(tweets, many=True).data))
+        for rows in by_month.values():
+            segments.append(_write_segment('reply', author_id, rows))
+
+        with transaction.atomic():
+            ArchiveSegment.objects.bulk_create(segments)
+            # 级联删除回复、媒体、实体和指纹
+            Tweet.objects.filter(id__in=ids).delete()
+    except Exception:
+        _discard(segments)
+        raise
+    return len(ids), sum(len(rows) for rows in by_month.values())
+
+
+def _archive_logs(ids, user_id):
+    logs = MonitorLog.objects.filter(id__in=ids).select_related('user').order_by('created_at', 'id')
+    segment = _write_segment('log', user_id, MonitorLogSerializer(logs, many=True).data)
+    try:
+        with transaction.atomic():
+            segment.save()
+            MonitorLog.objects.filter(id__in=ids).delete()
+    except Exception:
+        _discard([segment])
+        raise
+    return len(ids)
+
+
+def archive_before(cutoff):
+    """
+    归档并删除 cutoff 之前的推文 (连同回复) 和监控日志
+
+    Args:
+        cutoff: 截止时间, 早于此时间的数据被归档
+
+    Returns:
+        dict: {'tweets': 推文数, 'replies': 回复数, 'logs': 日志数, 'segments': 新分段数}
+
+    Raises:
+        ArchiveUnavailable: 归档存储未配置为持久存储, 或分段写入后校验失败 (已归档的批次保留)
+    """
+    if not settings.ARCHIVE_DURABLE:
+        raise ArchiveUnavailable(
+            "归档存储未配置为持久存储 (设置 OBJECT_STORAGE_BUCKET, 或确认 ARCHIVE_DIR 是共享持久卷后设置 ARCHIVE_DURABLE=1), "
+            "不删除数据库中的数据"
+        )
+
+    result = {'tweets': 0, 'replies': 0, 'logs': 0, 'segments': 0}
+    segments_before = ArchiveSegment.objects.count()
+
+    tweets = Tweet.objects.filter(created_at__lt=cutoff)
+    for author_id, month in _partitions(tweets, 'author_id'):
+        partition = tweets.filter(author_id=author_id, created_at__gte=month, created_at__lt=_next_month(month))
+        while ids := list(partition.order_by('created_at', 'id').values_list('id', flat=True)[:SEGMENT_ROWS]):
+            tweets_count, replies_count = _archive_tweets(ids, author_id)
+            result['tweets'] += tweets_count
+            result['replies'] += replies_count
+
+    # 原推文未过期的旧回复不可能存在 (回复晚于原推文), 不需要单独处理
+    logs = MonitorLog.objects.filter(created_at__lt=cutoff)
+    for user_id, month in _partitions(logs, 'user_id'):
+        partition = logs.filter(user_id=user_id, created_at__gte=month, created_at__lt=_next_month(month))
+        while ids := list(partition.order_by('created_at', 'id').values_list('id', flat=True)[:SEGMENT_ROWS]):
+            result['logs'] += _archive_logs(ids, user_id)
+
+    result['segments'] = ArchiveSegment.objects.count() - segments_before
+    return result
+
+
+def horizon(kind):
+    """归档数据中最晚的时间, 没有归档时返回 None"""
+    return ArchiveSegment.objects.filter(kind=kind).aggregate(latest=Max('max_created_at'))['latest']
+
+
+def _blocks(segment):
+    """分段的块索引; 早期写入的分段整个文件是一个压缩帧, 视为一个块"""
+    return segment.blocks or [{
+        'offset': 0,
+        'length': segment.size_bytes,
+        'rows': segment.rows,
+        'min': _microseconds(segment.min_created_at),
+        'max': _microseconds(segment.max_created_at),
+    }]
+
+
+def _decompress(frame):
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(frame)
+
+
+def _read_range(path, offset, length):
+    """
+    读取分段文件中的一段字节
+
+    Raises:
+        ArchiveUnavailable: 索引中的分段在存储中不存在
+    """
+    stored = storage()
+    try:
+        if hasattr(stored, 'bucket'):
+            # S3 存储: 用 Range 请求只下载需要的块, 不下载整个文件
+            from botocore.exceptions import ClientError
+
+            try:
+                response = stored.bucket.Object(stored._normalize_name(path)).get(
+                    Range=f'bytes={offset}-{offset + length - 1}'
+                )
+            except ClientError as e:
+                if e.response['ResponseMetadata']['HTTPStatusCode'] == 404:
+                    raise FileNotFoundError(path) from e
+                raise
+            return response['Body'].read()
+        with stored.open(path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    except FileNotFoundError as e:
+        logger.error(f"归档分段文件不存在: {path}")
+        raise ArchiveUnavailable(f"归档分段文件不存在: {path}") from e
+
+
+def _read_block(segment, block):
+    data = _read_range(segment.path, block['offset'], block['length'])
+    return [json.loads(line) for line in _decompress(data).splitlines()]
+
+
+def _read_segment(segment):
+    """逐行读取分段文件"""
+    for block in _blocks(segment):
+        yield from _read_block(segment, block)
+
+
+def _matches(value, expected):
+    """比较归档行的字段与过滤条件 (模型实例按主键比较)"""
+    return value == getattr(expected, 'pk', expected)
+
+
+class _Query:
+    """一次归档查询的条件"""
+
+    def __init__(self, kind, start, end, filters, text, descending, after):
+        self.kind = kind
+        self.start = _microseconds(start) if start else None
+        self.end = _microseconds(end) if end else None
+        self.filters = filters or {}
+        self.terms = text.lower().split()
+        self.descending = descending
+        self.after = after
+
+    def segments(self, start, end):
+        segments = ArchiveSegment.objects.filter(kind=self.kind)
+        partition = PARTITION_PARAMS.get(self.kind)
+        if partition in self.filters:
+            segments = segments.filter(author_id=getattr(self.filters[partition], 'pk', self.filters[partition]))
+        if start:
+            segments = segments.filter(max_created_at__gte=start)
+        if end:
+            segments = segments.filter(min_created_at__lt=end)
+        if self.after:
+            after = EPOCH + timedelta(microseconds=self.after[0])
+            if self.descending:
+                segments = segments.filter(min_created_at__lte=after)
+            else:
+                segments = segments.filter(max_created_at__gte=after)
+        return segments
+
+    def wants_block(self, block):
+        """块的时间范围与查询范围、游标之后的范围有交集"""
+        if self.start is not None and block['max'] < self.start:
+            return False
+        if self.end is not None and block['min'] >= self.end:
+            return False
+        if self.after:
+            return block['min'] <= self.after[0] if self.descending else block['max'] >= self.after[0]
+        return True
+
+    def past_range(self, block):
+        """按查询方向, 这个块及之后的块都不可能有匹配的行"""
+        if self.descending:
+            return self.start is not None and block['max'] < self.start
+        return self.end is not None and block['min'] >= self.end
+
+    def matches(self, row, position):
+        created_at = position[0]
+        if (self.start is not None and created_at < self.start) or (self.end is not None and created_at >= self.end):
+            return False
+        if self.after and (position >= self.after if self.descending else position <= self.after):
+            return False
+        if not all(_matches(row.get(field), value) for field, value in self.filters.items()):
+            return False
+        return all(
+            any(term in str(row.get(field) or '').lower() for field in SEARCH_FIELDS[self.kind])
+            for term in self.terms
+        )
+
+    def rows(self, segment):
+        """按查询方向逐块读取一个分段中匹配的行"""
+        blocks = _blocks(segment)
+        for block in reversed(blocks) if self.descending else blocks:
+            if self.past_range(block):
+                return
+            if not self.wants_block(block):
+                continue
+            rows = _read_block(segment, block)
+            for row in reversed(rows) if self.descending else rows:
+                position = _position(row)
+                if self.matches(row, position):
+                    yield position, row
+
+
+def _sort_key(position, descending):
+    return (-position[0], -position[1]) if descending else position
+
+
+def iter_rows(kind, start=None, end=None, filters=None, text='', descending=True, after=None):
+    """
+    按 (created_at, id) 顺序惰性读取匹配的归档行
+
+    分段按时间范围的边界进入归并: 降序时以 max_created_at 为占位, 只有归并到该时间时才打开分段,
+    所以只取一页时只读取这一页涉及的分段和块。
+
+    Args:
+        kind: tweet / reply / log
+        start: 开始时间 (含)
+        end: 结束时间 (不含)
+        filters: 字段 -> 值的精确匹配条件, 字段名与 API 返回的字段相同
+        text: 搜索词, 与 API 的 search 参数一样按空白拆分, 每个词都要出现在某个搜索字段中 (不区分大小写)
+        descending: 是否按时间降序
+        after: 游标位置 (created_at 的 UTC 微秒数, id), 只返回排在它之后的行
+
+    Yields:
+        tuple: (位置, 行)
+
+    Raises:
+        ArchiveUnavailable: 需要读取的分段在存储中缺失
+    """
+    query = _Query(kind, start, end, filters, text, descending, after)
+    tiebreak = count()
+    heap = []
+    # 占位项的第二个键为 -inf, 同一时间的行之前先打开分段
+    for segment in query.segments(start, end).iterator():
+        bound = _microseconds(segment.max_created_at if descending else segment.min_created_at)
+        heap.append(((-bound if descending else bound, float('-inf')), next(tiebreak), segment, None))
+    heapq.heapify(heap)
+
+    while heap:
+        _, _, payload, rows = heapq.heappop(heap)
+        if rows is None:
+            # 占位项: 打开分段
+            rows = query.rows(payload)
+        else:
+            yield payload
+        item = next(rows, None)
+        if item is not None:
+            position, row = item
+            heapq.heappush(heap, (_sort_key(position, descending), next(tiebreak), (position, row), rows))
+
+
+def page_rows(kind, queryset, serialize, size, descending=True, after=None, start=None, end=None, filters=None, text=''):
+    """
+    数据库查询结果与归档行按 (created_at, id) 归并后取一页
+
+    数据库和归档都只取游标之后的 size + 1 行, 开销与翻到第几页无关。
+
+    Args:
+        kind: tweet / reply / log
+        queryset: 已过滤的查询 (排序由这里指定)
+        serialize: 把模型实例列表序列化为字典的函数
+        size: 每页行数
+        descending: 是否按时间降序
+        after: 上一页最后一行的位置, 第一页为 None
+        start, end, filters, text: 见 iter_rows
+
+    Returns:
+        tuple: (本页的行, 下一页的游标位置; 没有下一页时为 None)
+    """
+    from django.db.models import Q
+
+    if after:
+        at = EPOCH + timedelta(microseconds=after[0])
+        if descending:
+            queryset = queryset.filter(Q(created_at__lt=at) | Q(created_at=at, id__lt=after[1]))
+        else:
+            queryset = queryset.filter(Q(created_at__gt=at) | Q(created_at=at, id__gt=after[1]))
+    ordering = ['-created_at', '-id'] if descending else ['created_at', 'id']
+    hot = [(_position(row), row) for row in serialize(queryset.order_by(*ordering)[:size + 1])]
+    archived = islice(iter_rows(kind, start, end, filters, text, descending, after), size + 1)
+
+    merged = list(islice(
+        heapq.merge(hot, archived, key=lambda item: _sort_key(item[0], descending)),
+        size + 1,
+    ))
+    rows = [row for _, row in merged[:size]]
+    return rows, (merged[size - 1][0] if len(merged) > size else None)
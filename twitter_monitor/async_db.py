@@ -0,0 +1,65 @@
+"""
+在 async 视图中并发执行相互独立的查询
+
+Django 的 async ORM (acount、afirst 等) 目前都经由 sync_to_async(thread_sensitive=True)
+在同一个线程里排队执行, asyncio.gather 并不能让它们并发。这里把每个查询
+放到专用线程池的独立线程中执行 (各线程使用自己的数据库连接), 页面耗时由最慢
+的查询决定, 而不是所有查询耗时之和。
+
+线程池大小为 ASYNC_DB_WORKERS, 每个 Web 进程因此最多多出这么多个并发连接;
+每个查询结束后关闭所在线程的连接, 空闲线程不占用数据库连接。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """进程内共享的查询线程池 (第一次使用时创建, 不会被 preload 的 master 进程继承)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='async-db'
+                )
+    return _executor
+
+
+def _run(query):
+    try:
+        return query()
+    finally:
+        connections.close_all()
+
+
+async def gather(**queries):
+    """
+    并发执行查询
+
+    每个查询是一个无参数的函数, 返回值必须已经求值 (例如 count() 或 list(queryset)),
+    不能返回惰性的 QuerySet。
+
+    用法:
+        results = await gather(
+            users=lambda: MonitoredUser.objects.count(),
+            logs=lambda: list(MonitorLog.objects.all()[:10]),
+        )
+
+    Returns:
+        dict: 查询名 -> 结果
+    """
+    names = list(queries)
+    executor = _get_executor()
+    results = await asyncio.gather(*(
+        sync_to_async(_run, thread_sensitive=False, executor=executor)(queries[name]) for name in names
+    ))
+    return dict(zip(names, results))
@@ -0,0 +1,179 @@
+"""
+批量写入工具
+
+为大批量推文/回复写入提供统一的 upsert 接口:
+- PostgreSQL: COPY 到临时 staging 表, 再用 INSERT ... ON CONFLICT 合并到正式表
+- 其它数据库 (SQLite 等): 分块 bulk_create(update_conflicts=True)
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import metrics
+
+
+def _auto_timestamp_fields(model):
+    """返回模型中 auto_now / auto_now_add 的字段"""
+    return [
+        f for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+
+
+def _default_fields(model, row_keys):
+    """
+    行中没有、不可为空且有默认值的字段 (包括默认为空字符串的文本字段)
+
+    默认值只在 Django 中定义, 数据库列没有 DEFAULT; COPY 路径不经过模型实例,
+    需要显式写入这些列, 否则会插入 NULL。
+    """
+    return [
+        f for f in model._meta.concrete_fields
+        if f.attname not in row_keys
+        and not f.null
+        and not f.primary_key
+        and (f.has_default() or f.empty_strings_allowed)
+        and not getattr(f, 'auto_now', False)
+        and not getattr(f, 'auto_now_add', False)
+    ]
+
+
+def _unique_keys(unique_field):
+    """唯一键统一为元组, 支持单列和联合唯一键"""
+    return (unique_field,) if isinstance(unique_field, str) else tuple(unique_field)
+
+
+def _dedupe(rows, keys):
+    """同一批次内按唯一键去重 (后出现的覆盖先出现的)"""
+    return list({tuple(row[key] for key in keys): row for row in rows}.values())
+
+
+def upsert_rows(model, rows, unique_field, batch_size=1000, use_copy=True):
+    """
+    按唯一键批量插入或更新
+
+    Args:
+        model: Django 模型类
+        rows: 字典列表, 键为字段的 attname (外键使用 author_id 这种形式)
+        unique_field: 冲突判断使用的唯一字段, 联合唯一时传入字段列表
+        batch_size: bulk_create 的分块大小
+        use_copy: PostgreSQL 下是否使用 COPY + 合并
+
+    Returns:
+        int: 写入的行数
+    """
+    keys = _unique_keys(unique_field)
+    rows = _dedupe(rows, keys)
+    if not rows:
+        return 0
+
+    if use_copy and connection.vendor == 'postgresql':
+        written = _copy_merge(model, rows, keys)
+    else:
+        written = _bulk_create_merge(model, rows, keys, batch_size)
+
+    metrics.ROWS_WRITTEN.labels(model=model._meta.model_name).inc(written)
+    return written
+
+
+def _bulk_create_merge(model, rows, keys, batch_size):
+    """使用 bulk_create 的 ON CONFLICT 支持进行 upsert"""
+    attname_to_name = {f.attname: f.name for f in model._meta.concrete_fields}
+    update_fields = [
+        attname_to_name[key] for key in rows[0]
+        if key not in keys
+    ]
+    update_fields += [
+        f.name for f in _auto_timestamp_fields(model)
+        if getattr(f, 'auto_now', False) and f.name not in update_fields
+    ]
+
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=list(keys),
+        update_fields=update_fields,
+    )
+    return len(rows)
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return '' if value is None else str(value)
+
+
+def _copy_merge(model, rows, keys):
+    """PostgreSQL: COPY 到 staging 表后合并"""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    staging = f'{table}_staging'
+
+    now = timezone.now()
+    auto_fields = _auto_timestamp_fields(model)
+    row_keys = list(rows[0].keys())
+    timestamp_columns = [f.column for f in auto_fields if f.attname not in row_keys]
+    default_fields = _default_fields(model, row_keys)
+    columns = row_keys + timestamp_columns + [f.column for f in default_fields]
+    # 与 bulk_create 路径一致: 行中没有的列只在插入时使用默认值, 冲突时保留已有的值
+    insert_only = {
+        f.column for f in auto_fields
+        if getattr(f, 'auto_now_add', False)
+    } | {f.column for f in default_fields}
+    nullable = [
+        f.column for f in model._meta.concrete_fields
+        if f.null and f.column in columns
+    ]
+
+    buffer = io.StringIO()
+    # QUOTE_ALL: 空字符串写成 "", 避免文本列被 COPY 当作 NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for row in rows:
+        values = (
+            [row[key] for key in row_keys]
+            + [now] * len(timestamp_columns)
+            + [f.get_default() for f in default_fields]
+        )
+        writer.writerow([_csv_value(v) for v in values])
+    buffer.seek(0)
+
+    column_sql = ', '.join(qn(c) for c in columns)
+    copy_options = 'FORMAT csv'
+    if nullable:
+        # 可空列中的 "" 按 NULL 处理
+        copy_options += f", FORCE_NULL ({', '.join(qn(c) for c in nullable)})"
+    update_sql = ', '.join(
+        f'{qn(c)} = EXCLUDED.{qn(c)}'
+        for c in columns
+        if c not in keys and c not in insert_only
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # CREATE TABLE AS 不会复制 NOT NULL 约束和索引, staging 表只保留需要的列
+        cursor.execute(
+            f'CREATE TEMP TABLE {qn(staging)} AS '
+            f'SELECT {column_sql} FROM {qn(table)} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {qn(staging)} ({column_sql}) FROM STDIN WITH ({copy_options})',
+            buffer,
+        )
+        cursor.execute(
+            f'INSERT INTO {qn(table)} ({column_sql}) '
+            f'SELECT {column_sql} FROM {qn(staging)} '
+            f"ON CONFLICT ({', '.join(qn(key) for key in keys)}) DO UPDATE SET {update_sql}"
+        )
+        written = cursor.rowcount
+        cursor.execute(f'DROP TABLE {qn(staging)}')
+
+    return written
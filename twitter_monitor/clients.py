@@ -0,0 +1,117 @@
+"""
+进程级共享的 Twitter API HTTP 连接
+
+每个进程只建立一个带连接池的 requests.Session, 所有 TwitterService 复用
+其中的 keep-alive 连接, 避免每次任务、每次页面渲染都重新握手 TLS。
+
+Celery prefork 和 gunicorn 在 fork 子进程前可能已经建立了连接, 子进程
+继承的 socket 与父进程共用, 因此 fork 后在子进程中丢弃继承的 Session,
+首次使用时重新创建。
+
+API 健康状态由客户端在每次响应后记录到 Django 缓存, 控制台直接读取,
+不需要为检查可用性创建客户端或发出请求。
+"""
+
+import logging
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CACHE_KEY = 'twitter:api_health'
+# 状态未变化时最多每隔多少秒刷新一次缓存中的健康状态
+HEALTH_REFRESH_SECONDS = 60
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# 本进程最近一次写入缓存的健康状态, 用于减少缓存写入
+_last_health = {'available': None, 'written_at': 0.0}
+
+
+def _build_session():
+    pool_size = settings.TWITTER_HTTP_POOL_SIZE
+    session = requests.Session()
+    # 只访问 api.twitter.com 一个主机; 失败重试由 Celery 任务负责
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    return session
+
+
+def session():
+    """
+    本进程共享的 HTTP Session
+
+    Returns:
+        requests.Session: 带连接池的 Session, fork 后在子进程中重新创建
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def _reset_after_fork():
+    # 不关闭继承的连接: 关闭会影响父进程仍在使用的 socket
+    global _session, _session_pid, _session_lock
+    _session = None
+    _session_pid = None
+    _session_lock = threading.Lock()
+    _last_health.update({'available': None, 'written_at': 0.0})
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def record_status(status_code):
+    """
+    根据 API 响应状态码记录健康状态
+
+    401/403 表示 Token 无效或当前 API 级别无权访问, 其它状态码 (包括 429) 说明 API 可用。
+
+    Args:
+        status_code: HTTP 状态码
+    """
+    available = status_code not in (401, 403)
+    now = time.time()
+    if _last_health['available'] == available and now - _last_health['written_at'] < HEALTH_REFRESH_SECONDS:
+        return
+    try:
+        cache.set(HEALTH_CACHE_KEY, {
+            'available': available,
+            'status_code': status_code,
+            'checked_at': int(now),
+        }, timeout=None)
+        _last_health.update({'available': available, 'written_at': now})
+    except Exception as e:
+        logger.warning(f"保存 API 健康状态失败: {str(e)}")
+
+
+def health():
+    """
+    Twitter API 健康状态 (不发出请求)
+
+    Returns:
+        dict: available, status_code (最近一次响应的状态码, 尚无请求时为 None),
+              checked_at (Unix 时间戳)
+    """
+    if not getattr(settings, 'TWITTER_BEARER_TOKEN', None):
+        return {'available': False, 'status_code': None, 'checked_at': None}
+    try:
+        state = cache.get(HEALTH_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"读取 API 健康状态失败: {str(e)}")
+        state = None
+    # 已配置 Token 但还没有请求过时视为可用
+    return state or {'available': True, 'status_code': None, 'checked_at': None}
@@ -0,0 +1,104 @@
+"""
+读写分离数据库路由
+
+配置了只读副本 (settings.DATABASE_REPLICAS) 时, Web/API 的 GET、HEAD 请求
+从副本读取, 其它情况 (写请求、Celery 任务、管理命令) 一律使用主库。
+
+读己之写: 写请求之后的一段时间内 (REPLICA_PIN_SECONDS), 同一浏览器的请求
+通过 Cookie 固定到主库, 避免副本复制延迟导致刚添加的用户或刚修改的设置
+在重定向后的页面上看不到。同一请求内发生过写入后, 后续读取也改用主库。
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 当前请求是否允许从副本读取; 请求之外 (Celery、管理命令) 默认不允许
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replicas():
+    """已配置的只读副本别名列表"""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """把只读请求中的查询路由到副本"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replicas():
+            return random.choice(replicas())
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # 本请求后续的读取也改用主库
+        _use_replica.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 主库和副本的数据相同, 跨别名的关联都允许
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本通过数据库复制同步表结构
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """
+    根据请求方法决定本次请求能否读取副本, 写请求后设置固定到主库的 Cookie
+
+    同时支持同步和异步: ASGI 部署下 async 视图 (控制台、用户详情、SSE) 直接在事件循环中调用,
+    不需要经过 sync/async 适配切换线程。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _use_replica.set(self._allow_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin_primary(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set(self._allow_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin_primary(request, response)
+
+    def _allow_replica(self, request):
+        return (
+            bool(replicas())
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+    def _pin_primary(self, request, response):
+        if request.method not in SAFE_METHODS and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,221 @@
+"""
+近似重复推文检测 (SimHash)
+
+每条入库的推文计算 64 位 SimHash 指纹 (特征为规范化文本的字符 5-gram), 写入 TweetFingerprint:
+- 汉明距离不超过 MAX_DISTANCE 视为近似重复 (同一篇新闻稿、复制粘贴的文案等)
+- 指纹分成 4 段 16 位, 按鸽巢原理近似重复的指纹至少有一段完全相同, 查重时按分段索引
+  取出候选再计算汉明距离, 不需要与全部推文两两比较
+- 互相近似重复的推文归入同一个簇, cluster 为簇中第一条推文的主键
+
+转发 (内容就是原推文) 和规范化后过短的推文不计算指纹。
+"""
+
+import hashlib
+import logging
+import re
+
+from django.db.models import Count, Max, Q
+
+from .models import Tweet, TweetFingerprint
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+# 规范化后少于这么多字符的推文不计算指纹, 避免短文本大量误判
+MIN_LENGTH = 20
+MAX_DISTANCE = 3
+BANDS = 4
+BAND_BITS = 16
+
+URL_PATTERN = re.compile(r'https?://\S+')
+MENTION_PATTERN = re.compile(r'@\w+')
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """去掉链接 (t.co 短链每条都不同)、提及、标点和空白, 转为小写"""
+    text = URL_PATTERN.sub(' ', text.lower())
+    text = MENTION_PATTERN.sub(' ', text)
+    return NON_WORD_PATTERN.sub('', text)
+
+
+def simhash(text):
+    """
+    计算文本的 64 位 SimHash
+
+    Returns:
+        int: 无符号指纹, 文本过短时返回 None
+    """
+    # NumPy 只在计算指纹时导入, Web 进程读取重复簇不需要加载
+    import numpy as np
+    
+    normalized = normalize(text)
+    if len(normalized) < MIN_LENGTH:
+        return None
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    digests = b''.join(hashlib.blake2b(s.encode(), digest_size=8).digest() for s in shingles)
+    # 每个特征哈希展开为 64 位, 按位投票: 超过半数特征为 1 的位取 1
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    return int.from_bytes(np.packbits(bits.sum(axis=0) * 2 > len(shingles)).tobytes(), 'big')
+
+
+def bands(value):
+    """指纹的 4 个 16 位分段 (高位在前)"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * (BANDS - 1 - i))) & mask for i in range(BANDS)]
+
+
+def distance(a, b):
+    """两个指纹的汉明距离"""
+    return (a ^ b).bit_count()
+
+
+def _signed(value):
+    """无符号 64 位整数转为数据库 BIGINT 可保存的有符号整数"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def index(tweets):
+    """
+    为推文计算指纹并归入近似重复簇
+
+    同一批推文之间也会互相比较; 一条推文同时与多个簇近似时, 这些簇合并为一个。
+
+    Args:
+        tweets: Tweet 对象 (需要 id、text、tweet_type), 已有指纹的推文会跳过
+
+    Returns:
+        int: 与已有推文近似重复的新推文数
+    """
+    tweets = [tweet for tweet in tweets if tweet.tweet_type != 'retweet']
+    if not tweets:
+        return 0
+    existing = set(
+        TweetFingerprint.objects.filter(tweet_id__in=[t.id for t in tweets]).values_list('tweet_id', flat=True)
+    )
+
+    pending = []
+    for tweet in sorted(tweets, key=lambda t: t.id):
+        if tweet.id in existing:
+            continue
+        value = simhash(tweet.text)
+        if value is not None:
+            pending.append((tweet.id, value, bands(value)))
+    if not pending:
+        return 0
+
+    # 按分段取出候选指纹, 一条查询 (每个分段走自己的索引)
+    query = Q()
+    for i in range(BANDS):
+        query |= Q(**{f'band{i}__in': {tweet_bands[i] for _, _, tweet_bands in pending}})
+    simhashes, clusters, buckets = {}, {}, {}
+    for tweet_id, value, cluster in TweetFingerprint.objects.filter(query).values_list('tweet_id', 'simhash', 'cluster'):
+        simhashes[tweet_id] = _unsigned(value)
+        clusters[tweet_id] = cluster
+        for i, band in enumerate(bands(simhashes[tweet_id])):
+            buckets.setdefault((i, band), []).append(tweet_id)
+
+    merged = {}
+    touched = set()
+    found = 0
+    for tweet_id, value, tweet_bands in pending:
+        matches = {
+            other
+            for i, band in enumerate(tweet_bands)
+            for other in buckets.get((i, band), ())
+            if distance(value, simhashes[other]) <= MAX_DISTANCE
+        }
+        cluster = None
+        if matches:
+            found += 1
+            roots = {clusters[other] or other for other in matches}
+            cluster = min(roots)
+            for root in roots - {cluster}:
+                merged[root] = cluster
+            for other, other_cluster in clusters.items():
+                if (other in matches or other_cluster in roots) and other_cluster != cluster:
+                    clusters[other] = cluster
+                    touched.add(other)
+        simhashes[tweet_id] = value
+        clusters[tweet_id] = cluster
+        for i, band in enumerate(tweet_bands):
+            buckets.setdefault((i, band), []).append(tweet_id)
+
+    TweetFingerprint.objects.bulk_create([
+        TweetFingerprint(
+            tweet_id=tweet_id,
+            simhash=_signed(value),
+            cluster=clusters[tweet_id],
+            **{f'band{i}': band for i, band in enumerate(tweet_bands)},
+        )
+        for tweet_id, value, tweet_bands in pending
+    ], ignore_conflicts=True)
+
+    # 已入库的候选: 新加入簇或所在的簇被合并
+    new_ids = {tweet_id for tweet_id, _, _ in pending}
+    changed = {}
+    for tweet_id in touched - new_ids:
+        changed.setdefault(clusters[tweet_id], []).append(tweet_id)
+    for cluster, tweet_ids in changed.items():
+        TweetFingerprint.objects.filter(tweet_id__in=tweet_ids).update(cluster=cluster)
+    # 本批没有取到的簇成员
+    for root in merged:
+        final = root
+        while final in merged:
+            final = merged[final]
+        TweetFingerprint.objects.filter(cluster=root).update(cluster=final)
+
+    if found:
+        logger.info(f"发现 {found} 条近似重复推文")
+    return found
+
+
+def clusters(author=None, limit=20):
+    """
+    近似重复簇, 按最近一条推文的发布时间倒序
+
+    Args:
+        author: 只返回包含该监控用户推文的簇
+        limit: 返回数量
+
+    Returns:
+        list: [{'cluster', 'size', 'accounts', 'latest', 'authors', 'tweet'}, ...],
+            tweet 为簇中第一条推文 (已被清理时为 None)
+    """
+    fingerprints = TweetFingerprint.objects.exclude(cluster=None)
+    if author is not None:
+        fingerprints = fingerprints.filter(
+            cluster__in=fingerprints.filter(tweet__author=author).values('cluster')
+        )
+    rows = list(
+        fingerprints
+        .values('cluster')
+        .annotate(
+            size=Count('id'),
+            accounts=Count('tweet__author', distinct=True),
+            latest=Max('tweet__created_at'),
+        )
+        .order_by('-latest')[:limit]
+    )
+    if not rows:
+        return []
+
+    ids = [row['cluster'] for row in rows]
+    authors = {}
+    for cluster, username in (
+        TweetFingerprint.objects.filter(cluster__in=ids)
+        .values_list('cluster', 'tweet__author__username')
+        .order_by('cluster', 'tweet__author__username')
+        .distinct()
+    ):
+        authors.setdefault(cluster, []).append(username)
+    tweets = Tweet.objects.select_related('author').in_bulk(ids)
+
+    return [
+        {**row, 'authors': authors.get(row['cluster'], []), 'tweet': tweets.get(row['cluster'])}
+        for row in rows
+    ]
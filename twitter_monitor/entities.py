@@ -0,0 +1,151 @@
+"""
+推文实体索引
+
+时间线接口返回的 entities (话题标签、提及、股票代码、链接) 拆成 TweetEntity 窄表,
+(kind, value, created_at) 索引支持按实体筛选推文; 热门实体读取 EntityDailyCount
+每日汇总, 不需要扫描实体表。
+
+汇总在每次写入后按受影响的 (日期, 类型, 值) 从实体表重新计算, 结果可重复执行,
+回填历史推文或重复抓取同一推文都不会重复计数。
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .bulk import upsert_rows
+from .models import EntityDailyCount, TweetEntity
+
+logger = logging.getLogger(__name__)
+
+KINDS = [kind for kind, _ in TweetEntity.KIND_CHOICES]
+# 值的前缀, 查询参数中带不带都可以
+PREFIXES = {'hashtag': '#', 'mention': '@', 'cashtag': '$'}
+
+
+def normalize(kind, value):
+    """
+    统一实体值的格式
+
+    Args:
+        kind: hashtag / mention / cashtag / url
+        value: 原始值, 例如 '#Python' 或 '@Django'
+
+    Returns:
+        str: 标签/提及/股票代码去掉前缀并转为小写, 链接原样返回
+    """
+    value = value.strip()
+    if kind == 'url':
+        return value[:500]
+    return value.lstrip(PREFIXES[kind]).lower()
+
+
+def from_tweet(tweet_id, created_at, entities):
+    """
+    从时间线接口的 entities 字段提取实体
+
+    Args:
+        tweet_id: 推文 ID
+        created_at: 推文发布时间
+        entities: tweet.entities, 例如 {'hashtags': [{'tag': 'Python'}], 'urls': [...]}
+
+    Returns:
+        list: 实体行 (tweet_id 为推文 ID, 保存前替换为推文主键)
+    """
+    values = []
+    for item in entities.get('hashtags', []):
+        values.append(('hashtag', item.get('tag')))
+    for item in entities.get('mentions', []):
+        values.append(('mention', item.get('username')))
+    for item in entities.get('cashtags', []):
+        values.append(('cashtag', item.get('tag')))
+    for item in entities.get('urls', []):
+        values.append(('url', item.get('expanded_url') or item.get('url')))
+
+    rows = {}
+    for kind, value in values:
+        if not value:
+            continue
+        value = normalize(kind, value)
+        rows[(kind, value)] = {
+            'tweet_id': str(tweet_id),
+            'kind': kind,
+            'value': value,
+            'created_at': created_at,
+        }
+    return list(rows.values())
+
+
+def save(rows):
+    """
+    批量写入实体并刷新受影响的每日汇总
+
+    Args:
+        rows: from_tweet 返回的实体行, tweet_id 已替换为推文主键
+
+    Returns:
+        int: 写入的实体数
+    """
+    if not rows:
+        return 0
+
+    written = upsert_rows(TweetEntity, rows, ('tweet_id', 'kind', 'value'))
+    refresh_daily_counts(rows)
+    return written
+
+
+def refresh_daily_counts(rows):
+    """
+    按实体表重新计算这些实体所在日期的出现次数
+
+    Args:
+        rows: 含 kind / value / created_at 的实体行
+    """
+    dates = {timezone.localtime(row['created_at']).date() for row in rows}
+    keys = {(row['kind'], row['value']) for row in rows}
+    start = timezone.make_aware(datetime.combine(min(dates), time.min))
+    end = timezone.make_aware(datetime.combine(max(dates) + timedelta(days=1), time.min))
+
+    counts = []
+    # 每种类型一条聚合查询, 走 (kind, value, created_at) 索引
+    for kind in {kind for kind, _ in keys}:
+        values = {value for k, value in keys if k == kind}
+        counts.extend(
+            TweetEntity.objects
+            .filter(kind=kind, value__in=values, created_at__gte=start, created_at__lt=end)
+            .annotate(date=TruncDate('created_at'))
+            .values('date', 'kind', 'value')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+
+    upsert_rows(
+        EntityDailyCount,
+        [row for row in counts if row['date'] in dates],
+        ('date', 'kind', 'value'),
+    )
+
+
+def top(kind, days=7, limit=20):
+    """
+    最近若干天出现次数最多的实体
+
+    Args:
+        kind: hashtag / mention / cashtag / url
+        days: 统计天数 (含今天)
+        limit: 返回数量
+
+    Returns:
+        list: [{'value': 值, 'count': 推文数}, ...]
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        EntityDailyCount.objects
+        .filter(kind=kind, date__gte=since)
+        .values('value')
+        .annotate(count=Sum('count'))
+        .order_by('-count', 'value')[:limit]
+    )
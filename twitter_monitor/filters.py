@@ -0,0 +1,86 @@
+"""
+REST API 过滤器
+"""
+
+import django_filters
+from django.db.models import Exists, OuterRef
+
+from . import entities
+from .models import Tweet, Media, Reply, RuleMatch, TweetEntity, MonitorLog
+
+
+def created_range():
+    """发布时间范围过滤器 (早于热数据的范围会合并查询归档数据)"""
+    return (
+        django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte', label='开始时间 (含)'),
+        django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt', label='结束时间 (不含)'),
+    )
+
+
+class TweetFilter(django_filters.FilterSet):
+    """推文过滤器"""
+    media_type = django_filters.ChoiceFilter(
+        choices=Media.MEDIA_TYPE_CHOICES,
+        method='filter_media_type',
+        label='媒体类型',
+    )
+    rule = django_filters.NumberFilter(method='filter_rule', label='命中的告警规则')
+    hashtag = django_filters.CharFilter(method='filter_entity', label='话题标签')
+    mention = django_filters.CharFilter(method='filter_entity', label='提及的用户名')
+    cashtag = django_filters.CharFilter(method='filter_entity', label='股票代码')
+    url = django_filters.CharFilter(method='filter_entity', label='链接 (展开后的地址)')
+    created_after, created_before = created_range()
+    
+    class Meta:
+        model = Tweet
+        fields = [
+            'author', 'tweet_type', 'has_media', 'media_type', 'rule', 'hashtag', 'mention', 'cashtag', 'url',
+            'created_after', 'created_before',
+        ]
+    
+    def filter_media_type(self, queryset, name, value):
+        # 使用 EXISTS 子查询, 一条推文有多个媒体时也不会产生重复行
+        return queryset.filter(
+            Exists(Media.objects.filter(tweet=OuterRef('pk'), media_type=value))
+        )
+    
+    def filter_rule(self, queryset, name, value):
+        # 走 (rule, tweet) 唯一索引
+        return queryset.filter(
+            Exists(RuleMatch.objects.filter(tweet=OuterRef('pk'), rule_id=value))
+        )
+    
+    def filter_entity(self, queryset, name, value):
+        # 过滤器名即实体类型; 相关 EXISTS 子查询按外层推文逐条探测,
+        # 使用的是唯一约束 (tweet, kind, value) 的索引, 而不是 (kind, value, created_at)
+        return queryset.filter(
+            Exists(TweetEntity.objects.filter(
+                tweet=OuterRef('pk'), kind=name, value=entities.normalize(name, value)
+            ))
+        )
+
+
+class ReplyFilter(django_filters.FilterSet):
+    """回复过滤器"""
+    # 按主键过滤, 不校验推文是否还在数据库中 (原推文被归档后仍可查询它的回复)
+    tweet = django_filters.NumberFilter(field_name='tweet_id', label='原推文')
+    rule = django_filters.NumberFilter(method='filter_rule', label='命中的告警规则')
+    created_after, created_before = created_range()
+    
+    class Meta:
+        model = Reply
+        fields = ['author', 'account', 'tweet', 'rule', 'created_after', 'created_before']
+    
+    def filter_rule(self, queryset, name, value):
+        return queryset.filter(
+            Exists(RuleMatch.objects.filter(reply=OuterRef('pk'), rule_id=value))
+        )
+
+
+class MonitorLogFilter(django_filters.FilterSet):
+    """监控日志过滤器"""
+    created_after, created_before = created_range()
+    
+    class Meta:
+        model = MonitorLog
+        fields = ['user', 'status', 'created_after', 'created_before']
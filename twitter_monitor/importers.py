@@ -0,0 +1,207 @@
+"""
+历史推文导入
+
+支持两种输入格式, 均以流式方式读取:
+- NDJSON: 每行一条 Twitter API v2 推文对象, 或一整页响应 ({"data": [...], "includes": {...}})
+- Twitter 存档导出的 tweets.js: window.YTD.tweets.part0 = [ {"tweet": {...}}, ... ]
+
+字段映射与 TwitterService._parse_tweet 保持一致。
+"""
+
+import json
+import re
+from datetime import datetime
+
+from django.utils.dateparse import parse_datetime
+
+READ_SIZE = 1 << 20
+# 数组元素之间的空白和逗号
+SEPARATOR_PATTERN = re.compile(r'[\s,]*')
+
+ARCHIVE_DATE_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+def detect_format(path):
+    """根据文件开头判断格式: 'archive' 或 'ndjson'"""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(256).lstrip()
+    if head.startswith('window.YTD') or head.startswith('['):
+        return 'archive'
+    return 'ndjson'
+
+
+def iter_ndjson(path):
+    """逐行读取 NDJSON 文件, 每行展开为若干条 (推文, media_dict)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+
+            # 一整页 API 响应
+            if 'data' in obj and isinstance(obj['data'], (list, dict)):
+                media_dict = _media_dict(obj.get('includes') or {})
+                data = obj['data'] if isinstance(obj['data'], list) else [obj['data']]
+                for item in data:
+                    yield item, media_dict
+            else:
+                yield obj, {}
+
+
+def iter_archive(path):
+    """
+    流式读取存档 tweets.js
+
+    文件是一个很大的 JSON 数组, 使用 raw_decode 逐个解析数组元素,
+    不需要把整个文件读入内存。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_SIZE)
+        start = buffer.find('[')
+        if start < 0:
+            raise ValueError('无法识别的存档格式: 未找到 JSON 数组')
+        # 用下标在缓冲区中前进, 只在补充数据时切掉已解析的部分, 避免每条推文复制整个缓冲区
+        index = start + 1
+        eof = False
+
+        while True:
+            index = SEPARATOR_PATTERN.match(buffer, index).end()
+            if index < len(buffer):
+                if buffer[index] == ']':
+                    return
+                try:
+                    obj, index = decoder.raw_decode(buffer, index)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield obj.get('tweet', obj), None
+                    continue
+            elif eof:
+                return
+
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+
+
+def _media_dict(includes):
+    media_dict = {}
+    for media in includes.get('media', []):
+        media_dict[media['media_key']] = {
+            'url': media.get('url') or media.get('preview_image_url'),
+            'type': media.get('type'),
+        }
+    return media_dict
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed = datetime.strptime(value, ARCHIVE_DATE_FORMAT)
+    return parsed
+
+
+def parse_api_tweet(data, media_dict=None):
+    """解析 API v2 推文字典 (与 TwitterService._parse_tweet 对应)"""
+    tweet_type = 'tweet'
+    referenced_tweet_id = ''
+    retweeted_tweet_id = ''
+
+    referenced = data.get('referenced_tweets') or []
+    if referenced:
+        ref = referenced[0]
+        if ref.get('type') == 'retweeted':
+            tweet_type = 'retweet'
+            retweeted_tweet_id = str(ref['id'])
+        elif ref.get('type') == 'quoted':
+            tweet_type = 'quote'
+            referenced_tweet_id = str(ref['id'])
+
+    in_reply_to_tweet_id = ''
+    for ref in referenced:
+        if ref.get('type') == 'replied_to':
+            in_reply_to_tweet_id = str(ref['id'])
+
+    media_urls = []
+    has_media = False
+    attachments = data.get('attachments') or {}
+    if media_dict and 'media_keys' in attachments:
+        has_media = True
+        for key in attachments['media_keys']:
+            if key in media_dict and media_dict[key]['url']:
+                media_urls.append(media_dict[key]['url'])
+
+    metrics = data.get('public_metrics') or {}
+
+    return {
+        'tweet_id': str(data['id']),
+        'author_id': str(data.get('author_id', '')),
+        'conversation_id': str(data.get('conversation_id', '')),
+        'in_reply_to_tweet_id': in_reply_to_tweet_id,
+        'in_reply_to_user_id': str(data.get('in_reply_to_user_id', '')),
+        'tweet_type': tweet_type,
+        'text': data.get('text', ''),
+        'created_at': _parse_datetime(data['created_at']),
+        'retweet_count': metrics.get('retweet_count', 0),
+        'reply_count': metrics.get('reply_count', 0),
+        'like_count': metrics.get('like_count', 0),
+        'quote_count': metrics.get('quote_count', 0),
+        'referenced_tweet_id': referenced_tweet_id,
+        'retweeted_tweet_id': retweeted_tweet_id,
+        'has_media': has_media,
+        'media_urls': media_urls,
+    }
+
+
+def parse_archive_tweet(data):
+    """解析存档导出中的 v1.1 格式推文"""
+    text = data.get('full_text') or data.get('text', '')
+
+    tweet_type = 'tweet'
+    referenced_tweet_id = ''
+    retweeted_tweet_id = ''
+    if data.get('retweeted_status_id_str') or text.startswith('RT @'):
+        tweet_type = 'retweet'
+        retweeted_tweet_id = data.get('retweeted_status_id_str', '')
+    elif data.get('quoted_status_id_str'):
+        tweet_type = 'quote'
+        referenced_tweet_id = data['quoted_status_id_str']
+
+    media = (data.get('extended_entities') or data.get('entities') or {}).get('media', [])
+    media_urls = [m.get('media_url_https') or m.get('media_url') for m in media]
+
+    return {
+        'tweet_id': data.get('id_str') or str(data['id']),
+        'author_id': data.get('user_id_str', ''),
+        'conversation_id': '',
+        'in_reply_to_tweet_id': data.get('in_reply_to_status_id_str') or '',
+        'in_reply_to_user_id': data.get('in_reply_to_user_id_str') or '',
+        'tweet_type': tweet_type,
+        'text': text,
+        'created_at': _parse_datetime(data['created_at']),
+        'retweet_count': int(data.get('retweet_count', 0)),
+        'reply_count': int(data.get('reply_count', 0)),
+        'like_count': int(data.get('favorite_count', 0)),
+        'quote_count': int(data.get('quote_count', 0)),
+        'referenced_tweet_id': referenced_tweet_id,
+        'retweeted_tweet_id': retweeted_tweet_id,
+        'has_media': bool(media_urls),
+        'media_urls': [url for url in media_urls if url],
+    }
+
+
+def iter_parsed(path, fmt=None):
+    """按格式流式读取并解析文件, 依次产出解析后的推文字典"""
+    fmt = fmt or detect_format(path)
+    if fmt == 'archive':
+        for data, _ in iter_archive(path):
+            yield parse_archive_tweet(data)
+    else:
+        for data, media_dict in iter_ndjson(path):
+            yield parse_api_tweet(data, media_dict)
@@ -0,0 +1,148 @@
+"""
+新推文/回复的实时推送
+
+监控任务在写入提交后把新推文、新回复发布到 Redis Stream (LIVE_STREAM_KEY),
+Web 端的 SSE 接口 (/twitter/live/) 从 Stream 读取后推送给浏览器和 API 客户端:
+- Stream 保留最近 LIVE_STREAM_MAXLEN 条事件, 断线重连时按 Last-Event-ID 补发
+- 每个 SSE 连接独立阻塞读取, 由 Redis 负责扇出, Web 进程不需要轮询数据库
+- 同一进程的 SSE 连接共用一个异步客户端 (连接池), 阻塞读取时从池中借出连接, 不再为每个连接新建连接池
+
+事件格式 (SSE data 字段, JSON):
+    {"type": "tweet", "id": "推文 ID", "pk": 推文主键, "author": 监控用户主键}
+    {"type": "reply", "id": "回复 ID", "tweet": 原推文主键, "author": 原推文作者 (监控用户主键)}
+
+未配置 REDIS_URL 时不发布事件, SSE 接口返回 503。
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+LIVE_STREAM_KEY = 'twitter:live'
+EVENT_TYPES = ('tweet', 'reply')
+# 阻塞读取的超时 (毫秒), 超时后发送心跳注释, 防止代理断开空闲连接
+BLOCK_MS = 15000
+
+_client = None
+# 事件循环 -> 异步客户端; 连接池绑定在创建它的事件循环上
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _redis():
+    """发布使用的同步 Redis 客户端, 未配置 REDIS_URL 时返回 None"""
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _async_redis():
+    """
+    SSE 读取使用的异步 Redis 客户端
+
+    uvicorn worker 只有一个事件循环, 整个进程的 SSE 连接共用一个客户端;
+    开发服务器等每个请求使用独立事件循环的环境下, 按事件循环分别创建。
+    """
+    import redis.asyncio
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        _async_clients[loop] = client
+    return client
+
+
+def tweet_event(tweet):
+    """新推文事件"""
+    return {'type': 'tweet', 'id': str(tweet.tweet_id), 'pk': tweet.id, 'author': tweet.author_id}
+
+
+def reply_event(reply_id, tweet):
+    """新回复事件, author 为被回复推文的作者"""
+    return {'type': 'reply', 'id': reply_id, 'tweet': tweet.id, 'author': tweet.author_id}
+
+
+def publish(events):
+    """
+    在当前事务提交后发布事件 (不在事务中时立即发布)
+
+    事务回滚时不会发布, 订阅方收到的 ID 一定能在数据库中查到。
+
+    Args:
+        events: tweet_event / reply_event 返回的字典列表
+    """
+    if not events or _redis() is None:
+        return
+    events = list(events)
+    transaction.on_commit(lambda: _publish(events))
+
+
+def _publish(events):
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                LIVE_STREAM_KEY,
+                {'type': event['type'], 'author': event['author'] or '', 'data': json.dumps(event)},
+                maxlen=settings.LIVE_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipe.execute()
+    except Exception as e:
+        # 推送失败不影响监控, 页面刷新时仍能看到数据
+        logger.warning(f"发布实时事件失败: {str(e)}")
+
+
+def _format(entry_id, fields):
+    return f"id: {entry_id}\nevent: {fields['type']}\ndata: {fields['data']}\n\n"
+
+
+async def stream(last_event_id=None, authors=None, types=None):
+    """
+    SSE 事件流 (async 生成器)
+
+    Args:
+        last_event_id: 上次收到的事件 ID, 从它之后开始补发; 为空时只推送新事件
+        authors: 只推送这些监控用户 (主键字符串) 的事件, 为空时不过滤
+        types: 只推送这些类型的事件, 为空时不过滤
+
+    Yields:
+        str: SSE 格式的文本
+    """
+    client = _async_redis()
+    if last_event_id:
+        cursor = last_event_id
+    else:
+        latest = await client.xrevrange(LIVE_STREAM_KEY, count=1)
+        cursor = latest[0][0] if latest else '0-0'
+
+    # 浏览器断线后 3 秒重连, 并自动带上 Last-Event-ID
+    yield 'retry: 3000\n\n'
+    while True:
+        try:
+            response = await client.xread({LIVE_STREAM_KEY: cursor}, block=BLOCK_MS, count=100)
+        except asyncio.CancelledError:
+            # 客户端断开时 Django 取消响应任务: 客户端在取消时会断开正在阻塞读取的连接
+            # (服务端的 XREAD 随之结束), 连接不会带着未读完的响应回到池中
+            logger.debug("SSE 客户端断开, 停止读取")
+            raise
+        if not response:
+            yield ': keepalive\n\n'
+            continue
+        for entry_id, fields in response[0][1]:
+            cursor = entry_id
+            if authors and fields.get('author') not in authors:
+                continue
+            if types and fields.get('type') not in types:
+                continue
+            yield _format(entry_id, fields)
@@ -0,0 +1,182 @@
+"""
+分布式锁 (single-flight)
+
+防止同一监控周期或同一用户的监控任务并发执行:
+- 锁有租约 (TTL), 持有期间后台线程定期续约; 进程崩溃时锁在租约到期后自动释放
+- 锁的值是持有者标识 (通常是 Celery 任务 ID), 其它请求可以据此合并到正在执行的任务
+
+配置了 REDIS_URL 时使用 Redis (SET NX PX + Lua 校验持有者后续约/释放),
+否则退回 Django 缓存, 仅适用于单进程开发环境。
+
+锁服务不可用时 acquire 抛出 LockUnavailable, 由调用方决定跳过还是不加锁执行。
+"""
+
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = 'twitter:lock:'
+
+CYCLE_LOCK = 'monitor:cycle'
+
+# 只有持有者才能续约/释放
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _redis():
+    """共享的 Redis 客户端, 未配置 REDIS_URL 时返回 None"""
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+class LockUnavailable(Exception):
+    """锁服务 (Redis / 缓存) 不可用, 无法判断锁是否空闲"""
+
+
+def user_lock_name(user_id):
+    """单个用户监控锁的名称"""
+    return f'monitor:user:{user_id}'
+
+
+def owner(name):
+    """
+    当前持有锁的标识
+
+    Returns:
+        str: 持有者标识, 锁空闲时返回 None
+    """
+    key = LOCK_PREFIX + name
+    try:
+        client = _redis()
+        return client.get(key) if client else cache.get(key)
+    except Exception as e:
+        logger.warning(f"读取锁状态失败 {name}: {str(e)}")
+        return None
+
+
+class LeaseLock:
+    """
+    带租约的分布式锁
+
+    用法:
+        with LeaseLock(CYCLE_LOCK) as acquired:
+            if not acquired:
+                return  # 已有任务在执行
+            ...
+    """
+
+    def __init__(self, name, owner=None, ttl=None):
+        """
+        Args:
+            name: 锁名称
+            owner: 持有者标识, 默认随机生成
+            ttl: 租约时长 (秒), 默认 MONITOR_LOCK_TTL
+        """
+        self.name = name
+        self.key = LOCK_PREFIX + name
+        self.owner = owner or uuid.uuid4().hex
+        self.ttl = ttl or settings.MONITOR_LOCK_TTL
+        self.acquired = False
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def acquire(self):
+        """
+        尝试获取锁 (不阻塞), 成功后开始自动续约
+
+        Returns:
+            bool: 是否获取到锁
+
+        Raises:
+            LockUnavailable: 锁服务不可用
+        """
+        try:
+            client = _redis()
+            if client:
+                self.acquired = bool(client.set(self.key, self.owner, nx=True, px=int(self.ttl * 1000)))
+            else:
+                self.acquired = cache.add(self.key, self.owner, timeout=self.ttl)
+        except Exception as e:
+            self.acquired = False
+            raise LockUnavailable(f"获取锁失败 {self.name}: {str(e)}") from e
+
+        if self.acquired:
+            self._stop.clear()
+            self._renewer = threading.Thread(target=self._renew_loop, daemon=True)
+            self._renewer.start()
+        return self.acquired
+
+    def renew(self):
+        """
+        续约
+
+        Returns:
+            bool: 是否仍持有锁
+        """
+        client = _redis()
+        if client:
+            return bool(client.eval(RENEW_SCRIPT, 1, self.key, self.owner, int(self.ttl * 1000)))
+        if cache.get(self.key) != self.owner:
+            return False
+        return cache.touch(self.key, self.ttl)
+
+    def release(self):
+        """释放锁 (只删除自己持有的锁)"""
+        if not self.acquired:
+            return
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join(timeout=5)
+        self.acquired = False
+
+        try:
+            client = _redis()
+            if client:
+                client.eval(RELEASE_SCRIPT, 1, self.key, self.owner)
+            elif cache.get(self.key) == self.owner:
+                cache.delete(self.key)
+        except Exception as e:
+            # 释放失败时等待租约到期
+            logger.warning(f"释放锁失败 {self.name}: {str(e)}")
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.renew():
+                    logger.warning(f"锁 {self.name} 已丢失 (租约过期或被其它进程获取)")
+                    return
+            except Exception as e:
+                logger.warning(f"锁续约失败 {self.name}: {str(e)}")
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
@@ -0,0 +1,88 @@
+"""
+检查 Web 进程的启动导入耗时
+
+在子进程中用 python -X importtime 导入 ASGI 应用和 URL 配置 (与 gunicorn worker 处理第一个请求前的导入相同),
+汇总导入耗时并与预算比较; 导入了只有 Celery Worker 才需要的包 (tweepy、NumPy 等) 时同样视为失败。
+
+使用方法:
+    python manage.py check_import_time [--budget-ms 1500] [--repeat 3] [--forbid tweepy numpy] [--top 10]
+"""
+
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# 导入 ASGI 应用后再加载 URL 配置, 视图模块在第一个请求时才会导入
+IMPORT_SCRIPT = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings'); "
+    "import mysite.asgi; "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+# Web 进程不应该在启动时导入的包
+DEFAULT_FORBIDDEN = ['tweepy', 'numpy']
+
+
+def parse_importtime(output):
+    """
+    解析 -X importtime 的输出
+
+    Returns:
+        list: [(模块名, 自身耗时微秒, 累计耗时微秒, 嵌套层级), ...]
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return modules
+
+
+class Command(BaseCommand):
+    help = '检查 Web 进程的启动导入耗时是否超出预算'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=1500, help='导入总耗时预算 (毫秒)')
+        parser.add_argument('--repeat', type=int, default=3, help='测量次数, 取最小值以减少波动')
+        parser.add_argument('--forbid', nargs='*', default=DEFAULT_FORBIDDEN, help='启动时不允许导入的包')
+        parser.add_argument('--top', type=int, default=10, help='输出自身耗时最多的顶层包数量')
+
+    def _measure(self):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+            capture_output=True,
+            text=True,
+            env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        )
+        if result.returncode != 0:
+            raise CommandError(f'导入失败:\n{result.stderr[-2000:]}')
+        return parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self._measure() for _ in range(max(options['repeat'], 1))]
+        totals = [sum(cumulative for _, _, cumulative, level in modules if level == 0) for modules in runs]
+        modules = runs[totals.index(min(totals))]
+        total_ms = min(totals) / 1000
+
+        # 按顶层包汇总自身耗时
+        packages = {}
+        for name, self_us, _, _ in modules:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+        self.stdout.write(f'导入 {len(modules)} 个模块, 耗时 {total_ms:.0f} ms (预算 {options["budget_ms"]:.0f} ms)')
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {package:<30} {self_us / 1000:8.1f} ms')
+
+        imported = {name for name, _, _, _ in modules}
+        forbidden = [package for package in options['forbid'] if package in imported]
+        errors = []
+        if forbidden:
+            errors.append(f'启动时导入了 {", ".join(forbidden)}')
+        if total_ms > options['budget_ms']:
+            errors.append(f'导入耗时 {total_ms:.0f} ms 超出预算 {options["budget_ms"]:.0f} ms')
+        if errors:
+            raise CommandError('; '.join(errors))
+        self.stdout.write(self.style.SUCCESS('✓ 启动导入耗时在预算内'))
@@ -0,0 +1,206 @@
+"""
+批量导入历史推文的管理命令
+
+使用方法:
+    python manage.py import_tweets <file> [--username USER] [--replies]
+
+示例:
+    python manage.py import_tweets tweets.ndjson                  # 按 author_id 匹配监控用户
+    python manage.py import_tweets data/tweets.js --username elonmusk   # 导入存档, 全部归属指定用户
+    python manage.py import_tweets replies.ndjson --replies       # 按 conversation_id 作为回复导入
+
+中断后重新运行同一命令会从检查点继续, 使用 --restart 从头开始。
+"""
+
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from twitter_monitor.bulk import upsert_rows
+from twitter_monitor.importers import iter_parsed
+from twitter_monitor.models import MonitoredUser, Tweet, Reply, TwitterAccount
+from twitter_monitor.threads import build_paths
+
+TWEET_FIELDS = [
+    'tweet_id', 'tweet_type', 'text', 'created_at',
+    'retweet_count', 'reply_count', 'like_count', 'quote_count',
+    'referenced_tweet_id', 'retweeted_tweet_id', 'has_media', 'media_urls',
+]
+
+
+class Command(BaseCommand):
+    help = '从 NDJSON 或 Twitter 存档 (tweets.js) 批量导入历史推文'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='NDJSON 文件或存档中的 tweets.js')
+        parser.add_argument(
+            '--format',
+            choices=['auto', 'ndjson', 'archive'],
+            default='auto',
+            help='输入格式, 默认自动识别'
+        )
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='将所有推文归属到该监控用户 (存档导出不含作者 ID 时使用)'
+        )
+        parser.add_argument(
+            '--replies',
+            action='store_true',
+            help='作为回复导入, 按 conversation_id 关联已存在的原推文 (包括非监控用户的回复)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批写入的行数')
+        parser.add_argument('--checkpoint', type=str, help='检查点文件路径, 默认 <path>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='忽略已有检查点, 从头导入')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'文件不存在: {path}')
+
+        self.replies = options['replies']
+        self.fixed_author = None
+        if options['username']:
+            username = options['username'].strip().lstrip('@')
+            try:
+                self.fixed_author = MonitoredUser.objects.get(username=username).id
+            except MonitoredUser.DoesNotExist:
+                raise CommandError(f'用户 @{username} 不在监控列表中')
+        self.authors = dict(MonitoredUser.objects.values_list('user_id', 'id'))
+
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        skip = 0 if options['restart'] else self._load_checkpoint(checkpoint_path)
+        if skip:
+            self.stdout.write(f'从检查点继续: 跳过前 {skip} 条记录')
+
+        fmt = None if options['format'] == 'auto' else options['format']
+        chunk_size = options['chunk_size']
+
+        self.written = 0
+        self.skipped = 0
+        processed = skip
+        chunk = []
+        started = time.monotonic()
+
+        for index, record in enumerate(iter_parsed(path, fmt)):
+            if index < skip:
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                self._flush(chunk)
+                processed = index + 1
+                self._save_checkpoint(checkpoint_path, processed)
+                chunk = []
+                self._report(processed, started)
+
+        if chunk:
+            self._flush(chunk)
+            processed += len(chunk)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ 导入完成\n"
+                f"  处理记录: {processed}\n"
+                f"  写入: {self.written}\n"
+                f"  跳过: {self.skipped}\n"
+                f"  耗时: {elapsed:.1f} 秒"
+            )
+        )
+
+    def _author_for(self, record):
+        if self.fixed_author:
+            return self.fixed_author
+        return self.authors.get(record['author_id'])
+
+    def _flush(self, chunk):
+        if self.replies:
+            rows = self._reply_rows(chunk)
+            self.written += upsert_rows(Reply, rows, 'reply_id')
+        else:
+            rows = self._tweet_rows(chunk)
+            self.written += upsert_rows(Tweet, rows, 'tweet_id')
+        self.skipped += len(chunk) - len(rows)
+
+    def _tweet_rows(self, chunk):
+        rows = []
+        for record in chunk:
+            author_id = self._author_for(record)
+            if not author_id:
+                continue
+            row = {field: record[field] for field in TWEET_FIELDS}
+            row['author_id'] = author_id
+            rows.append(row)
+        return rows
+
+    def _reply_rows(self, chunk):
+        conversation_ids = {r['conversation_id'] for r in chunk if r['conversation_id']}
+        tweets = dict(
+            Tweet.objects.filter(tweet_id__in=conversation_ids).values_list('tweet_id', 'id')
+        )
+
+        replies = [
+            {**r, 'reply_id': r['tweet_id']}
+            for r in chunk if r['conversation_id'] in tweets and r['tweet_id'] != r['conversation_id']
+        ]
+        parent_ids = {r['in_reply_to_tweet_id'] for r in replies if r['in_reply_to_tweet_id']}
+        known_paths = dict(
+            Reply.objects.filter(reply_id__in=parent_ids).values_list('reply_id', 'path')
+        )
+        paths = build_paths(replies, known_paths)
+
+        # 非监控用户的回复也保留, 作者记录到 TwitterAccount
+        author_ids = {r['author_id'] for r in replies if r['author_id']}
+        TwitterAccount.objects.bulk_create(
+            [TwitterAccount(user_id=user_id) for user_id in author_ids],
+            ignore_conflicts=True,
+        )
+        accounts = dict(
+            TwitterAccount.objects.filter(user_id__in=author_ids).values_list('user_id', 'id')
+        )
+
+        rows = []
+        for record in replies:
+            author_id = self._author_for(record)
+            account_id = accounts.get(record['author_id'])
+            if not author_id and not account_id:
+                continue
+            path, depth = paths[record['reply_id']]
+            rows.append({
+                'reply_id': record['reply_id'],
+                'tweet_id': tweets[record['conversation_id']],
+                'author_id': author_id,
+                'account_id': account_id,
+                'text': record['text'],
+                'created_at': record['created_at'],
+                'in_reply_to_tweet_id': record['in_reply_to_tweet_id'],
+                'in_reply_to_user_id': record['in_reply_to_user_id'],
+                'path': path,
+                'depth': depth,
+                'like_count': record['like_count'],
+                'reply_count': record['reply_count'],
+            })
+        return rows
+
+    def _load_checkpoint(self, checkpoint_path):
+        if not os.path.exists(checkpoint_path):
+            return 0
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('records', 0)
+
+    def _save_checkpoint(self, checkpoint_path, processed):
+        # 先写临时文件再替换, 避免中断时留下损坏的检查点
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'records': processed}, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _report(self, processed, started):
+        elapsed = time.monotonic() - started
+        rate = self.written / elapsed * 60 if elapsed else 0
+        self.stdout.write(f'  已处理 {processed} 条, 写入 {self.written} 条 ({rate:,.0f} 行/分钟)')
@@ -0,0 +1,54 @@
+"""
+为已入库但还没有指纹的推文计算 SimHash 指纹并归入近似重复簇
+
+监控和回填会自动计算新推文的指纹, 本命令用于启用查重之前的历史数据
+以及 import_tweets 导入的推文。
+
+使用方法:
+    python manage.py index_duplicates [--chunk-size 1000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from twitter_monitor import duplicates
+from twitter_monitor.models import Tweet
+
+
+class Command(BaseCommand):
+    help = '为没有指纹的推文计算 SimHash 指纹 (近似重复检测)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批处理的推文数')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+        processed = 0
+        found = 0
+        last_id = 0
+
+        # 按主键顺序分批, 先入库的推文成为簇的第一条
+        while True:
+            chunk = list(
+                Tweet.objects.filter(id__gt=last_id, fingerprint__isnull=True)
+                .order_by('id')
+                .only('id', 'text', 'tweet_type')[:chunk_size]
+            )
+            if not chunk:
+                break
+            found += duplicates.index(chunk)
+            processed += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'  已处理 {processed} 条推文, 近似重复 {found} 条')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ 完成\n"
+                f"  处理推文: {processed}\n"
+                f"  近似重复: {found}\n"
+                f"  耗时: {elapsed:.1f} 秒"
+            )
+        )
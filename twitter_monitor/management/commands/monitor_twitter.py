@@ -48,6 +48,19 @@ class Command(BaseCommand):
                         f"{result['replies']} 条回复"
                     )
                 )
+            elif result.get('status') == 'partial':
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"监控部分完成: {result['tweets']} 条推文, "
+                        f"{result['replies']} 条回复 (回复抓取触发速率限制)"
+                    )
+                )
+            elif result.get('status') == 'rate_limited':
+                raise CommandError(f"触发速率限制, 请 {result['retry_after']} 秒后重试")
+            elif result.get('status') == 'in_progress':
+                self.stdout.write(
+                    self.style.WARNING(f"该用户的监控正在执行 ({result['task_id']}), 已跳过")
+                )
             else:
                 raise CommandError(f"监控失败: {result.get('error', '未知错误')}")
         else:
@@ -61,6 +74,8 @@ class Command(BaseCommand):
                     f"  总用户数: {result['total_users']}\n"
                     f"  成功: {result['success']}\n"
                     f"  失败: {result['failed']}\n"
+                    f"  跳过 (正在执行): {result['in_progress']}\n"
+                    f"  速率限制: {len(result['rate_limited'])}\n"
                     f"  总推文: {result['total_tweets']}\n"
                     f"  总回复: {result['total_replies']}"
                 )
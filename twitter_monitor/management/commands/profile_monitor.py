@@ -0,0 +1,171 @@
+"""
+对监控流程做性能分析的管理命令
+
+使用方法:
+    python manage.py profile_monitor [--user USER] [--synthetic N | --replay FILE | --record FILE]
+
+示例:
+    python manage.py profile_monitor --synthetic 100               # 合成数据, 不访问 API
+    python manage.py profile_monitor --user elonmusk --record run.ndjson   # 调用真实 API 并录制响应
+    python manage.py profile_monitor --user elonmusk --replay run.ndjson   # 回放录制的响应
+    python manage.py profile_monitor --synthetic 100 --tracemalloc
+
+结果写入 pstats 文件 (默认 profile_monitor.prof), 可用 snakeviz 查看,
+或用 flameprof 转换为火焰图。合成数据和回放模式下写入的数据默认回滚。
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from twitter_monitor.metrics import TIMING_FIELDS
+from twitter_monitor.models import MonitoredUser, MonitorLog
+from twitter_monitor.profiling import (
+    OfflineClient, QueryCounter, RecordingSession, ReplaySession, SyntheticSession,
+)
+from twitter_monitor.services import TwitterMonitorService, TwitterService
+
+SYNTHETIC_USERNAME = 'profile_synthetic'
+# 与真实 Twitter 用户 ID 位数相近, 路由归一化依赖多位数字
+SYNTHETIC_USER_ID = '1000000000000000001'
+
+
+class Command(BaseCommand):
+    help = '在 cProfile 下运行 monitor_user / monitor_all_users, 输出耗时最多的函数和各阶段 SQL 查询数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='只监控该用户, 留空则监控所有启用的用户')
+
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--synthetic', type=int, metavar='N', help='使用合成数据, 每个用户 N 条新推文')
+        source.add_argument('--replay', type=str, metavar='FILE', help='回放 --record 录制的响应')
+        source.add_argument('--record', type=str, metavar='FILE', help='调用真实 API 并把响应录制到文件')
+
+        parser.add_argument('--replies-per-tweet', type=int, default=20, help='合成数据中每条推文的回复数')
+        parser.add_argument('--tracemalloc', action='store_true', help='同时统计内存分配')
+        parser.add_argument('--output', type=str, default='profile_monitor.prof', help='pstats 输出文件')
+        parser.add_argument('--top', type=int, default=30, help='输出耗时最多的前 N 个函数')
+        parser.add_argument('--sort', type=str, default='cumulative', help='排序方式 (cumulative / tottime / calls)')
+        parser.add_argument('--keep', action='store_true', help='保留合成数据/回放模式下写入的数据')
+
+    def handle(self, *args, **options):
+        offline = options['synthetic'] is not None or options['replay']
+        service, session = self._build_service(options)
+
+        # 真实 API 模式下数据正常写入; 离线模式默认在事务中执行后回滚
+        rollback = offline and not options['keep']
+        try:
+            if rollback:
+                with transaction.atomic():
+                    self._run(service, options, offline)
+                    transaction.set_rollback(True)
+                self.stdout.write('已回滚本次写入的数据')
+            else:
+                self._run(service, options, offline)
+        finally:
+            if session is not None:
+                session.close()
+
+    def _build_service(self, options):
+        if options['synthetic'] is not None:
+            session = SyntheticSession(options['synthetic'], options['replies_per_tweet'])
+        elif options['replay']:
+            session = ReplaySession(options['replay'])
+        else:
+            session = RecordingSession(options['record']) if options['record'] else None
+            try:
+                twitter_service = TwitterService()
+            except ValueError as e:
+                raise CommandError(str(e))
+            if session is not None:
+                twitter_service.client.session = session
+            return TwitterMonitorService(twitter_service), session
+
+        client = OfflineClient(bearer_token='offline')
+        client.session = session
+        return TwitterMonitorService(TwitterService(client=client)), session
+
+    def _users(self, options, offline):
+        if options['user']:
+            username = options['user'].strip().lstrip('@')
+            user = MonitoredUser.objects.filter(username=username).first()
+            if user is None:
+                if not offline:
+                    raise CommandError(f'用户 @{username} 不在监控列表中')
+                user = MonitoredUser.objects.create(
+                    username=username, user_id=SYNTHETIC_USER_ID, display_name=username
+                )
+            return user
+
+        if offline and not MonitoredUser.objects.filter(is_active=True).exists():
+            MonitoredUser.objects.create(
+                username=SYNTHETIC_USERNAME, user_id=SYNTHETIC_USER_ID, display_name=SYNTHETIC_USERNAME
+            )
+        return None
+
+    def _run(self, service, options, offline):
+        user = self._users(options, offline)
+        last_log_id = MonitorLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        counter = QueryCounter()
+        profiler = cProfile.Profile()
+        if options['tracemalloc']:
+            tracemalloc.start(25)
+
+        self.stdout.write(f"开始分析: {'@' + user.username if user else '所有启用的用户'}")
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            profiler.enable()
+            try:
+                result = service.monitor_user(user) if user else service.monitor_all_users()
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        snapshot = None
+        if options['tracemalloc']:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        profiler.dump_stats(options['output'])
+
+        self.stdout.write(self.style.SUCCESS(f'✓ 完成: {result}, 总耗时 {elapsed:.2f} 秒'))
+        self._print_phases(last_log_id)
+        self._print_queries(counter)
+        self._print_functions(profiler, options['sort'], options['top'])
+        if snapshot is not None:
+            self._print_memory(snapshot, peak, options['top'])
+        self.stdout.write(f"\npstats 文件: {options['output']} (snakeviz / flameprof 可直接读取)")
+
+    def _print_phases(self, last_log_id):
+        totals = MonitorLog.objects.filter(id__gt=last_log_id).aggregate(
+            **{field: Sum(field) for field in TIMING_FIELDS}
+        )
+        self.stdout.write('\n各阶段耗时 (MonitorLog 汇总):')
+        for field in TIMING_FIELDS:
+            self.stdout.write(f'  {field:<22} {totals[field] or 0:>12,}')
+
+    def _print_queries(self, counter):
+        self.stdout.write('\n各阶段 SQL 查询:')
+        for phase in sorted(counter.queries, key=counter.seconds.get, reverse=True):
+            self.stdout.write(
+                f'  {phase:<22} {counter.queries[phase]:>8} 次 {counter.seconds[phase] * 1000:>10.1f} ms'
+            )
+
+    def _print_functions(self, profiler, sort, top):
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(top)
+        self.stdout.write(f'\n耗时最多的函数 (按 {sort} 排序):')
+        self.stdout.write(stream.getvalue())
+
+    def _print_memory(self, snapshot, peak, top):
+        self.stdout.write(f'内存分配 (峰值 {peak / 1024 / 1024:.1f} MB):')
+        for stat in snapshot.statistics('lineno')[:top]:
+            self.stdout.write(f'  {stat}')
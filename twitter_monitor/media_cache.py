@@ -0,0 +1,187 @@
+"""
+媒体缓存
+
+把推文媒体和用户头像保存到 STORAGES['media_cache'] (本地目录或 S3 兼容的对象存储),
+以内容的 SHA-256 命名 (内容寻址), 相同内容只保存一份。Web 与 Worker 读写同一个存储:
+Worker 下载文件并登记到 MediaCacheFile, Web 返回 url() 给出的地址。
+
+缓存总大小超过 MEDIA_CACHE_MAX_BYTES 时按最近使用时间淘汰最旧的文件。大小和使用时间
+记录在数据库中 (Worker 下载到相同内容时更新使用时间), 淘汰不需要遍历存储,
+处理请求时也不写入任何东西。
+"""
+
+import hashlib
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.urls import reverse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+NAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'video/mp4': 'mp4',
+}
+
+DOWNLOAD_TIMEOUT = 20
+MAX_FILE_BYTES = 50 * 1024 * 1024
+
+
+def storage():
+    return storages['media_cache']
+
+
+def path_for(name):
+    """缓存文件在存储中的路径, 按哈希前两位分目录"""
+    return f'{name[:2]}/{name}'
+
+
+def url(name):
+    """缓存文件的访问地址: 配置了 MEDIA_CACHE_PUBLIC_URL 时直接指向存储, 否则由 Web 进程返回"""
+    if settings.MEDIA_CACHE_PUBLIC_URL:
+        return f'{settings.MEDIA_CACHE_PUBLIC_URL}/{path_for(name)}'
+    return reverse('twitter_monitor:media_cache', args=[name])
+
+
+def open_file(name):
+    """校验文件名并打开已缓存的文件, 不存在时返回 None"""
+    if not NAME_PATTERN.match(name):
+        return None
+    try:
+        return storage().open(path_for(name), 'rb')
+    except FileNotFoundError:
+        return None
+
+
+def store(content, extension):
+    """
+    保存内容到缓存
+
+    Returns:
+        str: 缓存文件名 (<sha256>.<扩展名>)
+    """
+    name = f'{hashlib.sha256(content).hexdigest()}.{extension}'
+    path = path_for(name)
+    cache_storage = storage()
+    if cache_storage.exists(path):
+        return name
+
+    saved = cache_storage.save(path, ContentFile(content))
+    if saved != path:
+        # 其它线程同时保存了相同内容, 本地存储会换一个文件名, 删除多出的副本
+        cache_storage.delete(saved)
+    return name
+
+
+def _extension_for(response, url):
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+    if content_type in CONTENT_TYPE_EXTENSIONS:
+        return CONTENT_TYPE_EXTENSIONS[content_type]
+    suffix = PurePosixPath(url.split('?')[0]).suffix.lstrip('.').lower()
+    return suffix if suffix and len(suffix) <= 5 else 'bin'
+
+
+def _download(session, url):
+    try:
+        with session.get(url, timeout=DOWNLOAD_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            content = response.raw.read(MAX_FILE_BYTES + 1, decode_content=True)
+            if len(content) > MAX_FILE_BYTES:
+                logger.warning(f"媒体文件过大, 跳过缓存: {url}")
+                return None
+            return store(content, _extension_for(response, url)), len(content)
+    except Exception as e:
+        logger.warning(f"下载媒体失败 {url}: {str(e)}")
+        return None
+
+
+def download_all(items, workers=None):
+    """
+    并发下载一批 URL 到缓存, 并登记文件大小和使用时间
+
+    Args:
+        items: [(key, url), ...]
+        workers: 并发下载线程数
+
+    Returns:
+        dict: key -> 缓存文件名 (失败为 None)
+    """
+    workers = workers or settings.MEDIA_CACHE_WORKERS
+    if not items:
+        return {}
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        files = list(executor.map(lambda item: _download(session, item[1]), items))
+
+    record({name: size for name, size in filter(None, files)})
+    return {key: file[0] if file else None for (key, _), file in zip(items, files)}
+
+
+def record(sizes):
+    """
+    登记缓存文件并更新最近使用时间
+
+    Args:
+        sizes: 文件名 -> 字节数
+    """
+    from .bulk import upsert_rows
+    from .models import MediaCacheFile
+
+    now = timezone.now()
+    upsert_rows(
+        MediaCacheFile,
+        [{'name': name, 'size_bytes': size, 'last_used_at': now} for name, size in sizes.items()],
+        'name',
+    )
+
+
+def evict(max_bytes=None):
+    """
+    淘汰最久未使用的文件, 使缓存总大小不超过 max_bytes
+
+    Returns:
+        list: 被删除的缓存文件名
+    """
+    from django.db.models import Sum
+    from .models import MediaCacheFile
+
+    max_bytes = max_bytes if max_bytes is not None else settings.MEDIA_CACHE_MAX_BYTES
+    total = MediaCacheFile.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+    if total <= max_bytes:
+        return []
+
+    cache_storage = storage()
+    evicted = []
+    oldest = MediaCacheFile.objects.order_by('last_used_at', 'id').values_list('name', 'size_bytes')
+    for name, size in oldest.iterator():
+        if total <= max_bytes:
+            break
+        try:
+            cache_storage.delete(path_for(name))
+        except OSError as e:
+            logger.warning(f"删除缓存文件失败 {name}: {str(e)}")
+            continue
+        total -= size
+        evicted.append(name)
+
+    if evicted:
+        MediaCacheFile.objects.filter(name__in=evicted).delete()
+        logger.info(f"媒体缓存淘汰 {len(evicted)} 个文件")
+    return evicted
@@ -0,0 +1,238 @@
+"""
+Prometheus 指标
+
+Web 进程通过 /metrics 暴露指标; Celery worker 设置 CELERY_METRICS_PORT 后
+在该端口单独暴露。gunicorn 多 worker 或 Celery prefork 进程池下需要设置
+PROMETHEUS_MULTIPROC_DIR, 由各进程写入共享目录后汇总。
+
+指标:
+- twitter_api_request_seconds: API 调用耗时 (按端点、状态码)
+- twitter_api_rate_limited_total: 429 次数 (按端点)
+- twitter_monitor_rows_written_total: 写入行数 (按模型)
+- twitter_monitor_phase_seconds: monitor_user 各阶段耗时
+- celery_task_queue_lag_seconds: 任务从发布 (或 ETA) 到开始执行的等待时间
+- celery_task_seconds: 任务执行耗时
+- twitter_monitor_rows_deleted_total: cleanup_old_data_task 归档后从数据库删除的行数 (按模型)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from celery import signals
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY,
+    generate_latest, multiprocess, start_http_server,
+)
+
+logger = logging.getLogger(__name__)
+
+API_REQUEST_SECONDS = Histogram(
+    'twitter_api_request_seconds',
+    'Twitter API 请求耗时',
+    ['endpoint', 'status'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+API_RATE_LIMITED = Counter(
+    'twitter_api_rate_limited_total',
+    'Twitter API 返回 429 的次数',
+    ['endpoint'],
+)
+ROWS_WRITTEN = Counter(
+    'twitter_monitor_rows_written_total',
+    '写入数据库的行数',
+    ['model'],
+)
+ROWS_DELETED = Counter(
+    'twitter_monitor_rows_deleted_total',
+    '清理任务删除的行数',
+    ['model'],
+)
+MONITOR_PHASE_SECONDS = Histogram(
+    'twitter_monitor_phase_seconds',
+    'monitor_user 各阶段耗时',
+    ['phase'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+TASK_QUEUE_LAG_SECONDS = Histogram(
+    'celery_task_queue_lag_seconds',
+    'Celery 任务在队列中等待的时间',
+    ['task'],
+    buckets=(0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+TASK_SECONDS = Histogram(
+    'celery_task_seconds',
+    'Celery 任务执行耗时',
+    ['task', 'state'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+
+SENT_AT_HEADER = 'sent_at'
+
+
+_local = threading.local()
+
+
+def current_phase():
+    """当前线程正在执行的 PhaseTimer 阶段, 不在任何阶段内时返回 None"""
+    return getattr(_local, 'phase', None)
+
+
+class PhaseTimer:
+    """
+    累计一次监控中各阶段的耗时
+
+    同一阶段可以多次进入 (例如逐条推文抓取回复), 耗时累加。
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name):
+        previous = current_phase()
+        _local.phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            _local.phase = previous
+
+    def observe(self):
+        """把各阶段耗时写入 twitter_monitor_phase_seconds"""
+        for name, seconds in self.durations.items():
+            MONITOR_PHASE_SECONDS.labels(phase=name).observe(seconds)
+
+    def ms(self, *names):
+        """若干阶段的累计耗时 (毫秒)"""
+        return int(sum(self.durations.get(name, 0) for name in names) * 1000)
+
+
+def percentile(values, pct):
+    """线性插值的百分位数, values 为空时返回 None"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+TIMING_FIELDS = [
+    'duration_ms', 'fetch_tweets_ms', 'fetch_replies_ms', 'db_write_ms',
+    'rate_limit_wait_ms', 'api_calls', 'bytes_received',
+]
+
+
+def monitor_p95_by_user(logs):
+    """
+    按用户计算监控日志各项耗时的 p95
+
+    Args:
+        logs: MonitorLog 查询集
+
+    Returns:
+        list: [{'user_id', 'username', 'runs', 'duration_ms', ...}], 按总耗时 p95 降序
+    """
+    samples = defaultdict(lambda: defaultdict(list))
+    usernames = {}
+    for row in logs.values('user_id', 'user__username', *TIMING_FIELDS):
+        usernames[row['user_id']] = row['user__username']
+        for field in TIMING_FIELDS:
+            samples[row['user_id']][field].append(row[field])
+
+    result = []
+    for user_id, fields in samples.items():
+        entry = {
+            'user_id': user_id,
+            'username': usernames[user_id],
+            'runs': len(fields['duration_ms']),
+        }
+        for field, values in fields.items():
+            entry[field] = int(percentile(values, 95))
+        result.append(entry)
+    return sorted(result, key=lambda entry: entry['duration_ms'], reverse=True)
+
+
+def registry():
+    """当前进程用于导出的 registry, 多进程模式下汇总共享目录中的数据"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return collector_registry
+    return REGISTRY
+
+
+def render():
+    """
+    生成 Prometheus 文本格式的指标
+
+    Returns:
+        tuple: (内容, Content-Type)
+    """
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+# Celery 任务指标
+
+_task_started = {}
+
+
+@signals.before_task_publish.connect
+def _stamp_sent_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
+def _queued_since(request):
+    """任务可以开始执行的时间: 延迟任务从 ETA 算起, 否则从发布时间算起"""
+    if request.eta:
+        eta = request.eta
+        if isinstance(eta, str):
+            eta = datetime.fromisoformat(eta)
+        return eta.timestamp()
+    sent_at = getattr(request, SENT_AT_HEADER, None)
+    if sent_at is None:
+        sent_at = (request.headers or {}).get(SENT_AT_HEADER)
+    return sent_at
+
+
+@signals.task_prerun.connect
+def _task_prerun(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _task_started[task_id] = time.perf_counter()
+    try:
+        queued_since = _queued_since(task.request)
+        if queued_since:
+            TASK_QUEUE_LAG_SECONDS.labels(task=task.name).observe(max(now - float(queued_since), 0))
+    except Exception as e:
+        logger.debug(f"计算任务排队时间失败: {str(e)}")
+
+
+@signals.task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_SECONDS.labels(task=task.name, state=state or 'UNKNOWN').observe(
+            time.perf_counter() - started
+        )
+
+
+@signals.worker_init.connect
+def _start_worker_exporter(**kwargs):
+    port = os.environ.get('CELERY_METRICS_PORT')
+    if port:
+        start_http_server(int(port), registry=registry())
+        logger.info(f"Celery 指标已在端口 {port} 暴露")
+
+
+@signals.worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **kwargs):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '进行中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('pagination_token', models.CharField(blank=True, max_length=200, verbose_name='分页令牌')),
+                ('until_id', models.CharField(blank=True, max_length=100, verbose_name='截止推文ID')),
+                ('pages_fetched', models.IntegerField(default=0, verbose_name='已获取页数')),
+                ('tweets_fetched', models.IntegerField(default=0, verbose_name='已获取推文数')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='backfill', to='twitter_monitor.monitoreduser', verbose_name='监控用户')),
+            ],
+            options={
+                'verbose_name': '历史回填',
+                'verbose_name_plural': '历史回填',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0002_user_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferencedTweet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tweet_id', models.CharField(max_length=100, unique=True, verbose_name='推文ID')),
+                ('author_user_id', models.CharField(blank=True, max_length=100, verbose_name='作者用户ID')),
+                ('author_username', models.CharField(blank=True, max_length=100, verbose_name='作者用户名')),
+                ('author_display_name', models.CharField(blank=True, max_length=200, verbose_name='作者显示名称')),
+                ('text', models.TextField(verbose_name='推文内容')),
+                ('created_at', models.DateTimeField(blank=True, null=True, verbose_name='发布时间')),
+                ('retweet_count', models.IntegerField(default=0, verbose_name='转发数')),
+                ('reply_count', models.IntegerField(default=0, verbose_name='回复数')),
+                ('like_count', models.IntegerField(default=0, verbose_name='点赞数')),
+                ('quote_count', models.IntegerField(default=0, verbose_name='引用数')),
+                ('fetched_at', models.DateTimeField(auto_now_add=True, verbose_name='抓取时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '原推文',
+                'verbose_name_plural': '原推文',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tweet',
+            name='original',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='references', to='twitter_monitor.referencedtweet', verbose_name='原推文'),
+        ),
+    ]
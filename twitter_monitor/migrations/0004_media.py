@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0003_referenced_tweet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoreduser',
+            name='profile_image_cache',
+            field=models.CharField(blank=True, max_length=100, verbose_name='头像缓存文件'),
+        ),
+        migrations.CreateModel(
+            name='Media',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_key', models.CharField(max_length=100, unique=True, verbose_name='媒体Key')),
+                ('media_type', models.CharField(choices=[('photo', '图片'), ('video', '视频'), ('animated_gif', 'GIF 动图')], max_length=20, verbose_name='媒体类型')),
+                ('width', models.IntegerField(blank=True, null=True, verbose_name='宽度')),
+                ('height', models.IntegerField(blank=True, null=True, verbose_name='高度')),
+                ('url', models.URLField(blank=True, max_length=500, verbose_name='URL')),
+                ('preview_image_url', models.URLField(blank=True, max_length=500, verbose_name='预览图URL')),
+                ('cache_name', models.CharField(blank=True, max_length=100, verbose_name='缓存文件')),
+                ('cache_failed', models.BooleanField(default=False, verbose_name='缓存失败')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media', to='twitter_monitor.tweet', verbose_name='推文')),
+            ],
+            options={
+                'verbose_name': '媒体',
+                'verbose_name_plural': '媒体',
+                'indexes': [models.Index(fields=['media_type', 'tweet'], name='twitter_mon_media_t_e92c8a_idx')],
+            },
+        ),
+    ]
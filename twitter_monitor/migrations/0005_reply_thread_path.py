@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:28
+
+from django.db import migrations, models
+
+
+def set_existing_paths(apps, schema_editor):
+    """已有回复没有父子信息, 统一作为根推文的直接回复"""
+    Reply = apps.get_model("twitter_monitor", "Reply")
+    replies = list(Reply.objects.filter(path="").only("id", "reply_id"))
+    for reply in replies:
+        reply.path = reply.reply_id.zfill(20)
+    Reply.objects.bulk_update(replies, ["path"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0004_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reply',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='层级'),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='in_reply_to_tweet_id',
+            field=models.CharField(blank=True, max_length=100, verbose_name='回复的推文ID'),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='in_reply_to_user_id',
+            field=models.CharField(blank=True, max_length=100, verbose_name='回复的用户ID'),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='path',
+            field=models.CharField(blank=True, max_length=2048, verbose_name='线程路径'),
+        ),
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['tweet', 'path'], name='twitter_mon_tweet_i_694c8a_idx'),
+        ),
+        migrations.RunPython(set_existing_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_accounts_for_existing_replies(apps, schema_editor):
+    """已有回复的作者都是监控用户, 为其创建账号并关联"""
+    MonitoredUser = apps.get_model("twitter_monitor", "MonitoredUser")
+    TwitterAccount = apps.get_model("twitter_monitor", "TwitterAccount")
+    Reply = apps.get_model("twitter_monitor", "Reply")
+
+    for user in MonitoredUser.objects.filter(replies__isnull=False).distinct():
+        account, _ = TwitterAccount.objects.get_or_create(
+            user_id=user.user_id,
+            defaults={
+                "username": user.username,
+                "display_name": user.display_name,
+                "profile_image_url": user.profile_image_url,
+            },
+        )
+        Reply.objects.filter(author=user).update(account=account)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0005_reply_thread_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reply',
+            name='author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='twitter_monitor.monitoreduser', verbose_name='回复者'),
+        ),
+        migrations.CreateModel(
+            name='TwitterAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=100, unique=True, verbose_name='用户ID')),
+                ('username', models.CharField(blank=True, max_length=100, verbose_name='用户名')),
+                ('display_name', models.CharField(blank=True, max_length=200, verbose_name='显示名称')),
+                ('profile_image_url', models.URLField(blank=True, verbose_name='头像URL')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='添加时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': 'Twitter 账号',
+                'verbose_name_plural': 'Twitter 账号',
+                'indexes': [models.Index(fields=['username'], name='twitter_mon_usernam_7578c0_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='twitter_monitor.twitteraccount', verbose_name='回复者账号'),
+        ),
+        migrations.RunPython(create_accounts_for_existing_replies, migrations.RunPython.noop),
+    ]
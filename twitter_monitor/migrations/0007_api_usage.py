@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0006_twitter_account'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('endpoint', models.CharField(max_length=100, verbose_name='端点')),
+                ('requests', models.IntegerField(default=0, verbose_name='请求数')),
+                ('tweets', models.IntegerField(default=0, verbose_name='返回推文数')),
+                ('rate_limited', models.IntegerField(default=0, verbose_name='限流次数')),
+            ],
+            options={
+                'verbose_name': 'API 用量',
+                'verbose_name_plural': 'API 用量',
+                'ordering': ['-date', 'endpoint'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='apiusage',
+            constraint=models.UniqueConstraint(fields=('date', 'endpoint'), name='unique_api_usage_per_day'),
+        ),
+    ]
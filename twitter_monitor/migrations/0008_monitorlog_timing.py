@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0007_api_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitorlog',
+            name='api_calls',
+            field=models.PositiveIntegerField(default=0, verbose_name='API 请求数'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='bytes_received',
+            field=models.PositiveIntegerField(default=0, verbose_name='接收字节数'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='db_write_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='写入数据库耗时(ms)'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='duration_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='总耗时(ms)'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='fetch_replies_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='获取回复耗时(ms)'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='fetch_tweets_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='获取推文耗时(ms)'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='rate_limit_wait_ms',
+            field=models.PositiveIntegerField(default=0, verbose_name='速率限制等待(ms)'),
+        ),
+        migrations.AddIndex(
+            model_name='monitorlog',
+            index=models.Index(fields=['user', 'created_at'], name='twitter_mon_user_id_1aabaa_idx'),
+        ),
+    ]
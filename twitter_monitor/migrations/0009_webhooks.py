@@ -0,0 +1,68 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0008_monitorlog_timing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Webhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='名称')),
+                ('kind', models.CharField(choices=[('slack', 'Slack'), ('discord', 'Discord'), ('generic', '通用 Webhook')], default='generic', max_length=20, verbose_name='类型')),
+                ('url', models.URLField(max_length=500, verbose_name='Webhook URL')),
+                ('secret', models.CharField(blank=True, max_length=200, verbose_name='签名密钥')),
+                ('include_replies', models.BooleanField(default=False, verbose_name='推送回复')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('users', models.ManyToManyField(blank=True, help_text='留空则推送所有监控用户', related_name='webhooks', to='twitter_monitor.monitoreduser', verbose_name='监控用户')),
+            ],
+            options={
+                'verbose_name': 'Webhook',
+                'verbose_name_plural': 'Webhook',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeadLetterNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('events', models.JSONField(verbose_name='事件列表')),
+                ('attempts', models.IntegerField(default=0, verbose_name='尝试次数')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to='twitter_monitor.webhook', verbose_name='Webhook')),
+            ],
+            options={
+                'verbose_name': '投递失败通知',
+                'verbose_name_plural': '投递失败通知',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.JSONField(verbose_name='事件')),
+                ('attempts', models.IntegerField(default=0, verbose_name='已尝试次数')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次投递时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='twitter_monitor.webhook', verbose_name='Webhook')),
+            ],
+            options={
+                'verbose_name': '待投递通知',
+                'verbose_name_plural': '待投递通知',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['next_attempt_at'], name='twitter_mon_next_at_c4004a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0009_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='名称')),
+                ('keywords', models.TextField(blank=True, help_text='每行一个关键词或短语, 不区分大小写; 英文关键词按整词匹配', verbose_name='关键词')),
+                ('regex', models.CharField(blank=True, help_text='不区分大小写', max_length=500, verbose_name='正则表达式')),
+                ('tweet_types', models.CharField(blank=True, help_text='逗号分隔: tweet, retweet, quote, reply; 留空则匹配所有类型', max_length=100, verbose_name='类型')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('users', models.ManyToManyField(blank=True, help_text='只匹配这些用户的推文及其收到的回复, 留空则匹配所有用户', related_name='alert_rules', to='twitter_monitor.monitoreduser', verbose_name='监控用户')),
+            ],
+            options={
+                'verbose_name': '告警规则',
+                'verbose_name_plural': '告警规则',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RuleMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('matched', models.CharField(blank=True, max_length=200, verbose_name='命中内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='命中时间')),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rule_matches', to='twitter_monitor.reply', verbose_name='回复')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='twitter_monitor.alertrule', verbose_name='规则')),
+                ('tweet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rule_matches', to='twitter_monitor.tweet', verbose_name='推文')),
+            ],
+            options={
+                'verbose_name': '规则命中',
+                'verbose_name_plural': '规则命中',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['rule', '-created_at'], name='twitter_mon_rule_id_763fad_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rulematch',
+            constraint=models.UniqueConstraint(fields=('rule', 'tweet'), name='unique_rule_match_tweet'),
+        ),
+        migrations.AddConstraint(
+            model_name='rulematch',
+            constraint=models.UniqueConstraint(fields=('rule', 'reply'), name='unique_rule_match_reply'),
+        ),
+    ]
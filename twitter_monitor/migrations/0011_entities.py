@@ -0,0 +1,59 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0010_alert_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TweetEntity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hashtag', '话题标签'), ('mention', '提及'), ('cashtag', '股票代码'), ('url', '链接')], max_length=10, verbose_name='类型')),
+                ('value', models.CharField(max_length=500, verbose_name='值')),
+                ('created_at', models.DateTimeField(verbose_name='发布时间')),
+            ],
+            options={
+                'verbose_name': '推文实体',
+                'verbose_name_plural': '推文实体',
+            },
+        ),
+        migrations.CreateModel(
+            name='EntityDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('kind', models.CharField(choices=[('hashtag', '话题标签'), ('mention', '提及'), ('cashtag', '股票代码'), ('url', '链接')], max_length=10, verbose_name='类型')),
+                ('value', models.CharField(max_length=500, verbose_name='值')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='推文数')),
+            ],
+            options={
+                'verbose_name': '实体每日统计',
+                'verbose_name_plural': '实体每日统计',
+                'indexes': [models.Index(fields=['kind', 'date'], name='twitter_mon_kind_d8d200_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='entitydailycount',
+            constraint=models.UniqueConstraint(fields=('date', 'kind', 'value'), name='unique_entity_daily_count'),
+        ),
+        migrations.AddField(
+            model_name='tweetentity',
+            name='tweet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities', to='twitter_monitor.tweet', verbose_name='推文'),
+        ),
+        migrations.AddIndex(
+            model_name='tweetentity',
+            index=models.Index(fields=['kind', 'value', '-created_at'], name='twitter_mon_kind_5f5298_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tweetentity',
+            constraint=models.UniqueConstraint(fields=('tweet', 'kind', 'value'), name='unique_tweet_entity'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0011_entities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TweetFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simhash', models.BigIntegerField(verbose_name='SimHash')),
+                ('band0', models.PositiveIntegerField(verbose_name='分段 0')),
+                ('band1', models.PositiveIntegerField(verbose_name='分段 1')),
+                ('band2', models.PositiveIntegerField(verbose_name='分段 2')),
+                ('band3', models.PositiveIntegerField(verbose_name='分段 3')),
+                ('cluster', models.BigIntegerField(blank=True, null=True, verbose_name='重复簇')),
+                ('tweet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint', to='twitter_monitor.tweet', verbose_name='推文')),
+            ],
+            options={
+                'verbose_name': '推文指纹',
+                'verbose_name_plural': '推文指纹',
+                'indexes': [models.Index(fields=['band0'], name='twitter_mon_band0_8b318f_idx'), models.Index(fields=['band1'], name='twitter_mon_band1_a00cf2_idx'), models.Index(fields=['band2'], name='twitter_mon_band2_0e2055_idx'), models.Index(fields=['band3'], name='twitter_mon_band3_09ef3d_idx'), models.Index(fields=['cluster'], name='twitter_mon_cluster_b1a998_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0012_tweet_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tweet', '推文'), ('reply', '回复'), ('log', '监控日志')], max_length=10, verbose_name='类型')),
+                ('month', models.DateField(verbose_name='月份')),
+                ('author_id', models.BigIntegerField(verbose_name='监控用户 ID')),
+                ('path', models.CharField(max_length=500, unique=True, verbose_name='文件路径')),
+                ('rows', models.PositiveIntegerField(verbose_name='行数')),
+                ('size_bytes', models.BigIntegerField(verbose_name='文件大小')),
+                ('min_created_at', models.DateTimeField(verbose_name='最早时间')),
+                ('max_created_at', models.DateTimeField(verbose_name='最晚时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+            ],
+            options={
+                'verbose_name': '归档分段',
+                'verbose_name_plural': '归档分段',
+                'indexes': [models.Index(fields=['kind', 'author_id', 'month'], name='twitter_mon_kind_ae3c97_idx'), models.Index(fields=['kind', 'max_created_at'], name='twitter_mon_kind_5bb5c7_idx')],
+            },
+        ),
+    ]
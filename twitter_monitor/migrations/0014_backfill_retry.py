@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+def requeue_failed(apps, schema_editor):
+    # 此前任何异常都会把回填标记为失败, 重新排队一次; 永久错误 (404/401/403) 会再次直接失败
+    UserBackfill = apps.get_model('twitter_monitor', 'UserBackfill')
+    UserBackfill.objects.filter(status='failed').update(status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0013_archive_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbackfill',
+            name='attempts',
+            field=models.IntegerField(default=0, verbose_name='连续失败次数'),
+        ),
+        migrations.AddField(
+            model_name='userbackfill',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='下次重试时间'),
+        ),
+        migrations.RunPython(requeue_failed, migrations.RunPython.noop),
+    ]
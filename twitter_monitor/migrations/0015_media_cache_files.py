@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:44
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def register_cached_files(apps, schema_editor):
+    # 登记已缓存的文件; 存储中找不到的文件清除引用, 下次缓存任务重新下载
+    from django.core.files.storage import storages
+
+    Media = apps.get_model('twitter_monitor', 'Media')
+    MediaCacheFile = apps.get_model('twitter_monitor', 'MediaCacheFile')
+    MonitoredUser = apps.get_model('twitter_monitor', 'MonitoredUser')
+
+    storage = storages['media_cache']
+    names = set(Media.objects.exclude(cache_name='').values_list('cache_name', flat=True))
+    names |= set(MonitoredUser.objects.exclude(profile_image_cache='').values_list('profile_image_cache', flat=True))
+    now = timezone.now()
+    files, missing = [], []
+    for name in names:
+        try:
+            files.append(MediaCacheFile(name=name, size_bytes=storage.size(f'{name[:2]}/{name}'), last_used_at=now))
+        except FileNotFoundError:
+            missing.append(name)
+    MediaCacheFile.objects.bulk_create(files, batch_size=1000)
+    Media.objects.filter(cache_name__in=missing).update(cache_name='')
+    MonitoredUser.objects.filter(profile_image_cache__in=missing).update(profile_image_cache='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0014_backfill_retry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaCacheFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='文件名')),
+                ('size_bytes', models.BigIntegerField(verbose_name='文件大小')),
+                ('last_used_at', models.DateTimeField(db_index=True, verbose_name='最近使用时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '媒体缓存文件',
+                'verbose_name_plural': '媒体缓存文件',
+            },
+        ),
+        migrations.RunPython(register_cached_files, migrations.RunPython.noop),
+    ]
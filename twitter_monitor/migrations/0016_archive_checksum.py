@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0015_media_cache_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivesegment',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256'),
+        ),
+    ]
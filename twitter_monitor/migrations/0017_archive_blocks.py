@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter_monitor', '0016_archive_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivesegment',
+            name='blocks',
+            field=models.JSONField(blank=True, default=list, verbose_name='块索引'),
+        ),
+    ]
@@ -8,6 +8,7 @@ class MonitoredUser(models.Model):
     user_id = models.CharField(max_length=100, unique=True, verbose_name="用户ID")
     display_name = models.CharField(max_length=200, blank=True, verbose_name="显示名称")
     profile_image_url = models.URLField(blank=True, verbose_name="头像URL")
+    profile_image_cache = models.CharField(max_length=100, blank=True, verbose_name="头像缓存文件")
     is_active = models.BooleanField(default=True, verbose_name="是否启用监控")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="添加时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
@@ -20,6 +21,60 @@ class MonitoredUser(models.Model):
     
     def __str__(self):
         return f"@{self.username}"
+    
+    @property
+    def profile_image_cached_url(self):
+        """缓存头像的访问地址, 未缓存时为 None"""
+        from . import media_cache
+        return media_cache.url(self.profile_image_cache) if self.profile_image_cache else None
+
+
+class TwitterAccount(models.Model):
+    """Twitter 账号 (包括非监控用户, 例如回复作者)"""
+    user_id = models.CharField(max_length=100, unique=True, verbose_name="用户ID")
+    username = models.CharField(max_length=100, blank=True, verbose_name="用户名")
+    display_name = models.CharField(max_length=200, blank=True, verbose_name="显示名称")
+    profile_image_url = models.URLField(blank=True, verbose_name="头像URL")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="添加时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    
+    class Meta:
+        verbose_name = "Twitter 账号"
+        verbose_name_plural = "Twitter 账号"
+        indexes = [
+            models.Index(fields=['username']),
+        ]
+    
+    def __str__(self):
+        return f"@{self.username or self.user_id}"
+
+
+class ReferencedTweet(models.Model):
+    """被转发/引用的原推文 (所有监控用户共享, 每条只存一份)"""
+    tweet_id = models.CharField(max_length=100, unique=True, verbose_name="推文ID")
+    author_user_id = models.CharField(max_length=100, blank=True, verbose_name="作者用户ID")
+    author_username = models.CharField(max_length=100, blank=True, verbose_name="作者用户名")
+    author_display_name = models.CharField(max_length=200, blank=True, verbose_name="作者显示名称")
+    text = models.TextField(verbose_name="推文内容")
+    created_at = models.DateTimeField(null=True, blank=True, verbose_name="发布时间")
+    
+    # 统计数据
+    retweet_count = models.IntegerField(default=0, verbose_name="转发数")
+    reply_count = models.IntegerField(default=0, verbose_name="回复数")
+    like_count = models.IntegerField(default=0, verbose_name="点赞数")
+    quote_count = models.IntegerField(default=0, verbose_name="引用数")
+    
+    # 抓取时间
+    fetched_at = models.DateTimeField(auto_now_add=True, verbose_name="抓取时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    
+    class Meta:
+        verbose_name = "原推文"
+        verbose_name_plural = "原推文"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.author_username}: {self.text[:50]}"
 
 
 class Tweet(models.Model):
@@ -45,6 +100,10 @@ class Tweet(models.Model):
     # 引用和转发的原推文
     referenced_tweet_id = models.CharField(max_length=100, blank=True, verbose_name="引用推文ID")
     retweeted_tweet_id = models.CharField(max_length=100, blank=True, verbose_name="转发推文ID")
+    original = models.ForeignKey(
+        ReferencedTweet, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='references', verbose_name="原推文"
+    )
     
     # 媒体
     has_media = models.BooleanField(default=False, verbose_name="包含媒体")
@@ -68,14 +127,87 @@ class Tweet(models.Model):
         return f"{self.author.username}: {self.text[:50]}"
 
 
+class Media(models.Model):
+    """推文媒体"""
+    MEDIA_TYPE_CHOICES = [
+        ('photo', '图片'),
+        ('video', '视频'),
+        ('animated_gif', 'GIF 动图'),
+    ]
+    
+    media_key = models.CharField(max_length=100, unique=True, verbose_name="媒体Key")
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='media', verbose_name="推文")
+    media_type = models.CharField(max_length=20, choices=MEDIA_TYPE_CHOICES, verbose_name="媒体类型")
+    width = models.IntegerField(null=True, blank=True, verbose_name="宽度")
+    height = models.IntegerField(null=True, blank=True, verbose_name="高度")
+    url = models.URLField(max_length=500, blank=True, verbose_name="URL")
+    preview_image_url = models.URLField(max_length=500, blank=True, verbose_name="预览图URL")
+    
+    # 本地缓存 (内容寻址文件名, 见 media_cache 模块)
+    cache_name = models.CharField(max_length=100, blank=True, verbose_name="缓存文件")
+    cache_failed = models.BooleanField(default=False, verbose_name="缓存失败")
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    
+    class Meta:
+        verbose_name = "媒体"
+        verbose_name_plural = "媒体"
+        indexes = [
+            models.Index(fields=['media_type', 'tweet']),
+        ]
+    
+    def __str__(self):
+        return f"{self.media_type}: {self.media_key}"
+    
+    @property
+    def cached_url(self):
+        """缓存文件的访问地址, 未缓存时为 None"""
+        from . import media_cache
+        return media_cache.url(self.cache_name) if self.cache_name else None
+
+
+class MediaCacheFile(models.Model):
+    """
+    媒体缓存中的文件 (内容寻址, 多条媒体可以引用同一个文件)
+
+    淘汰按本表的大小和最近使用时间进行, 不需要遍历存储; 使用时间由 Worker 在下载到
+    该内容时更新, Web 请求不写入。
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="文件名")
+    size_bytes = models.BigIntegerField(verbose_name="文件大小")
+    last_used_at = models.DateTimeField(db_index=True, verbose_name="最近使用时间")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    
+    class Meta:
+        verbose_name = "媒体缓存文件"
+        verbose_name_plural = "媒体缓存文件"
+    
+    def __str__(self):
+        return self.name
+
+
 class Reply(models.Model):
     """回复"""
     reply_id = models.CharField(max_length=100, unique=True, verbose_name="回复ID")
     tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='replies', verbose_name="原推文")
-    author = models.ForeignKey(MonitoredUser, on_delete=models.CASCADE, related_name='replies', verbose_name="回复者")
+    # 回复者是监控用户时才设置 author, account 对所有回复都会设置
+    author = models.ForeignKey(
+        MonitoredUser, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='replies', verbose_name="回复者"
+    )
+    account = models.ForeignKey(
+        TwitterAccount, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='replies', verbose_name="回复者账号"
+    )
     text = models.TextField(verbose_name="回复内容")
     created_at = models.DateTimeField(verbose_name="回复时间")
     
+    # 线程结构 (物化路径, 见 threads 模块)
+    in_reply_to_tweet_id = models.CharField(max_length=100, blank=True, verbose_name="回复的推文ID")
+    in_reply_to_user_id = models.CharField(max_length=100, blank=True, verbose_name="回复的用户ID")
+    path = models.CharField(max_length=2048, blank=True, verbose_name="线程路径")
+    depth = models.PositiveSmallIntegerField(default=1, verbose_name="层级")
+    
     # 统计数据
     like_count = models.IntegerField(default=0, verbose_name="点赞数")
     reply_count = models.IntegerField(default=0, verbose_name="回复数")
@@ -91,10 +223,18 @@ class Reply(models.Model):
         indexes = [
             models.Index(fields=['tweet', '-created_at']),
             models.Index(fields=['author', '-created_at']),
+            models.Index(fields=['tweet', 'path']),
         ]
     
     def __str__(self):
-        return f"{self.author.username} 回复 {self.tweet.author.username}"
+        # 回复者账号被删除 (SET_NULL) 且不是监控用户时, 两个外键都为空
+        if self.account_id:
+            replier = self.account.username
+        elif self.author_id:
+            replier = self.author.username
+        else:
+            replier = f"#{self.reply_id}"
+        return f"{replier} 回复 {self.tweet.author.username}"
 
 
 class MonitorLog(models.Model):
@@ -110,12 +250,341 @@ class MonitorLog(models.Model):
     tweets_fetched = models.IntegerField(default=0, verbose_name="获取推文数")
     replies_fetched = models.IntegerField(default=0, verbose_name="获取回复数")
     error_message = models.TextField(blank=True, verbose_name="错误信息")
+    
+    # 各阶段耗时 (毫秒), API 请求耗时包含等待速率限制重置的时间
+    duration_ms = models.PositiveIntegerField(default=0, verbose_name="总耗时(ms)")
+    fetch_tweets_ms = models.PositiveIntegerField(default=0, verbose_name="获取推文耗时(ms)")
+    fetch_replies_ms = models.PositiveIntegerField(default=0, verbose_name="获取回复耗时(ms)")
+    db_write_ms = models.PositiveIntegerField(default=0, verbose_name="写入数据库耗时(ms)")
+    rate_limit_wait_ms = models.PositiveIntegerField(default=0, verbose_name="速率限制等待(ms)")
+    api_calls = models.PositiveIntegerField(default=0, verbose_name="API 请求数")
+    bytes_received = models.PositiveIntegerField(default=0, verbose_name="接收字节数")
+    
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     
     class Meta:
         verbose_name = "监控日志"
         verbose_name_plural = "监控日志"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.status} - {self.created_at}"
+
+
+class UserBackfill(models.Model):
+    """用户历史推文回填进度"""
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '进行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+    
+    user = models.OneToOneField(MonitoredUser, on_delete=models.CASCADE, related_name='backfill', verbose_name="监控用户")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="状态")
+    
+    # 检查点: 优先使用分页令牌继续, 令牌失效时从 until_id 之前继续
+    pagination_token = models.CharField(max_length=200, blank=True, verbose_name="分页令牌")
+    until_id = models.CharField(max_length=100, blank=True, verbose_name="截止推文ID")
+    
+    pages_fetched = models.IntegerField(default=0, verbose_name="已获取页数")
+    tweets_fetched = models.IntegerField(default=0, verbose_name="已获取推文数")
+    error_message = models.TextField(blank=True, verbose_name="错误信息")
+    # 临时错误 (网络、5xx) 的连续失败次数和下次重试时间, 成功获取一页后清零
+    attempts = models.IntegerField(default=0, verbose_name="连续失败次数")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="下次重试时间")
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+    
+    class Meta:
+        verbose_name = "历史回填"
+        verbose_name_plural = "历史回填"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.status} - {self.tweets_fetched}"
+
+
+class ApiUsage(models.Model):
+    """Twitter API 用量 (按天、端点汇总)"""
+    date = models.DateField(verbose_name="日期")
+    endpoint = models.CharField(max_length=100, verbose_name="端点")
+    requests = models.IntegerField(default=0, verbose_name="请求数")
+    tweets = models.IntegerField(default=0, verbose_name="返回推文数")
+    rate_limited = models.IntegerField(default=0, verbose_name="限流次数")
+    
+    class Meta:
+        verbose_name = "API 用量"
+        verbose_name_plural = "API 用量"
+        ordering = ['-date', 'endpoint']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'endpoint'], name='unique_api_usage_per_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.endpoint}: {self.requests} 请求, {self.tweets} 推文"
+
+
+class Webhook(models.Model):
+    """新推文通知的推送目标 (Slack / Discord / 通用 Webhook)"""
+    KIND_CHOICES = [
+        ('slack', 'Slack'),
+        ('discord', 'Discord'),
+        ('generic', '通用 Webhook'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name="名称")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='generic', verbose_name="类型")
+    url = models.URLField(max_length=500, verbose_name="Webhook URL")
+    # 通用 Webhook 使用 HMAC-SHA256 签名请求体, 放在 X-Signature 请求头中
+    secret = models.CharField(max_length=200, blank=True, verbose_name="签名密钥")
+    users = models.ManyToManyField(
+        MonitoredUser, blank=True, related_name='webhooks',
+        verbose_name="监控用户", help_text="留空则推送所有监控用户"
+    )
+    include_replies = models.BooleanField(default=False, verbose_name="推送回复")
+    is_active = models.BooleanField(default=True, verbose_name="是否启用")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    
+    class Meta:
+        verbose_name = "Webhook"
+        verbose_name_plural = "Webhook"
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
+
+
+class Notification(models.Model):
+    """待投递的通知 (发件箱), 投递成功后删除"""
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='notifications', verbose_name="Webhook")
+    event = models.JSONField(verbose_name="事件")
+    attempts = models.IntegerField(default=0, verbose_name="已尝试次数")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="下次投递时间")
+    last_error = models.TextField(blank=True, verbose_name="最近错误")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    
+    class Meta:
+        verbose_name = "待投递通知"
+        verbose_name_plural = "待投递通知"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.webhook.name}: {self.event.get('type')} {self.event.get('id')}"
+
+
+class DeadLetterNotification(models.Model):
+    """多次投递失败的通知批次"""
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='dead_letters', verbose_name="Webhook")
+    events = models.JSONField(verbose_name="事件列表")
+    attempts = models.IntegerField(default=0, verbose_name="尝试次数")
+    error = models.TextField(blank=True, verbose_name="错误信息")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    
+    class Meta:
+        verbose_name = "投递失败通知"
+        verbose_name_plural = "投递失败通知"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.webhook.name}: {len(self.events)} 条事件"
+
+
+class AlertRule(models.Model):
+    """关键词/正则告警规则, 对每条新入库的推文和回复求值 (见 rules 模块)"""
+    TYPE_CHOICES = [
+        ('tweet', '原创'),
+        ('retweet', '转发'),
+        ('quote', '引用'),
+        ('reply', '回复'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name="名称")
+    keywords = models.TextField(
+        blank=True, verbose_name="关键词",
+        help_text="每行一个关键词或短语, 不区分大小写; 英文关键词按整词匹配"
+    )
+    regex = models.CharField(max_length=500, blank=True, verbose_name="正则表达式", help_text="不区分大小写")
+    users = models.ManyToManyField(
+        MonitoredUser, blank=True, related_name='alert_rules',
+        verbose_name="监控用户", help_text="只匹配这些用户的推文及其收到的回复, 留空则匹配所有用户"
+    )
+    tweet_types = models.CharField(
+        max_length=100, blank=True, verbose_name="类型",
+        help_text="逗号分隔: tweet, retweet, quote, reply; 留空则匹配所有类型"
+    )
+    is_active = models.BooleanField(default=True, verbose_name="是否启用")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    
+    class Meta:
+        verbose_name = "告警规则"
+        verbose_name_plural = "告警规则"
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    def keyword_list(self):
+        return [line.strip() for line in self.keywords.splitlines() if line.strip()]
+    
+    def type_list(self):
+        return [t.strip() for t in self.tweet_types.split(',') if t.strip()]
+
+
+class RuleMatch(models.Model):
+    """规则命中记录, 推文和回复二选一"""
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE, related_name='matches', verbose_name="规则")
+    tweet = models.ForeignKey(
+        Tweet, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='rule_matches', verbose_name="推文"
+    )
+    reply = models.ForeignKey(
+        Reply, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='rule_matches', verbose_name="回复"
+    )
+    matched = models.CharField(max_length=200, blank=True, verbose_name="命中内容")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="命中时间")
+    
+    class Meta:
+        verbose_name = "规则命中"
+        verbose_name_plural = "规则命中"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['rule', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'tweet'], name='unique_rule_match_tweet'),
+            models.UniqueConstraint(fields=['rule', 'reply'], name='unique_rule_match_reply'),
+        ]
+    
+    def __str__(self):
+        return f"{self.rule.name}: {self.tweet_id or self.reply_id}"
+
+
+class TweetEntity(models.Model):
+    """推文实体 (话题标签、提及、股票代码、链接), 用于按实体筛选推文"""
+    KIND_CHOICES = [
+        ('hashtag', '话题标签'),
+        ('mention', '提及'),
+        ('cashtag', '股票代码'),
+        ('url', '链接'),
+    ]
+    
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='entities', verbose_name="推文")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="类型")
+    # 标签/提及/股票代码统一为小写且不带 #@$ 前缀, 链接为展开后的地址
+    value = models.CharField(max_length=500, verbose_name="值")
+    # 推文发布时间的冗余副本, 按实体查询时间范围不需要关联推文表
+    created_at = models.DateTimeField(verbose_name="发布时间")
+    
+    class Meta:
+        verbose_name = "推文实体"
+        verbose_name_plural = "推文实体"
+        indexes = [
+            models.Index(fields=['kind', 'value', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tweet', 'kind', 'value'], name='unique_tweet_entity'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}: {self.value}"
+
+
+class EntityDailyCount(models.Model):
+    """实体每日出现次数汇总, 热门实体接口直接读取"""
+    date = models.DateField(verbose_name="日期")
+    kind = models.CharField(max_length=10, choices=TweetEntity.KIND_CHOICES, verbose_name="类型")
+    value = models.CharField(max_length=500, verbose_name="值")
+    count = models.PositiveIntegerField(default=0, verbose_name="推文数")
+    
+    class Meta:
+        verbose_name = "实体每日统计"
+        verbose_name_plural = "实体每日统计"
+        indexes = [
+            models.Index(fields=['kind', 'date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'kind', 'value'], name='unique_entity_daily_count'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.kind}: {self.value} ({self.count})"
+
+
+class TweetFingerprint(models.Model):
+    """推文文本的 SimHash 指纹, 用于发现近似重复的推文"""
+    tweet = models.OneToOneField(Tweet, on_delete=models.CASCADE, related_name='fingerprint', verbose_name="推文")
+    # 64 位 SimHash (按有符号整数保存)
+    simhash = models.BigIntegerField(verbose_name="SimHash")
+    # 指纹按 16 位分成 4 段, 汉明距离不超过 3 的指纹至少有一段完全相同
+    band0 = models.PositiveIntegerField(verbose_name="分段 0")
+    band1 = models.PositiveIntegerField(verbose_name="分段 1")
+    band2 = models.PositiveIntegerField(verbose_name="分段 2")
+    band3 = models.PositiveIntegerField(verbose_name="分段 3")
+    # 近似重复簇, 值为簇中第一条推文的主键; 没有近似重复时为空
+    cluster = models.BigIntegerField(null=True, blank=True, verbose_name="重复簇")
+    
+    class Meta:
+        verbose_name = "推文指纹"
+        verbose_name_plural = "推文指纹"
+        indexes = [
+            models.Index(fields=['band0']),
+            models.Index(fields=['band1']),
+            models.Index(fields=['band2']),
+            models.Index(fields=['band3']),
+            models.Index(fields=['cluster']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tweet_id}: {self.simhash & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+class ArchiveSegment(models.Model):
+    """
+    冷存储分段文件的索引
+
+    清理任务把过期的推文、回复和日志按 (类型, 月份, 监控用户) 分区写入压缩的只追加分段文件,
+    查询旧数据时按本表定位需要读取的文件。
+    """
+    KIND_CHOICES = [
+        ('tweet', '推文'),
+        ('reply', '回复'),
+        ('log', '监控日志'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="类型")
+    month = models.DateField(verbose_name="月份")
+    # 推文和日志为所属的监控用户, 回复为原推文的作者; 用户删除后分段仍然保留
+    author_id = models.BigIntegerField(verbose_name="监控用户 ID")
+    path = models.CharField(max_length=500, unique=True, verbose_name="文件路径")
+    rows = models.PositiveIntegerField(verbose_name="行数")
+    size_bytes = models.BigIntegerField(verbose_name="文件大小")
+    # 文件内容的 SHA-256, 写入后重新读取校验一致才删除数据库中的行
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="SHA-256")
+    # 压缩块索引 [{'offset', 'length', 'rows', 'min', 'max'}, ...], min / max 为 created_at 的 UTC 微秒数;
+    # 早期写入的分段为空 (整个文件一个块)
+    blocks = models.JSONField(default=list, blank=True, verbose_name="块索引")
+    min_created_at = models.DateTimeField(verbose_name="最早时间")
+    max_created_at = models.DateTimeField(verbose_name="最晚时间")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="归档时间")
+    
+    class Meta:
+        verbose_name = "归档分段"
+        verbose_name_plural = "归档分段"
+        indexes = [
+            models.Index(fields=['kind', 'author_id', 'month']),
+            models.Index(fields=['kind', 'max_created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.month:%Y-%m} #{self.author_id} ({self.rows} 行)"
@@ -0,0 +1,388 @@
+"""
+新推文通知 (Slack / Discord / 通用 Webhook)
+
+流程:
+1. monitor_user 结束时 enqueue() 按 Webhook 配置匹配新推文/回复, 在同一事务中
+   写入发件箱 (Notification), 不发出任何网络请求
+2. 事务提交后延迟 NOTIFY_BATCH_SECONDS 秒调度一次 deliver_notifications_task,
+   窗口内多次监控产生的事件合并到同一次投递
+3. deliver() 按 Webhook 把事件分批 (Slack/Discord 单条消息的条数有限), 在线程池中
+   并发发送; 失败的批次按指数退避重试, 超过 NOTIFY_MAX_ATTEMPTS 次后移入
+   DeadLetterNotification
+
+调度丢失时由每分钟一次的定时任务兜底。
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import locks
+from .models import DeadLetterNotification, Notification, Reply, Tweet, Webhook
+
+logger = logging.getLogger(__name__)
+
+ROUTES_CACHE_KEY = 'notify:routes'
+# Webhook 配置的缓存时间 (秒); 通过 Admin 修改时立即清除, 其它方式修改后最多这么久生效
+ROUTES_CACHE_SECONDS = 60
+SCHEDULED_CACHE_KEY = 'notify:scheduled'
+RETRY_SCHEDULED_CACHE_KEY = 'notify:retry_scheduled'
+DELIVER_LOCK = 'notifications:deliver'
+
+# 单次投递最多处理的通知数, 剩余的由下一次投递处理
+DELIVER_LIMIT = 1000
+# 单条消息最多包含的事件数 (Discord 每条消息最多 10 个 embed)
+BATCH_LIMITS = {'slack': 20, 'discord': 10, 'generic': 100}
+# 重试间隔: 30 秒起按 2 倍增长, 最长 1 小时
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+TEXT_PREVIEW_LENGTH = 280
+
+
+def routes():
+    """
+    启用的 Webhook 及其过滤条件 (带缓存)
+
+    Returns:
+        list: [{'id', 'users': 监控用户主键集合 (None 表示不过滤), 'replies': bool}]
+    """
+    cached = cache.get(ROUTES_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    result = []
+    for webhook in Webhook.objects.filter(is_active=True).prefetch_related('users'):
+        user_ids = {user.id for user in webhook.users.all()}
+        result.append({
+            'id': webhook.id,
+            'users': user_ids or None,
+            'replies': webhook.include_replies,
+        })
+    cache.set(ROUTES_CACHE_KEY, result, timeout=ROUTES_CACHE_SECONDS)
+    return result
+
+
+def invalidate_routes():
+    """Webhook 配置修改后清除缓存, 立即生效"""
+    cache.delete(ROUTES_CACHE_KEY)
+
+
+def _matches(route, event):
+    if event['type'] == 'reply' and not route['replies']:
+        return False
+    return route['users'] is None or event['author'] in route['users']
+
+
+def enqueue(events):
+    """
+    把新推文/回复写入匹配的 Webhook 的发件箱
+
+    与入库在同一事务中执行, 提交后调度投递; 不发出网络请求。
+
+    Args:
+        events: live.tweet_event / live.reply_event 返回的字典列表
+    """
+    if not events:
+        return
+    try:
+        rows = [
+            Notification(webhook_id=route['id'], event=event)
+            for route in routes()
+            for event in events
+            if _matches(route, event)
+        ]
+        if not rows:
+            return
+        Notification.objects.bulk_create(rows)
+    except Exception as e:
+        # 通知失败不影响监控
+        logger.warning(f"写入通知发件箱失败: {str(e)}")
+        return
+    transaction.on_commit(schedule_delivery)
+
+
+def schedule_delivery(countdown=None, key=SCHEDULED_CACHE_KEY):
+    """
+    调度一次投递, 已有待执行的投递时不重复调度 (窗口内的事件合并投递)
+
+    Args:
+        countdown: 延迟秒数, 默认 NOTIFY_BATCH_SECONDS
+        key: 去重标记; 新事件和失败重试分别去重, 重试排在很久之后时不影响新事件的投递
+    """
+    from .tasks import deliver_notifications_task
+
+    countdown = settings.NOTIFY_BATCH_SECONDS if countdown is None else countdown
+    try:
+        if cache.add(key, 1, timeout=countdown + 60):
+            deliver_notifications_task.apply_async(countdown=countdown)
+    except Exception as e:
+        # 由定时任务兜底投递
+        logger.warning(f"调度通知投递失败: {str(e)}")
+
+
+def _items(notifications):
+    """
+    查出通知对应的推文/回复内容
+
+    Returns:
+        dict: (type, id) -> 消息内容, 已被删除的推文/回复不在其中
+    """
+    tweet_pks = {n.event['pk'] for n in notifications if n.event['type'] == 'tweet'}
+    reply_ids = {n.event['id'] for n in notifications if n.event['type'] == 'reply'}
+
+    items = {}
+    for tweet in Tweet.objects.filter(id__in=tweet_pks).select_related('author'):
+        items[('tweet', tweet.tweet_id)] = {
+            'type': 'tweet',
+            'id': tweet.tweet_id,
+            'username': tweet.author.username,
+            'display_name': tweet.author.display_name,
+            'text': tweet.text,
+            'url': f'https://twitter.com/{tweet.author.username}/status/{tweet.tweet_id}',
+            'created_at': tweet.created_at.isoformat(),
+        }
+    for reply in Reply.objects.filter(reply_id__in=reply_ids).select_related('account', 'tweet__author'):
+        username = reply.account.username if reply.account else ''
+        items[('reply', reply.reply_id)] = {
+            'type': 'reply',
+            'id': reply.reply_id,
+            'username': username,
+            'display_name': reply.account.display_name if reply.account else '',
+            'text': reply.text,
+            'url': f'https://twitter.com/{username or "i"}/status/{reply.reply_id}',
+            'created_at': reply.created_at.isoformat(),
+            'in_reply_to': reply.tweet.tweet_id,
+            'in_reply_to_username': reply.tweet.author.username,
+        }
+    return items
+
+
+def _summary(items):
+    tweets = sum(1 for item in items if item['type'] == 'tweet')
+    replies = len(items) - tweets
+    parts = []
+    if tweets:
+        parts.append(f'{tweets} 条新推文')
+    if replies:
+        parts.append(f'{replies} 条新回复')
+    return '、'.join(parts)
+
+
+def _preview(text):
+    return text[:TEXT_PREVIEW_LENGTH] + '…' if len(text) > TEXT_PREVIEW_LENGTH else text
+
+
+def build_payload(kind, items):
+    """
+    按 Webhook 类型生成一批事件的请求体
+
+    Returns:
+        dict: JSON 请求体
+    """
+    if kind == 'slack':
+        lines = [
+            f"• *@{item['username']}*: {_preview(item['text'])} <{item['url']}|查看>"
+            for item in items
+        ]
+        return {'text': _summary(items) + '\n' + '\n'.join(lines)}
+
+    if kind == 'discord':
+        return {
+            'content': _summary(items),
+            'embeds': [
+                {
+                    'title': f"@{item['username']}" + (' 的回复' if item['type'] == 'reply' else ''),
+                    'description': _preview(item['text']),
+                    'url': item['url'],
+                    'timestamp': item['created_at'],
+                }
+                for item in items
+            ],
+        }
+
+    return {'events': items}
+
+
+def _send(session, webhook, payload):
+    """
+    发送一批通知
+
+    Returns:
+        tuple: (是否成功, 错误信息, 是否值得重试, 服务端要求的重试等待秒数)
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if webhook.secret:
+        signature = hmac.new(webhook.secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        headers['X-Signature'] = f'sha256={signature}'
+
+    try:
+        response = session.post(webhook.url, data=body, headers=headers, timeout=settings.NOTIFY_TIMEOUT)
+    except requests.RequestException as e:
+        return False, str(e), True, None
+
+    if response.status_code < 300:
+        return True, '', False, None
+
+    error = f'HTTP {response.status_code}: {response.text[:500]}'
+    retry_after = None
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            pass
+    # 其它 4xx (URL 失效、请求体被拒绝等) 重试也不会成功
+    retryable = response.status_code >= 500 or response.status_code in (408, 429)
+    return False, error, retryable, retry_after
+
+
+def _batches(notifications):
+    """按 Webhook 分组, 再按单条消息的条数上限切分"""
+    grouped = defaultdict(list)
+    for notification in notifications:
+        grouped[notification.webhook_id].append(notification)
+
+    for group in grouped.values():
+        webhook = group[0].webhook
+        limit = BATCH_LIMITS.get(webhook.kind, BATCH_LIMITS['generic'])
+        for start in range(0, len(group), limit):
+            yield webhook, group[start:start + limit]
+
+
+def _retry_delay(attempts, retry_after=None):
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return max(delay, retry_after or 0)
+
+
+def deliver():
+    """
+    投递到期的通知
+
+    Returns:
+        dict: sent / retrying / dead 批次数, 以及剩余待投递通知数
+    """
+    # 本次投递开始后入队的事件需要新的调度
+    cache.delete_many([SCHEDULED_CACHE_KEY, RETRY_SCHEDULED_CACHE_KEY])
+
+    with locks.LeaseLock(DELIVER_LOCK) as acquired:
+        if not acquired:
+            return {'skipped': 'in_progress'}
+
+        now = timezone.now()
+        notifications = list(
+            Notification.objects.filter(next_attempt_at__lte=now, webhook__is_active=True)
+            .select_related('webhook')
+            .order_by('id')[:DELIVER_LIMIT]
+        )
+        if not notifications:
+            return {'sent': 0, 'retrying': 0, 'dead': 0, 'pending': Notification.objects.count()}
+
+        items = _items(notifications)
+        batches = []
+        for webhook, group in _batches(notifications):
+            batch_items = [
+                items[key] for key in ((n.event['type'], n.event['id']) for n in group) if key in items
+            ]
+            batches.append((webhook, group, batch_items))
+
+        workers = settings.NOTIFY_WORKERS
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        def send(batch):
+            webhook, _, batch_items = batch
+            # 推文已被清理时没有可发送的内容, 视为成功
+            if not batch_items:
+                return True, '', False, None
+            return _send(session, webhook, build_payload(webhook.kind, batch_items))
+
+        with session, ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(send, batches))
+
+        sent = retrying = dead = 0
+        done_ids = []
+        for (webhook, group, batch_items), (ok, error, retryable, retry_after) in zip(batches, results):
+            ids = [n.id for n in group]
+            if ok:
+                sent += 1
+                done_ids.extend(ids)
+                continue
+
+            attempts = max(n.attempts for n in group) + 1
+            if not retryable or attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                dead += 1
+                logger.error(f"通知投递到 {webhook.name} 失败 {attempts} 次, 移入失败列表: {error}")
+                DeadLetterNotification.objects.create(
+                    webhook=webhook,
+                    events=[n.event for n in group],
+                    attempts=attempts,
+                    error=error,
+                )
+                done_ids.extend(ids)
+                continue
+
+            retrying += 1
+            delay = _retry_delay(attempts, retry_after)
+            logger.warning(f"通知投递到 {webhook.name} 失败, {delay:.0f} 秒后重试: {error}")
+            Notification.objects.filter(id__in=ids).update(
+                attempts=attempts,
+                next_attempt_at=now + timedelta(seconds=delay),
+                last_error=error,
+            )
+
+        Notification.objects.filter(id__in=done_ids).delete()
+
+    # 还有待投递的通知时, 按最早的投递时间再调度一次
+    next_at = (
+        Notification.objects.filter(webhook__is_active=True)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if next_at is not None:
+        schedule_delivery(
+            countdown=max(int((next_at - timezone.now()).total_seconds()), 1),
+            key=RETRY_SCHEDULED_CACHE_KEY,
+        )
+
+    logger.info(f"通知投递完成: {sent} 批成功, {retrying} 批等待重试, {dead} 批失败")
+    return {
+        'sent': sent,
+        'retrying': retrying,
+        'dead': dead,
+        'pending': Notification.objects.count(),
+    }
+
+
+def requeue(dead_letters):
+    """
+    把投递失败的通知重新放回发件箱
+
+    Args:
+        dead_letters: DeadLetterNotification 查询集
+
+    Returns:
+        int: 重新入队的事件数
+    """
+    rows = [
+        Notification(webhook_id=dead_letter.webhook_id, event=event)
+        for dead_letter in dead_letters
+        for event in dead_letter.events
+    ]
+    with transaction.atomic():
+        Notification.objects.bulk_create(rows)
+        dead_letters.delete()
+        transaction.on_commit(lambda: schedule_delivery(countdown=0))
+    return len(rows)
@@ -0,0 +1,248 @@
+"""
+监控流程性能分析工具 (供 profile_monitor 命令使用)
+
+通过替换 tweepy 客户端的 HTTP session 提供三种数据来源, 客户端的解析、
+速率限制记录等逻辑保持不变:
+- RecordingSession: 调用真实 API, 同时把响应写入 NDJSON 文件
+- ReplaySession: 按端点顺序回放录制的响应
+- SyntheticSession: 生成指定数量的推文和回复, 不需要网络
+
+QueryCounter 按 PhaseTimer 的当前阶段统计 SQL 查询数和耗时。
+"""
+
+import json
+import random
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import requests
+import tweepy
+
+from . import metrics, rate_limits
+from .services import RateLimitTrackingClient
+
+API_HOST = 'https://api.twitter.com'
+
+
+def _route(url):
+    return url[len(API_HOST):] if url.startswith(API_HOST) else url
+
+
+def _make_response(url, status, body, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = 'OK' if status < 400 else 'Error'
+    response.url = url
+    response._content = body.encode('utf-8') if isinstance(body, str) else body
+    response.headers.update(headers or {})
+    return response
+
+
+class RecordingSession:
+    """转发到真实 API 并录制响应"""
+
+    def __init__(self, path):
+        self.session = requests.Session()
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def request(self, method, url, params=None, **kwargs):
+        response = self.session.request(method, url, params=params, **kwargs)
+        record = {
+            'method': method,
+            'route': _route(url),
+            'params': params,
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.startswith('x-rate-limit')},
+            'body': response.text,
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return response
+
+    def close(self):
+        self.file.close()
+        self.session.close()
+
+
+class ReplaySession:
+    """
+    回放录制的响应
+
+    按归一化后的端点分组, 每次请求取该端点的下一条录制; 用完后返回空结果。
+    """
+
+    def __init__(self, path):
+        self.records = defaultdict(deque)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records[rate_limits.endpoint_for(record['route'])].append(record)
+
+    def request(self, method, url, params=None, **kwargs):
+        queue = self.records.get(rate_limits.endpoint_for(_route(url)))
+        if not queue:
+            return _make_response(url, 200, '{"meta": {"result_count": 0}}')
+        record = queue.popleft()
+        return _make_response(url, record['status'], record['body'], record['headers'])
+
+    def close(self):
+        pass
+
+
+class SyntheticSession:
+    """
+    生成合成数据
+
+    时间线每次返回 tweets_per_user 条新推文 (其中部分为转发、引用和带图片的推文),
+    每条推文的回复搜索返回 replies_per_tweet 条回复 (包括楼中楼)。
+    """
+
+    def __init__(self, tweets_per_user=100, replies_per_tweet=20, seed=0):
+        self.tweets_per_user = tweets_per_user
+        self.replies_per_tweet = replies_per_tweet
+        self.random = random.Random(seed)
+        # 推文 ID -> 作者 ID, 用于填写回复的 in_reply_to_user_id
+        self.authors = {}
+        # 与真实推文 ID 一样随时间递增, 保证每次都是"新推文"
+        self.next_id = int(time.time() * 1000) << 22
+
+    def _id(self):
+        self.next_id += 1
+        return str(self.next_id)
+
+    def _created_at(self):
+        created = datetime.now(dt_timezone.utc) - timedelta(seconds=self.random.randint(0, 86400))
+        return created.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+    def _metrics(self):
+        return {
+            'retweet_count': self.random.randint(0, 500),
+            'reply_count': self.random.randint(0, 100),
+            'like_count': self.random.randint(0, 5000),
+            'quote_count': self.random.randint(0, 50),
+        }
+
+    def _tweet(self, author_id, text):
+        tweet_id = self._id()
+        self.authors[tweet_id] = author_id
+        return {
+            'id': tweet_id,
+            'text': text,
+            'author_id': author_id,
+            'created_at': self._created_at(),
+            'edit_history_tweet_ids': [tweet_id],
+            'public_metrics': self._metrics(),
+        }
+
+    def _timeline(self, user_id, params):
+        count = min(self.tweets_per_user, int(params.get('max_results', 100)))
+        data, media, originals = [], [], []
+        for i in range(count):
+            tweet = self._tweet(user_id, f'合成推文 {i} ' + 'lorem ipsum ' * self.random.randint(1, 20))
+            if i % 5 == 1:
+                original = self._tweet('100', f'被转发的原推文 {i}')
+                originals.append(original)
+                tweet['referenced_tweets'] = [{'type': 'retweeted', 'id': original['id']}]
+            elif i % 7 == 2:
+                original = self._tweet('101', f'被引用的原推文 {i}')
+                originals.append(original)
+                tweet['referenced_tweets'] = [{'type': 'quoted', 'id': original['id']}]
+            if i % 4 == 0:
+                media_key = f'3_{tweet["id"]}'
+                media.append({
+                    'media_key': media_key,
+                    'type': 'photo',
+                    'url': f'https://pbs.twimg.com/media/{media_key}.jpg',
+                    'width': 1200,
+                    'height': 800,
+                })
+                tweet['attachments'] = {'media_keys': [media_key]}
+            if i % 3 == 0:
+                tweet['entities'] = {
+                    'hashtags': [{'tag': f'Topic{i % 10}'}],
+                    'mentions': [{'username': 'synthetic_rt', 'id': '100'}],
+                    'urls': [{'url': 'https://t.co/x', 'expanded_url': f'https://example.com/{i}'}],
+                }
+            data.append(tweet)
+        users = [
+            {'id': '100', 'username': 'synthetic_rt', 'name': 'Synthetic RT'},
+            {'id': '101', 'username': 'synthetic_quote', 'name': 'Synthetic Quote'},
+        ]
+        return {
+            'data': data,
+            'includes': {'media': media, 'tweets': originals, 'users': users},
+            'meta': {'result_count': len(data)},
+        }
+
+    def _replies(self, params):
+        conversation_id = params['query'].split(':', 1)[1]
+        count = min(self.replies_per_tweet, int(params.get('max_results', 100)))
+        data, users = [], {}
+        for i in range(count):
+            author_id = str(1000 + self.random.randint(0, 50))
+            users[author_id] = {
+                'id': author_id,
+                'username': f'replier_{author_id}',
+                'name': f'Replier {author_id}',
+                'profile_image_url': f'https://pbs.twimg.com/profile_images/{author_id}.jpg',
+            }
+            # 约三分之一的回复挂在之前的回复下面
+            parent = data[self.random.randrange(len(data))]['id'] if data and i % 3 == 0 else conversation_id
+            reply = self._tweet(author_id, f'合成回复 {i}')
+            reply.update({
+                'conversation_id': conversation_id,
+                'in_reply_to_user_id': self.authors.get(parent, ''),
+                'referenced_tweets': [{'type': 'replied_to', 'id': parent}],
+            })
+            data.append(reply)
+        return {
+            'data': data,
+            'includes': {'users': list(users.values())},
+            'meta': {'result_count': len(data)},
+        }
+
+    def request(self, method, url, params=None, **kwargs):
+        params = params or {}
+        endpoint = rate_limits.endpoint_for(_route(url))
+        if endpoint == rate_limits.USERS_TWEETS:
+            body = self._timeline(_route(url).split('/')[3], params)
+        elif endpoint == rate_limits.SEARCH_RECENT:
+            body = self._replies(params)
+        else:
+            body = {'meta': {'result_count': 0}}
+        return _make_response(url, 200, json.dumps(body))
+
+    def close(self):
+        pass
+
+
+class OfflineClient(RateLimitTrackingClient):
+    """回放/合成数据使用的客户端, 不计入 API 配额"""
+
+    def _make_request(self, method, route, *args, **kwargs):
+        return tweepy.Client._make_request(self, method, route, *args, **kwargs)
+
+
+class QueryCounter:
+    """
+    按监控阶段统计 SQL 查询
+
+    用法:
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            ...
+    """
+
+    def __init__(self):
+        self.queries = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        phase = metrics.current_phase() or 'other'
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries[phase] += 1
+            self.seconds[phase] += time.perf_counter() - started
@@ -0,0 +1,252 @@
+"""
+Twitter API 配额统计与预算规划
+
+每次 API 调用都会记录端点、请求数、返回推文数和 429 次数:
+- Redis (Django 缓存) 中保存实时计数, 包括当前计费周期已读取的推文总数
+- flush_api_usage_task 定期把增量写入 ApiUsage 表 (按天、端点汇总)
+
+规划器根据计费周期内的消耗速度决定各类任务是否执行, 让每月推文读取
+上限 (TWITTER_MONTHLY_TWEET_CAP) 能用到周期结束:
+- 交互请求和定时监控: 额度用完前始终允许, 超出进度时拉长监控间隔
+- 回复抓取: 消耗超过进度 10% 时暂停
+- 历史回填: 消耗达到进度的 90% 时暂停
+"""
+
+import calendar
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import rate_limits
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'twitter:usage:'
+LAST_CYCLE_KEY = 'twitter:quota:last_cycle'
+
+KNOWN_ENDPOINTS = [
+    rate_limits.USERS_TWEETS,
+    rate_limits.SEARCH_RECENT,
+    rate_limits.USER_BY_USERNAME,
+]
+OTHER_ENDPOINT = 'other'
+METRICS = ['requests', 'tweets', 'rate_limited']
+
+# 各类任务允许的最大消耗进度比 (已用 / 按时间均摊应用), None 表示只在额度用完时停止
+PACE_LIMITS = {
+    'interactive': None,
+    'poll': None,
+    'replies': 1.1,
+    'backfill': 0.9,
+}
+
+
+def _delta_key(day, endpoint, metric):
+    return f'{CACHE_PREFIX}delta:{day.isoformat()}:{endpoint}:{metric}'
+
+
+def _period_key(period_start):
+    return f'{CACHE_PREFIX}period:{period_start.isoformat()}:tweets'
+
+
+def _incr(key, amount, timeout):
+    if not amount:
+        return
+    cache.add(key, 0, timeout)
+    cache.incr(key, amount)
+
+
+def record_call(route, tweets=0, rate_limited=False):
+    """
+    记录一次 API 调用
+
+    Args:
+        route: 请求路由
+        tweets: 返回的推文数
+        rate_limited: 是否被限流 (429)
+    """
+    endpoint = rate_limits.endpoint_for(route)
+    if endpoint not in KNOWN_ENDPOINTS:
+        endpoint = OTHER_ENDPOINT
+
+    today = timezone.now().date()
+    try:
+        _incr(_delta_key(today, endpoint, 'requests'), 1, 7 * 86400)
+        _incr(_delta_key(today, endpoint, 'tweets'), tweets, 7 * 86400)
+        _incr(_delta_key(today, endpoint, 'rate_limited'), int(rate_limited), 7 * 86400)
+
+        if tweets:
+            start, _ = billing_period()
+            key = _period_key(start)
+            if cache.get(key) is None:
+                # 缓存丢失时从已持久化的数据恢复
+                cache.add(key, _persisted_tweets(start), 40 * 86400)
+            cache.incr(key, tweets)
+    except Exception as e:
+        # 统计失败不应影响 API 调用本身
+        logger.warning(f"记录 API 用量失败: {str(e)}")
+
+
+def flush():
+    """
+    把缓存中的增量写入 ApiUsage 表
+
+    Returns:
+        int: 写入的记录数
+    """
+    from .models import ApiUsage
+
+    today = timezone.now().date()
+    flushed = 0
+    for day in (today - timedelta(days=1), today):
+        for endpoint in KNOWN_ENDPOINTS + [OTHER_ENDPOINT]:
+            deltas = {
+                metric: cache.get(_delta_key(day, endpoint, metric)) or 0
+                for metric in METRICS
+            }
+            if not any(deltas.values()):
+                continue
+
+            usage, _ = ApiUsage.objects.get_or_create(date=day, endpoint=endpoint)
+            ApiUsage.objects.filter(pk=usage.pk).update(
+                **{metric: F(metric) + value for metric, value in deltas.items()}
+            )
+            # 只减去已写入的部分, 读取之后新增的计数保留到下次
+            for metric, value in deltas.items():
+                if value:
+                    cache.decr(_delta_key(day, endpoint, metric), value)
+            flushed += 1
+    return flushed
+
+
+def billing_period(today=None):
+    """
+    当前计费周期
+
+    Returns:
+        tuple: (开始日期, 下个周期开始日期)
+    """
+    today = today or timezone.now().date()
+    cycle_day = settings.TWITTER_BILLING_CYCLE_DAY
+
+    def period_start(year, month):
+        return date(year, month, min(cycle_day, calendar.monthrange(year, month)[1]))
+
+    start = period_start(today.year, today.month)
+    if today < start:
+        year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+        start = period_start(year, month)
+
+    year, month = (start.year, start.month + 1) if start.month < 12 else (start.year + 1, 1)
+    return start, period_start(year, month)
+
+
+def _persisted_tweets(period_start):
+    from .models import ApiUsage
+
+    total = ApiUsage.objects.filter(date__gte=period_start).aggregate(total=Sum('tweets'))['total']
+    return total or 0
+
+
+def period_tweets(period_start):
+    """计费周期内已读取的推文数"""
+    try:
+        value = cache.get(_period_key(period_start))
+    except Exception:
+        value = None
+    return value if value is not None else _persisted_tweets(period_start)
+
+
+def budget_status():
+    """
+    当前计费周期的额度消耗情况
+
+    Returns:
+        dict: used / cap / burn_rate (条/天) / projected_exhaustion / pace 等
+    """
+    cap = settings.TWITTER_MONTHLY_TWEET_CAP
+    start, end = billing_period()
+    now = timezone.now()
+    period_start = timezone.make_aware(datetime.combine(start, time.min))
+    period_end = timezone.make_aware(datetime.combine(end, time.min))
+
+    used = period_tweets(start)
+    elapsed_days = max((now - period_start).total_seconds() / 86400, 1 / 24)
+    remaining_days = max((period_end - now).total_seconds() / 86400, 1 / 24)
+    total_days = (period_end - period_start).total_seconds() / 86400
+    burn_rate = used / elapsed_days
+    remaining = max(cap - used, 0)
+
+    projected_exhaustion = None
+    if cap and burn_rate > 0:
+        projected = now + timedelta(days=remaining / burn_rate)
+        if projected < period_end:
+            projected_exhaustion = projected
+
+    # 周期开始不足一天时按一天计算进度, 避免刚开始的少量请求被判为超速
+    pace = 0
+    if cap:
+        pace = used / (cap * max(elapsed_days, 1) / total_days)
+
+    return {
+        'cap': cap,
+        'used': used,
+        'remaining': remaining if cap else None,
+        'period_start': start,
+        'period_end': end,
+        'burn_rate': round(burn_rate, 1),
+        'daily_budget': round(remaining / remaining_days, 1) if cap else None,
+        'projected_exhaustion': projected_exhaustion,
+        'pace': round(pace, 2),
+        'exhausted': bool(cap) and used >= cap,
+    }
+
+
+def allow(kind, status=None):
+    """
+    按预算判断某类任务当前是否可以执行
+
+    Args:
+        kind: interactive / poll / replies / backfill
+        status: 可选, 已计算好的 budget_status()
+    """
+    if not settings.TWITTER_MONTHLY_TWEET_CAP:
+        return True
+
+    status = status or budget_status()
+    if status['exhausted']:
+        return False
+
+    limit = PACE_LIMITS[kind]
+    return limit is None or status['pace'] < limit
+
+
+def should_run_cycle():
+    """
+    定时监控是否应执行本轮
+
+    消耗超出进度时按比例拉长两轮之间的最小间隔, 例如进度比 1.5 时
+    30 分钟的监控周期实际变为 45 分钟。
+    """
+    status = budget_status()
+    if not allow('poll', status):
+        return False
+    if status['pace'] <= 1:
+        return True
+
+    last_cycle = cache.get(LAST_CYCLE_KEY)
+    if not last_cycle:
+        return True
+
+    min_gap = timedelta(minutes=settings.TWITTER_POLL_INTERVAL_MINUTES * status['pace'])
+    # 留出 1 分钟余量, 避免调度抖动导致刚好错过
+    return timezone.now() - last_cycle >= min_gap - timedelta(minutes=1)
+
+
+def mark_cycle():
+    """记录一轮定时监控的开始时间"""
+    cache.set(LAST_CYCLE_KEY, timezone.now(), timeout=7 * 86400)
@@ -0,0 +1,124 @@
+"""
+Twitter API 速率限制状态
+
+从每次响应的 x-rate-limit-* 响应头中记录各端点的剩余额度,
+保存在 Django 缓存中, 供 Web、Worker 等进程共享。
+
+额度用完 (剩余 0 或收到 429) 的端点相当于熔断器打开: 窗口重置前
+客户端直接抛出 RateLimited, 不再发出注定失败的请求。
+"""
+
+import logging
+import re
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'twitter:rate_limit:'
+
+# 常用端点 (路由中的 ID 统一替换为 :id)
+USERS_TWEETS = '/2/users/:id/tweets'
+SEARCH_RECENT = '/2/tweets/search/recent'
+USER_BY_USERNAME = '/2/users/by/username/:username'
+
+# 429 响应缺少重置时间时使用的窗口长度 (秒)
+DEFAULT_WINDOW = 15 * 60
+
+
+class RateLimited(Exception):
+    """端点额度已用完 (收到 429, 或熔断器处于打开状态)"""
+
+    def __init__(self, endpoint, retry_after):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(f"{endpoint} 触发速率限制, {retry_after} 秒后重置")
+
+
+def endpoint_for(route):
+    """把具体路由归一化为端点名, 例如 /2/users/123/tweets -> /2/users/:id/tweets"""
+    route = re.sub(r'/by/username/[^/]+', '/by/username/:username', route)
+    # 只替换多位数字段, 保留 /2 版本前缀
+    return re.sub(r'/\d{2,}(?=/|$)', '/:id', route)
+
+
+def record(route, headers):
+    """
+    记录一次响应的速率限制状态
+
+    Args:
+        route: 请求路由
+        headers: 响应头
+    """
+    if 'x-rate-limit-remaining' not in headers:
+        return
+
+    reset = int(headers.get('x-rate-limit-reset', 0))
+    state = {
+        'limit': int(headers.get('x-rate-limit-limit', 0)),
+        'remaining': int(headers['x-rate-limit-remaining']),
+        'reset': reset,
+    }
+    timeout = max(reset - int(time.time()), 0) + 60
+    try:
+        cache.set(CACHE_PREFIX + endpoint_for(route), state, timeout=timeout)
+    except Exception as e:
+        # 记录失败不应影响 API 调用本身
+        logger.warning(f"保存速率限制状态失败: {str(e)}")
+
+
+def get_state(endpoint):
+    """获取端点当前的速率限制状态, 未知时返回 None"""
+    try:
+        return cache.get(CACHE_PREFIX + endpoint)
+    except Exception as e:
+        logger.warning(f"读取速率限制状态失败: {str(e)}")
+        return None
+
+
+def seconds_until_reset(endpoint):
+    """距离端点额度窗口重置的秒数"""
+    state = get_state(endpoint)
+    if not state:
+        return 0
+    return max(state['reset'] - int(time.time()), 0)
+
+
+def has_budget(endpoint, reserve=0):
+    """
+    端点是否还有超过 reserve 的剩余额度
+
+    状态未知或窗口已重置时视为有额度。
+    """
+    state = get_state(endpoint)
+    if not state or state['reset'] <= time.time():
+        return True
+    return state['remaining'] > reserve
+
+
+def trip(endpoint, reset=None):
+    """
+    打开端点的熔断器, 窗口重置前不再发出请求
+
+    Args:
+        endpoint: 端点名
+        reset: 窗口重置时间 (Unix 时间戳), 未知时按 DEFAULT_WINDOW 计算
+    """
+    reset = reset or int(time.time()) + DEFAULT_WINDOW
+    state = get_state(endpoint) or {'limit': 0}
+    state.update({'remaining': 0, 'reset': reset})
+    try:
+        cache.set(CACHE_PREFIX + endpoint, state, timeout=max(reset - int(time.time()), 0) + 60)
+    except Exception as e:
+        logger.warning(f"保存熔断状态失败: {str(e)}")
+
+
+def retry_after(endpoint):
+    """
+    熔断器打开时距离窗口重置的秒数, 可以发出请求时返回 0
+    """
+    state = get_state(endpoint)
+    if not state or state['remaining'] > 0:
+        return 0
+    return max(state['reset'] - int(time.time()) + 1, 0)
@@ -0,0 +1,271 @@
+"""
+告警规则匹配
+
+所有启用规则编译成一个匹配器, 每条文本只扫描一遍, 与规则数量无关:
+- 关键词/短语: Aho-Corasick 自动机 (不区分大小写, 英文关键词要求整词匹配)
+- 正则: 各规则的正则合并为一个带命名分组的正则, 在每个位置用前瞻匹配
+
+规则有变化 (数量或最后修改时间) 时才重新编译, 每次监控只多一条聚合查询。
+"""
+
+import logging
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+
+from django.db.models import Count, Max
+
+from .models import AlertRule, Reply, RuleMatch, Tweet
+
+logger = logging.getLogger(__name__)
+
+# 英文单词字符, 用于判断整词匹配的边界
+WORD_CHARS = re.compile(r'[0-9a-z_]')
+
+
+class Automaton:
+    """
+    Aho-Corasick 多模式匹配
+
+    用法:
+        automaton = Automaton({'python': 1, 'django': 2})
+        list(automaton.iter('i like django'))  # -> [(11, 'django', 2)]
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: 模式 (已小写) -> 值 (多个规则共用同一关键词时为值的列表)
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                node = self.goto[node].setdefault(char, self._new_node())
+            self.output[node].append((pattern, value))
+
+        # 按层 BFS 计算失配指针 (第一层指向根), 并合并后缀节点的输出
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def _new_node(self):
+        self.goto.append({})
+        self.fail.append(0)
+        self.output.append([])
+        return len(self.goto) - 1
+
+    def iter(self, text):
+        """
+        扫描文本
+
+        Yields:
+            tuple: (结束位置, 模式, 值)
+        """
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern, value in self.output[node]:
+                yield index, pattern, value
+
+
+def _whole_word(text, start, end, pattern):
+    """英文关键词要求前后不是单词字符, 中文等关键词不限制"""
+    if WORD_CHARS.match(pattern[0]) and start > 0 and WORD_CHARS.match(text[start - 1]):
+        return False
+    if WORD_CHARS.match(pattern[-1]) and end < len(text) and WORD_CHARS.match(text[end]):
+        return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def _combined_regex(items):
+    """
+    把若干规则的正则合并为一个
+
+    每个位置用前瞻尝试所有分支, 命中第一个分支; 同一位置其它分支的命中
+    由 match_regex 排除已命中的规则后重新扫描得到。
+
+    Args:
+        items: ((规则 ID, 正则), ...)
+    """
+    alternatives = '|'.join(f'(?P<r{rule_id}>{pattern})' for rule_id, pattern in items)
+    return re.compile(f'(?=(?:{alternatives}))', re.IGNORECASE | re.DOTALL)
+
+
+class RuleSet:
+    """
+    编译后的全部启用规则
+
+    正则合并后分组编号会改变, 规则中不能使用按编号的反向引用 (\\1 等)。
+    """
+
+    def __init__(self, rules):
+        self.rules = {}
+        keywords = {}
+        regexes = []
+        # 没有关键词和正则的规则只按用户/类型过滤
+        self.unconditional = []
+        for rule in rules:
+            self.rules[rule.id] = {
+                'users': {user.id for user in rule.users.all()} or None,
+                'types': set(rule.type_list()) or None,
+            }
+            if not rule.keyword_list() and not rule.regex:
+                self.unconditional.append(rule.id)
+            for keyword in rule.keyword_list():
+                keywords.setdefault(keyword.lower(), []).append(rule.id)
+            if rule.regex:
+                try:
+                    _combined_regex(((rule.id, rule.regex),))
+                except re.error as e:
+                    logger.warning(f"规则 {rule.name} 的正则无效, 已忽略: {str(e)}")
+                    continue
+                regexes.append((rule.id, rule.regex))
+
+        self.automaton = Automaton(keywords) if keywords else None
+        self.regexes = tuple(regexes)
+        try:
+            _combined_regex(self.regexes)
+        except re.error as e:
+            # 例如不同规则使用了同名分组, 退回逐条规则扫描
+            logger.warning(f"告警规则的正则无法合并, 改为逐条匹配: {str(e)}")
+            self.combinable = False
+        else:
+            self.combinable = True
+
+    def match_keywords(self, text):
+        """
+        Returns:
+            dict: 规则 ID -> 命中的关键词
+        """
+        hits = {}
+        if self.automaton is None:
+            return hits
+        for end, pattern, rule_ids in self.automaton.iter(text):
+            if not _whole_word(text, end - len(pattern) + 1, end + 1, pattern):
+                continue
+            for rule_id in rule_ids:
+                hits.setdefault(rule_id, pattern)
+        return hits
+
+    def match_regex(self, text):
+        """
+        Returns:
+            dict: 规则 ID -> 命中的文本
+        """
+        hits = {}
+        if not self.combinable:
+            for rule_id, pattern in self.regexes:
+                match = _combined_regex(((rule_id, pattern),)).search(text)
+                if match:
+                    hits[rule_id] = match.group(f'r{rule_id}')
+            return hits
+
+        remaining = self.regexes
+        # 每轮扫描至少新增一个命中, 否则结束; 通常只需一轮
+        while remaining:
+            found = {}
+            for match in _combined_regex(remaining).finditer(text):
+                group = match.lastgroup
+                if group and int(group[1:]) not in found:
+                    found[int(group[1:])] = match.group(group)
+            if not found:
+                break
+            hits.update(found)
+            remaining = tuple(item for item in remaining if item[0] not in found)
+        return hits
+
+    def match(self, text, user_id, tweet_type):
+        """
+        Args:
+            text: 推文/回复内容
+            user_id: 所属监控用户 (推文作者, 或被回复推文的作者)
+            tweet_type: tweet / retweet / quote / reply
+
+        Returns:
+            dict: 命中的规则 ID -> 命中内容
+        """
+        lowered = text.lower()
+        hits = self.match_keywords(lowered)
+        if self.regexes:
+            for rule_id, matched in self.match_regex(text).items():
+                hits.setdefault(rule_id, matched)
+        for rule_id in self.unconditional:
+            hits.setdefault(rule_id, '')
+
+        return {
+            rule_id: matched for rule_id, matched in hits.items()
+            if (self.rules[rule_id]['users'] is None or user_id in self.rules[rule_id]['users'])
+            and (self.rules[rule_id]['types'] is None or tweet_type in self.rules[rule_id]['types'])
+        }
+
+
+_compiled = {'version': None, 'ruleset': None}
+_compiled_lock = threading.Lock()
+
+
+def ruleset():
+    """
+    当前启用规则的匹配器, 规则有变化时重新编译
+
+    Returns:
+        RuleSet: 没有启用的规则时返回 None
+    """
+    active = AlertRule.objects.filter(is_active=True)
+    version = tuple(active.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+    if version[0] == 0:
+        return None
+    if _compiled['version'] != version:
+        with _compiled_lock:
+            if _compiled['version'] != version:
+                rules = list(active.prefetch_related('users'))
+                _compiled['ruleset'] = RuleSet(rules)
+                _compiled['version'] = version
+                logger.info(f"告警规则已重新编译: {len(rules)} 条")
+    return _compiled['ruleset']
+
+
+def apply(events):
+    """
+    对新入库的推文/回复执行规则匹配, 命中结果写入 RuleMatch
+
+    Args:
+        events: live.tweet_event / live.reply_event 返回的字典列表
+
+    Returns:
+        int: 命中数
+    """
+    if not events:
+        return 0
+    compiled = ruleset()
+    if compiled is None:
+        return 0
+
+    tweet_pks = [e['pk'] for e in events if e['type'] == 'tweet']
+    reply_ids = [e['id'] for e in events if e['type'] == 'reply']
+
+    rows = []
+    for tweet in Tweet.objects.filter(id__in=tweet_pks).only('id', 'text', 'author_id', 'tweet_type'):
+        for rule_id, matched in compiled.match(tweet.text, tweet.author_id, tweet.tweet_type).items():
+            rows.append(RuleMatch(rule_id=rule_id, tweet_id=tweet.id, matched=matched[:200]))
+    replies = Reply.objects.filter(reply_id__in=reply_ids).only('id', 'text', 'tweet__author_id').select_related('tweet')
+    for reply in replies:
+        for rule_id, matched in compiled.match(reply.text, reply.tweet.author_id, 'reply').items():
+            rows.append(RuleMatch(rule_id=rule_id, reply_id=reply.id, matched=matched[:200]))
+
+    RuleMatch.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
@@ -3,7 +3,7 @@ REST API 序列化器
 """
 
 from rest_framework import serializers
-from .models import MonitoredUser, Tweet, Reply, MonitorLog
+from .models import MonitoredUser, Tweet, Reply, MonitorLog, ReferencedTweet, Media
 
 
 class MonitoredUserSerializer(serializers.ModelSerializer):
@@ -22,10 +22,38 @@ class MonitoredUserSerializer(serializers.ModelSerializer):
         return obj.tweets.count()
 
 
+class ReferencedTweetSerializer(serializers.ModelSerializer):
+    """原推文序列化器"""
+    
+    class Meta:
+        model = ReferencedTweet
+        fields = [
+            'tweet_id', 'author_user_id', 'author_username', 'author_display_name',
+            'text', 'created_at', 'retweet_count', 'reply_count', 'like_count', 'quote_count'
+        ]
+
+
+class MediaSerializer(serializers.ModelSerializer):
+    """媒体序列化器"""
+    cached_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Media
+        fields = [
+            'media_key', 'media_type', 'width', 'height',
+            'url', 'preview_image_url', 'cached_url'
+        ]
+    
+    def get_cached_url(self, obj):
+        return obj.cached_url
+
+
 class TweetSerializer(serializers.ModelSerializer):
     """推文序列化器"""
     author_username = serializers.CharField(source='author.username', read_only=True)
     author_display_name = serializers.CharField(source='author.display_name', read_only=True)
+    original = ReferencedTweetSerializer(read_only=True)
+    media = MediaSerializer(many=True, read_only=True)
     replies_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -34,7 +62,7 @@ class TweetSerializer(serializers.ModelSerializer):
             'id', 'tweet_id', 'author', 'author_username', 'author_display_name',
             'tweet_type', 'text', 'created_at', 'retweet_count', 'reply_count',
             'like_count', 'quote_count', 'referenced_tweet_id', 'retweeted_tweet_id',
-            'has_media', 'media_urls', 'fetched_at', 'replies_count'
+            'original', 'has_media', 'media_urls', 'media', 'fetched_at', 'replies_count'
         ]
         read_only_fields = ['fetched_at']
     
@@ -44,14 +72,16 @@ class TweetSerializer(serializers.ModelSerializer):
 
 class ReplySerializer(serializers.ModelSerializer):
     """回复序列化器"""
-    author_username = serializers.CharField(source='author.username', read_only=True)
+    author_username = serializers.CharField(source='account.username', read_only=True)
+    author_display_name = serializers.CharField(source='account.display_name', read_only=True)
     tweet_text = serializers.CharField(source='tweet.text', read_only=True)
     
     class Meta:
         model = Reply
         fields = [
-            'id', 'reply_id', 'tweet', 'tweet_text', 'author', 'author_username',
-            'text', 'created_at', 'like_count', 'reply_count', 'fetched_at'
+            'id', 'reply_id', 'tweet', 'tweet_text', 'author', 'account',
+            'author_username', 'author_display_name', 'text', 'created_at', 'in_reply_to_tweet_id', 'in_reply_to_user_id', 'depth',
+            'like_count', 'reply_count', 'fetched_at'
         ]
         read_only_fields = ['fetched_at']
 
@@ -64,6 +94,8 @@ class MonitorLogSerializer(serializers.ModelSerializer):
         model = MonitorLog
         fields = [
             'id', 'user', 'username', 'status', 'tweets_fetched',
-            'replies_fetched', 'error_message', 'created_at'
+            'replies_fetched', 'error_message',
+            'duration_ms', 'fetch_tweets_ms', 'fetch_replies_ms', 'db_write_ms',
+            'rate_limit_wait_ms', 'api_calls', 'bytes_received', 'created_at'
         ]
         read_only_fields = ['created_at']
@@ -15,16 +15,135 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
+import time
 
-from .models import MonitoredUser, Tweet, Reply, MonitorLog
+from . import clients, duplicates, entities, live, locks, metrics, notifications, quota, rate_limits, rules, trending
+from .bulk import upsert_rows
+from .threads import build_paths
+from .models import (
+    MonitoredUser, Tweet, Reply, MonitorLog, UserBackfill,
+    ReferencedTweet, Media, TwitterAccount
+)
 
 logger = logging.getLogger(__name__)
 
+# 时间线接口请求的字段
+# 通过 referenced_tweets 扩展一并返回被转发/引用的原推文及其作者, 无需额外请求
+TIMELINE_TWEET_FIELDS = [
+    'id', 'text', 'created_at', 'public_metrics',
+    'referenced_tweets', 'attachments', 'author_id', 'entities'
+]
+TIMELINE_MEDIA_FIELDS = ['media_key', 'type', 'url', 'preview_image_url', 'width', 'height']
+TIMELINE_EXPANSIONS = [
+    'attachments.media_keys',
+    'referenced_tweets.id',
+    'referenced_tweets.id.author_id',
+]
+
+# 回填时重试也不会成功的错误 (用户不存在、认证失败、无权访问), 直接标记为失败
+BACKFILL_PERMANENT_ERRORS = (tweepy.errors.NotFound, tweepy.errors.Unauthorized, tweepy.errors.Forbidden)
+# 其它错误的重试间隔: 5 分钟起指数增长, 最长 6 小时
+BACKFILL_RETRY_BASE = 300
+BACKFILL_RETRY_MAX = 6 * 3600
+
+
+class RateLimitTrackingClient(tweepy.Client):
+    """
+    记录每次响应的速率限制头和配额用量的 tweepy 客户端
+    
+    stats 累计请求次数、接收字节数和等待速率限制重置的时间 (秒),
+    由调用方在前后取差值得到某次监控的开销。
+    """
+    
+    def __init__(self, *args, wait_on_rate_limit=False, **kwargs):
+        # 由本类自己处理等待, 以便统计等待时间
+        super().__init__(*args, wait_on_rate_limit=False, **kwargs)
+        self.wait_for_reset = wait_on_rate_limit
+        self.stats = {'api_calls': 0, 'bytes_received': 0, 'rate_limit_wait': 0.0}
+    
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        """
+        发出请求
+        
+        端点额度已用完 (熔断器打开) 时不发出请求; 收到 429 时打开熔断器。
+        两种情况下都抛出 RateLimited, 设置了 wait_on_rate_limit 时改为等待窗口重置后重试。
+        """
+        endpoint = rate_limits.endpoint_for(route)
+        while True:
+            wait = rate_limits.retry_after(endpoint)
+            if wait:
+                if not self.wait_for_reset:
+                    raise rate_limits.RateLimited(endpoint, wait)
+                logger.warning(f"{endpoint} 触发速率限制, 等待 {wait} 秒")
+                time.sleep(wait)
+                self.stats['rate_limit_wait'] += wait
+            
+            try:
+                return self._request_once(method, route, params, json, user_auth)
+            except tweepy.errors.TooManyRequests as e:
+                quota.record_call(route, rate_limited=True)
+                reset = int(e.response.headers.get('x-rate-limit-reset', 0))
+                rate_limits.trip(endpoint, reset or None)
+                if not self.wait_for_reset:
+                    raise rate_limits.RateLimited(endpoint, rate_limits.retry_after(endpoint)) from e
+    
+    def _request_once(self, method, route, params, json, user_auth):
+        endpoint = rate_limits.endpoint_for(route)
+        started = time.perf_counter()
+        self.stats['api_calls'] += 1
+        try:
+            response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+        except tweepy.errors.HTTPException as e:
+            self._observe(endpoint, e.response.status_code, started)
+            clients.record_status(e.response.status_code)
+            self.stats['bytes_received'] += len(e.response.content or b'')
+            rate_limits.record(route, e.response.headers)
+            raise
+        except Exception:
+            self._observe(endpoint, 'error', started)
+            raise
+        self._observe(endpoint, response.status_code, started)
+        clients.record_status(response.status_code)
+        self.stats['bytes_received'] += len(response.content)
+        rate_limits.record(route, response.headers)
+        return response
+    
+    def _observe(self, endpoint, status, started):
+        metrics.API_REQUEST_SECONDS.labels(endpoint=endpoint, status=str(status)).observe(
+            time.perf_counter() - started
+        )
+        if status == 429:
+            metrics.API_RATE_LIMITED.labels(endpoint=endpoint).inc()
+    
+    def _make_request(self, method, route, *args, **kwargs):
+        # 429 已在 request 中按次记录
+        try:
+            response = super()._make_request(method, route, *args, **kwargs)
+        except tweepy.errors.HTTPException:
+            quota.record_call(route)
+            raise
+        
+        quota.record_call(route, tweets=self._count_tweets(response))
+        return response
+    
+    def _count_tweets(self, response):
+        """响应中的推文数 (包括 includes 中扩展出的推文, 按读取额度保守计算)"""
+        if not isinstance(response, tweepy.Response):
+            return 0
+        count = 0
+        if isinstance(response.data, list) and response.data and isinstance(response.data[0], tweepy.Tweet):
+            count += len(response.data)
+        elif isinstance(response.data, tweepy.Tweet):
+            count += 1
+        if response.includes:
+            count += len(response.includes.get('tweets', []))
+        return count
+
 
 class TwitterService:
     """Twitter API 服务类"""
     
-    def __init__(self, wait_on_rate_limit=False):
+    def __init__(self, wait_on_rate_limit=False, client=None):
         """
         初始化 Twitter API 客户端
         
@@ -32,17 +151,28 @@ class TwitterService:
             wait_on_rate_limit: 是否在遇到速率限制时自动等待
                               False: 立即抛出异常（推荐，避免 Worker 超时）
                               True: 自动等待直到限制解除
+            client: 可选, 使用已创建的客户端 (例如性能分析时的回放客户端)
         """
-        # 使用 Bearer Token 进行认证 (只读访问)
-        bearer_token = getattr(settings, 'TWITTER_BEARER_TOKEN', None)
-        
-        if not bearer_token:
-            raise ValueError("TWITTER_BEARER_TOKEN 未配置")
+        if client is not None:
+            self.client = client
+        else:
+            # 使用 Bearer Token 进行认证 (只读访问)
+            bearer_token = getattr(settings, 'TWITTER_BEARER_TOKEN', None)
+            
+            if not bearer_token:
+                raise ValueError("TWITTER_BEARER_TOKEN 未配置")
+            
+            self.client = RateLimitTrackingClient(
+                bearer_token=bearer_token,
+                wait_on_rate_limit=wait_on_rate_limit  # 默认不等待，避免 Worker 超时
+            )
+            # 复用本进程共享的 keep-alive 连接
+            self.client.session = clients.session()
         
-        self.client = tweepy.Client(
-            bearer_token=bearer_token,
-            wait_on_rate_limit=wait_on_rate_limit  # 默认不等待，避免 Worker 超时
-        )
+        # 时间线响应中扩展出的原推文, 按推文 ID 去重, 由调用方通过 pop_referenced_tweets 取走
+        self.referenced_tweets = {}
+        self.media_items = {}
+        self.entity_items = []
     
     def get_user_by_username(self, username):
         """
@@ -69,9 +199,9 @@ class TwitterService:
                     'profile_image_url': user.profile_image_url or '',
                 }
             return None
-        except tweepy.errors.TooManyRequests as e:
+        except rate_limits.RateLimited as e:
             logger.error(f"获取用户信息失败 @{username}: API 速率限制 - {str(e)}")
-            raise ValueError("Twitter API 速率限制，请稍后再试") from e
+            raise ValueError(f"Twitter API 速率限制，请 {e.retry_after} 秒后再试") from e
         except tweepy.errors.Forbidden as e:
             logger.error(f"获取用户信息失败 @{username}: API 权限不足 - {str(e)}")
             raise ValueError("免费版 Twitter API 无法使用该功能，需要升级到 Basic 级别") from e
@@ -93,45 +223,146 @@ class TwitterService:
             
         Returns:
             list: 推文列表
+            
+        Raises:
+            RateLimited: 端点额度已用完, 由调用方重新调度, 不当作"没有新推文"
         """
         try:
-            tweets = []
-            
             # 获取推文
             response = self.client.get_users_tweets(
                 id=user_id,
                 max_results=min(max_results, 100),
                 since_id=since_id,
-                tweet_fields=[
-                    'id', 'text', 'created_at', 'public_metrics', 
-                    'referenced_tweets', 'attachments'
-                ],
-                expansions=['attachments.media_keys'],
-                media_fields=['url', 'preview_image_url']
+                tweet_fields=TIMELINE_TWEET_FIELDS,
+                expansions=TIMELINE_EXPANSIONS,
+                media_fields=TIMELINE_MEDIA_FIELDS,
+                user_fields=['username', 'name']
             )
             
-            if not response.data:
-                return tweets
-            
-            # 处理媒体信息
-            media_dict = {}
-            if response.includes and 'media' in response.includes:
-                for media in response.includes['media']:
-                    media_dict[media.media_key] = {
-                        'url': media.url if hasattr(media, 'url') else media.preview_image_url,
-                        'type': media.type
-                    }
-            
-            for tweet in response.data:
-                tweet_data = self._parse_tweet(tweet, media_dict)
-                tweets.append(tweet_data)
-            
-            return tweets
+            return self._parse_timeline_response(response)
             
+        except rate_limits.RateLimited:
+            raise
         except Exception as e:
             logger.error(f"获取用户推文失败 {user_id}: {str(e)}")
             return []
     
+    def fetch_user_tweets_page(self, user_id, max_results=100, until_id=None, pagination_token=None):
+        """
+        按页获取用户的历史推文 (用于回填)
+        
+        与 fetch_user_tweets 不同, 异常会直接抛出, 由调用方决定重试或暂停
+        
+        Args:
+            user_id: Twitter 用户 ID
+            max_results: 每页数量 (5-100)
+            until_id: 只获取此 ID 之前的推文
+            pagination_token: 上一页返回的 next_token
+            
+        Returns:
+            tuple: (推文列表, 下一页令牌或 None)
+        """
+        response = self.client.get_users_tweets(
+            id=user_id,
+            max_results=min(max_results, 100),
+            until_id=until_id,
+            pagination_token=pagination_token,
+            tweet_fields=TIMELINE_TWEET_FIELDS,
+            expansions=TIMELINE_EXPANSIONS,
+            media_fields=TIMELINE_MEDIA_FIELDS,
+            user_fields=['username', 'name']
+        )
+        
+        next_token = response.meta.get('next_token') if response.meta else None
+        return self._parse_timeline_response(response), next_token
+    
+    def _parse_timeline_response(self, response):
+        """解析时间线接口的响应"""
+        tweets = []
+        if not response.data:
+            return tweets
+        
+        # 处理媒体信息
+        media_dict = {}
+        if response.includes and 'media' in response.includes:
+            for media in response.includes['media']:
+                media_dict[media.media_key] = {
+                    'url': media.url or media.preview_image_url,
+                    'type': media.type,
+                    'preview_image_url': media.preview_image_url or '',
+                    'width': media.width,
+                    'height': media.height,
+                }
+        
+        if response.includes and 'tweets' in response.includes:
+            self._collect_referenced_tweets(response.includes)
+        
+        for tweet in response.data:
+            tweet_data = self._parse_tweet(tweet, media_dict)
+            tweets.append(tweet_data)
+            self._collect_media(tweet, media_dict)
+            if tweet.entities:
+                self.entity_items.extend(entities.from_tweet(tweet.id, tweet_data['created_at'], tweet.entities))
+        
+        return tweets
+    
+    def _collect_media(self, tweet, media_dict):
+        """收集推文附带的媒体信息"""
+        if not media_dict or not tweet.attachments:
+            return
+        
+        for key in tweet.attachments.get('media_keys', []):
+            if key not in media_dict:
+                continue
+            media = media_dict[key]
+            self.media_items[key] = {
+                'media_key': key,
+                'tweet_id': str(tweet.id),
+                'media_type': media['type'],
+                'width': media['width'],
+                'height': media['height'],
+                'url': media['url'] or '',
+                'preview_image_url': media['preview_image_url'],
+            }
+    
+    def pop_media_items(self):
+        """取出并清空已收集的媒体信息"""
+        media_items = list(self.media_items.values())
+        self.media_items = {}
+        return media_items
+    
+    def pop_entity_items(self):
+        """取出并清空已收集的推文实体"""
+        entity_items = self.entity_items
+        self.entity_items = []
+        return entity_items
+    
+    def _collect_referenced_tweets(self, includes):
+        """从 includes 中收集被转发/引用的原推文"""
+        users = {user.id: user for user in includes.get('users', [])}
+        
+        for tweet in includes['tweets']:
+            author = users.get(tweet.author_id)
+            metrics = tweet.public_metrics or {}
+            self.referenced_tweets[str(tweet.id)] = {
+                'tweet_id': str(tweet.id),
+                'author_user_id': str(tweet.author_id or ''),
+                'author_username': author.username if author else '',
+                'author_display_name': author.name if author else '',
+                'text': tweet.text,
+                'created_at': tweet.created_at,
+                'retweet_count': metrics.get('retweet_count', 0),
+                'reply_count': metrics.get('reply_count', 0),
+                'like_count': metrics.get('like_count', 0),
+                'quote_count': metrics.get('quote_count', 0),
+            }
+    
+    def pop_referenced_tweets(self):
+        """取出并清空已收集的原推文"""
+        referenced = list(self.referenced_tweets.values())
+        self.referenced_tweets = {}
+        return referenced
+    
     def fetch_tweet_replies(self, tweet_id, max_results=100):
         """
         获取推文的回复
@@ -142,6 +373,9 @@ class TwitterService:
             
         Returns:
             list: 回复列表
+            
+        Raises:
+            RateLimited: 搜索端点额度已用完
         """
         try:
             replies = []
@@ -152,19 +386,40 @@ class TwitterService:
             response = self.client.search_recent_tweets(
                 query=query,
                 max_results=min(max_results, 100),
-                tweet_fields=['id', 'text', 'created_at', 'public_metrics', 'author_id'],
+                tweet_fields=[
+                    'id', 'text', 'created_at', 'public_metrics', 'author_id',
+                    'conversation_id', 'in_reply_to_user_id', 'referenced_tweets'
+                ],
+                expansions=['author_id'],
+                user_fields=['username', 'name', 'profile_image_url'],
             )
             
             if not response.data:
                 return replies
             
+            # 回复作者信息 (author_id 扩展)
+            authors = {}
+            if response.includes and 'users' in response.includes:
+                authors = {user.id: user for user in response.includes['users']}
+            
             for reply in response.data:
                 if reply.id != tweet_id:  # 排除原推文
+                    in_reply_to_tweet_id = ''
+                    for ref in reply.referenced_tweets or []:
+                        if ref.type == 'replied_to':
+                            in_reply_to_tweet_id = str(ref.id)
+                    
+                    author = authors.get(reply.author_id)
                     reply_data = {
                         'reply_id': reply.id,
                         'author_id': reply.author_id,
+                        'author_username': author.username if author else '',
+                        'author_display_name': author.name if author else '',
+                        'author_profile_image_url': (author.profile_image_url or '') if author else '',
                         'text': reply.text,
                         'created_at': reply.created_at,
+                        'in_reply_to_tweet_id': in_reply_to_tweet_id,
+                        'in_reply_to_user_id': str(reply.in_reply_to_user_id or ''),
                         'like_count': reply.public_metrics.get('like_count', 0) if reply.public_metrics else 0,
                         'reply_count': reply.public_metrics.get('reply_count', 0) if reply.public_metrics else 0,
                     }
@@ -172,6 +427,8 @@ class TwitterService:
             
             return replies
             
+        except rate_limits.RateLimited:
+            raise
         except Exception as e:
             logger.error(f"获取推文回复失败 {tweet_id}: {str(e)}")
             return []
@@ -221,8 +478,9 @@ class TwitterService:
 class TwitterMonitorService:
     """Twitter 监控服务类"""
     
-    def __init__(self):
-        self.twitter_service = TwitterService()
+    def __init__(self, twitter_service=None):
+        self.twitter_service = twitter_service or TwitterService()
+        self.live_events = []
     
     def add_monitored_user(self, username):
         """
@@ -253,12 +511,17 @@ class TwitterMonitorService:
         
         return user
     
-    def monitor_user(self, user):
+    def monitor_user(self, user, lock_owner=None):
         """
         监控单个用户的推文和回复
         
+        同一用户同时只执行一次监控, 已有任务在执行时直接返回 in_progress,
+        由调用方合并到正在执行的任务。锁服务不可用时不加锁执行
+        (写入都是幂等的 upsert, 锁只用于避免重复抓取), 不影响批量监控的其它用户。
+        
         Args:
             user: MonitoredUser 对象
+            lock_owner: 用户锁的持有者标识 (通常是 Celery 任务 ID)
             
         Returns:
             dict: 监控结果统计
@@ -267,85 +530,183 @@ class TwitterMonitorService:
             logger.info(f"用户 @{user.username} 监控已禁用")
             return {'tweets': 0, 'replies': 0, 'status': 'disabled'}
         
+        lock = locks.LeaseLock(locks.user_lock_name(user.id), owner=lock_owner)
+        try:
+            acquired = lock.acquire()
+        except locks.LockUnavailable as e:
+            logger.warning(f"用户 @{user.username} 的监控锁不可用, 不加锁执行: {str(e)}")
+            acquired = True
+        if not acquired:
+            running = locks.owner(lock.name)
+            logger.info(f"用户 @{user.username} 的监控正在执行 ({running}), 跳过本次请求")
+            return {'tweets': 0, 'replies': 0, 'status': 'in_progress', 'task_id': running}
+        
+        # 本次监控新增的推文/回复, 结束后 (包括失败时已写入的部分) 执行告警规则,
+        # 并推送给实时订阅方和 Webhook; 写入的推文计算指纹查重, 统计数据更新热门排行
+        self.live_events = []
+        self.saved_tweets = []
+        try:
+            return self._monitor_user(user)
+        finally:
+            lock.release()
+            self._apply_rules(self.live_events)
+            self._index_duplicates(self.saved_tweets)
+            self._update_trending(self.saved_tweets)
+            live.publish(self.live_events)
+            notifications.enqueue(self.live_events)
+    
+    def _apply_rules(self, events):
+        try:
+            matched = rules.apply(events)
+        except Exception as e:
+            # 规则匹配失败不影响监控结果
+            logger.error(f"告警规则匹配失败: {str(e)}")
+            return
+        if matched:
+            logger.info(f"告警规则命中 {matched} 次")
+    
+    def _index_duplicates(self, tweets):
+        try:
+            duplicates.index(tweets)
+        except Exception as e:
+            # 查重失败不影响监控结果
+            logger.error(f"近似重复检测失败: {str(e)}")
+    
+    def _update_trending(self, tweets):
+        try:
+            trending.record(tweets)
+        except Exception as e:
+            # 排行更新失败不影响监控结果
+            logger.error(f"更新热门排行失败: {str(e)}")
+    
+    def _monitor_user(self, user):
+        """在持有用户锁的情况下执行监控"""
         tweets_count = 0
         replies_count = 0
         error_message = ''
+        replies_limited = None
+        timer = metrics.PhaseTimer()
+        stats_before = dict(getattr(self.twitter_service.client, 'stats', {}))
+        started = time.perf_counter()
         
         try:
-            # 获取最新推文 ID (用于增量获取)
-            latest_tweet = user.tweets.order_by('-created_at').first()
-            since_id = latest_tweet.tweet_id if latest_tweet else None
-            
-            # 获取用户推文
-            tweets = self.twitter_service.fetch_user_tweets(
-                user_id=user.user_id,
-                max_results=100,
-                since_id=since_id
-            )
+            with timer.phase('fetch_tweets'):
+                # 获取最新推文 ID (用于增量获取)
+                latest_tweet = user.tweets.order_by('-created_at').first()
+                since_id = latest_tweet.tweet_id if latest_tweet else None
+                
+                # 获取用户推文
+                tweets = self.twitter_service.fetch_user_tweets(
+                    user_id=user.user_id,
+                    max_results=100,
+                    since_id=since_id
+                )
+            
+            with timer.phase('save_tweets'):
+                # 保存原推文 (转发/引用)
+                originals = self._save_referenced_tweets()
+            
+            fetch_replies = quota.allow('replies')
+            if not fetch_replies:
+                logger.info(f"API 额度消耗超出进度, 跳过 @{user.username} 的回复抓取")
             
             # 保存推文
             for tweet_data in tweets:
-                tweet, created = Tweet.objects.update_or_create(
-                    tweet_id=tweet_data['tweet_id'],
-                    defaults={
-                        'author': user,
-                        **tweet_data
-                    }
-                )
+                with timer.phase('save_tweets'):
+                    tweet, created = Tweet.objects.update_or_create(
+                        tweet_id=tweet_data['tweet_id'],
+                        defaults={
+                            'author': user,
+                            'original_id': self._original_for(tweet_data, originals),
+                            **tweet_data
+                        }
+                    )
+                metrics.ROWS_WRITTEN.labels(model='tweet').inc()
+                self.saved_tweets.append(tweet)
+                
                 if created:
                     tweets_count += 1
+                    self.live_events.append(live.tweet_event(tweet))
+                    
+                    # 额度消耗超出进度时跳过回复抓取, 优先保证推文监控
+                    if not fetch_replies:
+                        continue
                     
                     # 获取推文的回复 (只对新推文)
-                    replies = self.twitter_service.fetch_tweet_replies(
-                        tweet_id=tweet_data['tweet_id'],
-                        max_results=50
-                    )
+                    try:
+                        with timer.phase('fetch_replies'):
+                            replies = self.twitter_service.fetch_tweet_replies(
+                                tweet_id=tweet_data['tweet_id'],
+                                max_results=50
+                            )
+                    except rate_limits.RateLimited as e:
+                        # 搜索额度用完: 继续保存剩余推文, 不再抓取回复
+                        logger.warning(f"@{user.username} 的回复抓取触发速率限制, 剩余推文不再抓取回复: {str(e)}")
+                        replies_limited = e
+                        fetch_replies = False
+                        continue
                     
-                    # 保存回复
-                    for reply_data in replies:
-                        # 查找回复作者 (可能是监控用户)
-                        try:
-                            reply_author = MonitoredUser.objects.get(user_id=reply_data['author_id'])
-                        except MonitoredUser.DoesNotExist:
-                            # 如果回复者不是监控用户,跳过
-                            continue
+                    with timer.phase('save_replies'):
+                        # 计算线程路径 (包含所有回复, 即使其作者不是监控用户)
+                        paths = build_paths(replies)
                         
-                        reply, reply_created = Reply.objects.update_or_create(
-                            reply_id=reply_data['reply_id'],
-                            defaults={
-                                'tweet': tweet,
-                                'author': reply_author,
-                                'text': reply_data['text'],
-                                'created_at': reply_data['created_at'],
-                                'like_count': reply_data['like_count'],
-                                'reply_count': reply_data['reply_count'],
-                            }
-                        )
-                        if reply_created:
-                            replies_count += 1
+                        # 保存回复 (包括非监控用户的回复)
+                        new_replies = self._save_replies(tweet, replies, paths)
+                        replies_count += len(new_replies)
+                        self.live_events.extend(live.reply_event(reply_id, tweet) for reply_id in new_replies)
+            
+            # 保存媒体
+            with timer.phase('save_media'):
+                self._save_media()
+                self._save_entities()
             
             # 更新最后检查时间
             user.last_checked_at = timezone.now()
             user.save()
             
-            # 记录日志
+            # 记录日志 (回复抓取被限流时记为部分成功)
+            status = 'partial' if replies_limited else 'success'
             MonitorLog.objects.create(
                 user=user,
-                status='success',
+                status=status,
                 tweets_fetched=tweets_count,
                 replies_fetched=replies_count,
+                error_message=str(replies_limited or ''),
+                **self._timing_fields(timer, stats_before, started),
             )
             
+            timer.observe()
             logger.info(f"监控用户 @{user.username} 完成: {tweets_count} 推文, {replies_count} 回复")
             
             return {
                 'tweets': tweets_count,
                 'replies': replies_count,
-                'status': 'success'
+                'status': status
+            }
+            
+        except rate_limits.RateLimited as e:
+            timer.observe()
+            logger.warning(f"监控用户 @{user.username} 触发速率限制, {e.retry_after} 秒后重试")
+            
+            MonitorLog.objects.create(
+                user=user,
+                status='failed',
+                tweets_fetched=tweets_count,
+                replies_fetched=replies_count,
+                error_message=str(e),
+                **self._timing_fields(timer, stats_before, started),
+            )
+            
+            return {
+                'tweets': tweets_count,
+                'replies': replies_count,
+                'status': 'rate_limited',
+                'retry_after': e.retry_after,
             }
             
         except Exception as e:
             error_message = str(e)
+            timer.observe()
             logger.error(f"监控用户 @{user.username} 失败: {error_message}")
             
             # 记录错误日志
@@ -355,6 +716,7 @@ class TwitterMonitorService:
                 tweets_fetched=tweets_count,
                 replies_fetched=replies_count,
                 error_message=error_message,
+                **self._timing_fields(timer, stats_before, started),
             )
             
             return {
@@ -364,10 +726,35 @@ class TwitterMonitorService:
                 'error': error_message
             }
     
-    def monitor_all_users(self):
+    def _timing_fields(self, timer, stats_before, started):
+        """
+        本次监控的耗时和 API 开销, 用于写入 MonitorLog
+        
+        Args:
+            timer: 记录各阶段耗时的 PhaseTimer
+            stats_before: 监控开始前客户端 stats 的快照
+            started: 开始时间 (time.perf_counter)
+        """
+        stats = getattr(self.twitter_service.client, 'stats', {})
+        delta = {key: value - stats_before.get(key, 0) for key, value in stats.items()}
+        return {
+            'duration_ms': int((time.perf_counter() - started) * 1000),
+            'fetch_tweets_ms': timer.ms('fetch_tweets'),
+            'fetch_replies_ms': timer.ms('fetch_replies'),
+            'db_write_ms': timer.ms('save_tweets', 'save_replies', 'save_media'),
+            'rate_limit_wait_ms': int(delta.get('rate_limit_wait', 0) * 1000),
+            'api_calls': delta.get('api_calls', 0),
+            'bytes_received': delta.get('bytes_received', 0),
+        }
+    
+    def monitor_all_users(self, lock_owner=None):
         """
         监控所有启用的用户
         
+        Args:
+            lock_owner: 用户锁的持有者 (批量监控任务的 task_id), "立即监控"合并到本轮时
+                返回该 ID, 客户端可以查询任务状态
+        
         Returns:
             dict: 总体监控结果
         """
@@ -377,19 +764,28 @@ class TwitterMonitorService:
         total_replies = 0
         success_count = 0
         failed_count = 0
+        in_progress_count = 0
+        rate_limited = []
         
         for user in users:
-            result = self.monitor_user(user)
+            result = self.monitor_user(user, lock_owner=lock_owner)
             total_tweets += result.get('tweets', 0)
             total_replies += result.get('replies', 0)
             
-            if result.get('status') == 'success':
+            if result.get('status') in ('success', 'partial'):
                 success_count += 1
+            elif result.get('status') == 'in_progress':
+                # 该用户正在被单独监控, 本轮跳过
+                in_progress_count += 1
+            elif result.get('status') == 'rate_limited':
+                # 时间线额度用完后熔断器打开, 后续用户不会再发出请求, 由任务层重新调度
+                rate_limited.append({'user_id': user.id, 'retry_after': result['retry_after']})
             else:
                 failed_count += 1
         
         logger.info(
             f"批量监控完成: {success_count} 成功, {failed_count} 失败, "
+            f"{in_progress_count} 跳过 (正在执行), {len(rate_limited)} 限流, "
             f"{total_tweets} 推文, {total_replies} 回复"
         )
         
@@ -397,6 +793,267 @@ class TwitterMonitorService:
             'total_users': users.count(),
             'success': success_count,
             'failed': failed_count,
+            'in_progress': in_progress_count,
+            'rate_limited': rate_limited,
             'total_tweets': total_tweets,
             'total_replies': total_replies,
         }
+    
+    def backfill_user(self, user, max_pages=None):
+        """
+        回填用户的历史推文 (最多到 API 的 3200 条限制)
+        
+        每页写入后保存检查点, 中断后可以从检查点继续。时间线接口剩余额度
+        低于 TWITTER_BACKFILL_RESERVE 时暂停, 把额度留给常规监控。
+        
+        Args:
+            user: MonitoredUser 对象
+            max_pages: 本次最多获取的页数
+            
+        Returns:
+            dict: 回填结果, status 为 completed / paused / rate_limited / over_budget / retrying / failed
+        """
+        max_pages = max_pages or settings.TWITTER_BACKFILL_PAGES_PER_RUN
+        reserve = settings.TWITTER_BACKFILL_RESERVE
+        
+        progress, created = UserBackfill.objects.get_or_create(user=user)
+        if progress.status == 'completed':
+            return {'status': 'completed', 'tweets': 0}
+        
+        if created or not (progress.pagination_token or progress.until_id):
+            # 从已有的最早推文之前开始, 避免重复抓取最新一页
+            progress.until_id = self._oldest_tweet_id(user)
+        
+        progress.status = 'running'
+        progress.save()
+        
+        tweets_count = 0
+        for _ in range(max_pages):
+            if not quota.allow('backfill'):
+                # 月度额度留给实时监控, 由 resume_backfills_task 定时重试
+                progress.status = 'pending'
+                progress.save()
+                logger.info(f"回填 @{user.username} 暂停: API 月度额度消耗超出进度")
+                return {'status': 'over_budget', 'tweets': tweets_count}
+            
+            if not rate_limits.has_budget(rate_limits.USERS_TWEETS, reserve=reserve):
+                return self._pause_backfill(progress, tweets_count)
+            
+            try:
+                tweets, next_token = self.twitter_service.fetch_user_tweets_page(
+                    user_id=user.user_id,
+                    max_results=100,
+                    until_id=None if progress.pagination_token else (progress.until_id or None),
+                    pagination_token=progress.pagination_token or None,
+                )
+            except rate_limits.RateLimited:
+                return self._pause_backfill(progress, tweets_count)
+            except tweepy.errors.BadRequest as e:
+                if not progress.pagination_token:
+                    return self._fail_backfill(progress, tweets_count, e)
+                # 分页令牌失效, 改为从已保存的最早推文之前继续
+                logger.warning(f"回填 @{user.username} 分页令牌失效, 改用 until_id 继续")
+                progress.pagination_token = ''
+                progress.until_id = self._oldest_tweet_id(user)
+                continue
+            except BACKFILL_PERMANENT_ERRORS as e:
+                # 用户不存在、已停用或无权访问, 重试也不会成功
+                return self._fail_backfill(progress, tweets_count, e)
+            except Exception as e:
+                return self._retry_backfill(progress, tweets_count, e)
+            
+            originals = self._save_referenced_tweets()
+            upsert_rows(
+                Tweet,
+                [
+                    {
+                        **tweet_data,
+                        'tweet_id': str(tweet_data['tweet_id']),
+                        'author_id': user.id,
+                        'original_id': self._original_for(tweet_data, originals),
+                    }
+                    for tweet_data in tweets
+                ],
+                'tweet_id',
+            )
+            self._save_media()
+            self._save_entities()
+            self._index_duplicates(
+                Tweet.objects.filter(tweet_id__in=[str(t['tweet_id']) for t in tweets]).only('id', 'text', 'tweet_type')
+            )
+            # 回填到的最近推文也进入热门排行
+            recent = [str(t['tweet_id']) for t in tweets if trending.is_recent(t['created_at'])]
+            if recent:
+                self._update_trending(Tweet.objects.filter(tweet_id__in=recent))
+            
+            tweets_count += len(tweets)
+            progress.attempts = 0
+            progress.next_attempt_at = None
+            progress.error_message = ''
+            progress.pages_fetched += 1
+            progress.tweets_fetched += len(tweets)
+            progress.pagination_token = next_token or ''
+            if tweets:
+                progress.until_id = str(min(int(t['tweet_id']) for t in tweets))
+            
+            if not next_token:
+                progress.status = 'completed'
+                progress.completed_at = timezone.now()
+                progress.save()
+                logger.info(f"回填 @{user.username} 完成: 共 {progress.tweets_fetched} 条推文")
+                return {'status': 'completed', 'tweets': tweets_count}
+            
+            progress.save()
+        
+        return {'status': 'paused', 'tweets': tweets_count}
+    
+    def _save_replies(self, tweet, replies, paths):
+        """
+        批量保存推文的回复, 回复作者写入 TwitterAccount
+        
+        Returns:
+            list: 新增回复的 reply_id
+        """
+        if not replies:
+            return []
+        
+        author_ids = {str(r['author_id']) for r in replies}
+        upsert_rows(
+            TwitterAccount,
+            [
+                {
+                    'user_id': str(r['author_id']),
+                    'username': r['author_username'],
+                    'display_name': r['author_display_name'],
+                    'profile_image_url': r['author_profile_image_url'],
+                }
+                for r in replies
+            ],
+            'user_id',
+        )
+        accounts = dict(
+            TwitterAccount.objects.filter(user_id__in=author_ids).values_list('user_id', 'id')
+        )
+        monitored = dict(
+            MonitoredUser.objects.filter(user_id__in=author_ids).values_list('user_id', 'id')
+        )
+        
+        reply_ids = [str(r['reply_id']) for r in replies]
+        existing = set(Reply.objects.filter(reply_id__in=reply_ids).values_list('reply_id', flat=True))
+        
+        rows = []
+        for reply_data in replies:
+            reply_id = str(reply_data['reply_id'])
+            author_id = str(reply_data['author_id'])
+            path, depth = paths[reply_id]
+            rows.append({
+                'reply_id': reply_id,
+                'tweet_id': tweet.id,
+                'author_id': monitored.get(author_id),
+                'account_id': accounts.get(author_id),
+                'text': reply_data['text'],
+                'created_at': reply_data['created_at'],
+                'in_reply_to_tweet_id': reply_data['in_reply_to_tweet_id'],
+                'in_reply_to_user_id': reply_data['in_reply_to_user_id'],
+                'path': path,
+                'depth': depth,
+                'like_count': reply_data['like_count'],
+                'reply_count': reply_data['reply_count'],
+            })
+        upsert_rows(Reply, rows, 'reply_id')
+        
+        return sorted(set(reply_ids) - existing)
+    
+    def _save_referenced_tweets(self):
+        """
+        保存时间线响应中扩展出的原推文
+        
+        Returns:
+            dict: 推文 ID -> ReferencedTweet 主键
+        """
+        referenced = self.twitter_service.pop_referenced_tweets()
+        if not referenced:
+            return {}
+        
+        upsert_rows(ReferencedTweet, referenced, 'tweet_id')
+        return dict(
+            ReferencedTweet.objects.filter(
+                tweet_id__in=[r['tweet_id'] for r in referenced]
+            ).values_list('tweet_id', 'id')
+        )
+    
+    def _save_media(self):
+        """保存已收集的媒体信息, 关联到已入库的推文"""
+        media_items = self.twitter_service.pop_media_items()
+        if not media_items:
+            return
+        
+        tweets = dict(
+            Tweet.objects.filter(
+                tweet_id__in={m['tweet_id'] for m in media_items}
+            ).values_list('tweet_id', 'id')
+        )
+        rows = [
+            {**m, 'tweet_id': tweets[m['tweet_id']]}
+            for m in media_items if m['tweet_id'] in tweets
+        ]
+        upsert_rows(Media, rows, 'media_key')
+    
+    def _save_entities(self):
+        """保存已收集的推文实体并刷新每日汇总"""
+        entity_items = self.twitter_service.pop_entity_items()
+        if not entity_items:
+            return
+        
+        try:
+            tweets = dict(
+                Tweet.objects.filter(
+                    tweet_id__in={e['tweet_id'] for e in entity_items}
+                ).values_list('tweet_id', 'id')
+            )
+            entities.save([
+                {**e, 'tweet_id': tweets[e['tweet_id']]}
+                for e in entity_items if e['tweet_id'] in tweets
+            ])
+        except Exception as e:
+            # 实体汇总失败不影响监控和回填进度 (推文已保存)
+            logger.error(f"保存推文实体失败: {str(e)}")
+    
+    def _original_for(self, tweet_data, originals):
+        """推文对应的原推文主键 (非转发/引用时为 None)"""
+        ref_id = tweet_data['retweeted_tweet_id'] or tweet_data['referenced_tweet_id']
+        return originals.get(str(ref_id)) if ref_id else None
+    
+    def _oldest_tweet_id(self, user):
+        oldest = user.tweets.order_by('created_at').values_list('tweet_id', flat=True).first()
+        return oldest or ''
+    
+    def _pause_backfill(self, progress, tweets_count):
+        progress.status = 'pending'
+        progress.save()
+        retry_after = rate_limits.seconds_until_reset(rate_limits.USERS_TWEETS)
+        logger.info(f"回填 @{progress.user.username} 暂停: 等待速率限制重置 ({retry_after} 秒)")
+        return {'status': 'rate_limited', 'tweets': tweets_count, 'retry_after': retry_after}
+    
+    def _retry_backfill(self, progress, tweets_count, error):
+        """临时错误: 按指数退避稍后重试, 连续失败超过上限后标记为失败"""
+        progress.attempts += 1
+        if progress.attempts >= settings.TWITTER_BACKFILL_MAX_ATTEMPTS:
+            return self._fail_backfill(progress, tweets_count, error)
+        
+        retry_after = min(BACKFILL_RETRY_BASE * 2 ** (progress.attempts - 1), BACKFILL_RETRY_MAX)
+        progress.status = 'pending'
+        progress.error_message = str(error)
+        progress.next_attempt_at = timezone.now() + timedelta(seconds=retry_after)
+        progress.save()
+        logger.warning(
+            f"回填 @{progress.user.username} 出错 (第 {progress.attempts} 次), {retry_after} 秒后重试: {str(error)}"
+        )
+        return {'status': 'retrying', 'tweets': tweets_count, 'retry_after': retry_after, 'error': str(error)}
+    
+    def _fail_backfill(self, progress, tweets_count, error):
+        progress.status = 'failed'
+        progress.error_message = str(error)
+        progress.save()
+        logger.error(f"回填 @{progress.user.username} 失败: {str(error)}")
+        return {'status': 'failed', 'tweets': tweets_count, 'error': str(error)}
@@ -6,80 +6,298 @@ from celery import shared_task
 from django.utils import timezone
 import logging
 
-from .services import TwitterMonitorService
+from . import locks, metrics
 from .models import MonitoredUser
 
 logger = logging.getLogger(__name__)
 
+# 回填任务重新排队前的间隔 (秒), 让实时监控任务先执行
+BACKFILL_REQUEUE_DELAY = 5
 
-@shared_task
-def monitor_all_users_task():
+# 交互请求和定时监控使用的队列 (路由配置见 settings.CELERY_TASK_ROUTES)
+INTERACTIVE_QUEUE = 'interactive'
+PERIODIC_QUEUE = 'periodic'
+
+# 触发速率限制后, 在窗口重置时间之后再多等的秒数
+RATE_LIMIT_RETRY_MARGIN = 5
+# 单个用户监控因速率限制重试的最大次数
+MONITOR_MAX_RETRIES = 3
+
+
+def queue_initial_backfill(user_id):
+    """
+    新增用户后立即抓取第一批历史推文
+
+    第一次回填放到交互队列, 添加用户后很快就能看到推文;
+    之后的重新排队按默认路由进入维护队列。
+    """
+    return backfill_user_task.apply_async((user_id,), queue=INTERACTIVE_QUEUE)
+
+
+@shared_task(bind=True)
+def monitor_all_users_task(self):
     """
     监控所有启用的用户 (定时任务)
+    
+    同一时间只执行一轮, 上一轮未结束时 (例如执行时间超过调度间隔,
+    或手动启动与定时任务重叠) 直接跳过。锁服务不可用时不加锁执行本轮。
     """
-    logger.info("开始执行定时监控任务")
+    from . import quota
+    from .services import TwitterMonitorService
     
-    service = TwitterMonitorService()
-    result = service.monitor_all_users()
+    cycle_lock = locks.LeaseLock(locks.CYCLE_LOCK, owner=self.request.id)
+    try:
+        acquired = cycle_lock.acquire()
+    except locks.LockUnavailable as e:
+        logger.warning(f"监控周期锁不可用, 不加锁执行本轮: {str(e)}")
+        acquired = True
+    
+    try:
+        if not acquired:
+            running = locks.owner(locks.CYCLE_LOCK)
+            logger.info(f"上一轮监控仍在执行 ({running}), 跳过本轮")
+            return {'skipped': 'in_progress', 'task_id': running}
+        
+        if not quota.should_run_cycle():
+            status = quota.budget_status()
+            logger.info(
+                f"API 额度消耗超出进度, 跳过本轮监控: "
+                f"已用 {status['used']}/{status['cap']}, 进度比 {status['pace']}"
+            )
+            return {'skipped': 'over_budget', 'pace': status['pace']}
+        quota.mark_cycle()
+        
+        logger.info("开始执行定时监控任务")
+        
+        service = TwitterMonitorService()
+        result = service.monitor_all_users(lock_owner=self.request.id)
+    finally:
+        cycle_lock.release()
+    
+    # 被限流的用户在窗口重置后单独重新监控 (仍走定时队列, 不占用交互队列)
+    for item in result['rate_limited']:
+        monitor_single_user_task.apply_async(
+            (item['user_id'],),
+            countdown=item['retry_after'] + RATE_LIMIT_RETRY_MARGIN,
+            queue=PERIODIC_QUEUE,
+        )
+    
+    # 后台缓存新抓取的媒体
+    cache_media_task.delay()
     
     logger.info(f"定时监控任务完成: {result}")
     return result
 
 
-@shared_task
-def monitor_single_user_task(user_id):
+@shared_task(bind=True, max_retries=MONITOR_MAX_RETRIES)
+def monitor_single_user_task(self, user_id):
     """
     监控单个用户 (异步任务)
     
+    该用户已有监控在执行时不重复抓取, 返回正在执行的任务 ID;
+    触发速率限制时在窗口重置后重试。
+    
     Args:
         user_id: MonitoredUser 的 ID
     """
+    from .services import TwitterMonitorService
+    
     try:
         user = MonitoredUser.objects.get(id=user_id)
         service = TwitterMonitorService()
-        result = service.monitor_user(user)
-        logger.info(f"监控用户 @{user.username} 完成: {result}")
-        return result
+        result = service.monitor_user(user, lock_owner=self.request.id)
     except MonitoredUser.DoesNotExist:
         logger.error(f"用户不存在: ID={user_id}")
         return {'error': 'User not found'}
     except Exception as e:
         logger.error(f"监控用户失败: {str(e)}")
         return {'error': str(e)}
+    
+    if result.get('status') == 'in_progress':
+        logger.info(f"用户 @{user.username} 已在监控中, 合并到任务 {result['task_id']}")
+        return result
+    
+    if result.get('status') == 'rate_limited':
+        if self.request.retries >= self.max_retries:
+            logger.error(f"监控用户 @{user.username} 多次触发速率限制, 放弃重试")
+            return result
+        logger.info(f"监控用户 @{user.username} 触发速率限制, {result['retry_after']} 秒后重试")
+        raise self.retry(countdown=result['retry_after'] + RATE_LIMIT_RETRY_MARGIN)
+    
+    cache_media_task.delay()
+    logger.info(f"监控用户 @{user.username} 完成: {result}")
+    return result
 
 
 @shared_task
-def cleanup_old_data_task(days=30):
+def backfill_user_task(user_id):
     """
-    清理旧数据 (定时任务)
+    回填单个用户的历史推文 (低优先级异步任务)
+    
+    每次只抓取少量页面, 未完成时重新排队; 遇到速率限制时等到窗口重置再继续,
+    临时错误按退避时间重试。月度额度消耗超出进度时不再排队, 由 resume_backfills_task 稍后恢复。
     
     Args:
-        days: 保留最近多少天的数据
+        user_id: MonitoredUser 的 ID
+    """
+    from .services import TwitterMonitorService
+    
+    try:
+        user = MonitoredUser.objects.get(id=user_id)
+    except MonitoredUser.DoesNotExist:
+        logger.error(f"用户不存在: ID={user_id}")
+        return {'error': 'User not found'}
+    
+    service = TwitterMonitorService()
+    result = service.backfill_user(user)
+    
+    if result['status'] == 'paused':
+        backfill_user_task.apply_async((user_id,), countdown=BACKFILL_REQUEUE_DELAY)
+    elif result['status'] in ('rate_limited', 'retrying'):
+        backfill_user_task.apply_async((user_id,), countdown=result['retry_after'] + BACKFILL_REQUEUE_DELAY)
+    
+    logger.info(f"回填用户 @{user.username}: {result}")
+    return result
+
+
+@shared_task
+def resume_backfills_task():
+    """
+    重新排队中断的回填任务 (定时任务)
+    
+    Worker 重启等原因会打断回填任务链, 这里把长时间没有进展的回填重新加入队列
+    (出错后等待退避的回填到重试时间后才重新排队)。
     """
     from datetime import timedelta
-    from .models import Tweet, Reply, MonitorLog
+    from django.db.models import Q
+    from .models import UserBackfill
     
-    cutoff_date = timezone.now() - timedelta(days=days)
+    now = timezone.now()
+    stale_before = now - timedelta(hours=1)
+    stalled = UserBackfill.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+        status__in=['pending', 'running'],
+        updated_at__lt=stale_before,
+        user__is_active=True,
+    ).values_list('user_id', flat=True)
+    
+    count = 0
+    for user_id in stalled:
+        backfill_user_task.delay(user_id)
+        count += 1
+    
+    logger.info(f"重新排队 {count} 个回填任务")
+    return {'resumed': count}
+
+
+@shared_task
+def cache_media_task(limit=500):
+    """
+    下载媒体和头像到本地缓存 (异步任务)
+    
+    Args:
+        limit: 本次最多处理的媒体数量
+    """
+    from . import media_cache
+    from .models import Media
+    
+    media_list = list(
+        Media.objects.filter(cache_name='', cache_failed=False)
+        .exclude(url='', preview_image_url='')
+        .order_by('-id')[:limit]
+    )
+    users = list(
+        MonitoredUser.objects.filter(profile_image_cache='').exclude(profile_image_url='')
+    )
+    
+    # 视频只缓存预览图
+    items = [
+        (('media', m.id), m.url if m.media_type == 'photo' else m.preview_image_url or m.url)
+        for m in media_list
+    ] + [(('user', u.id), u.profile_image_url) for u in users]
+    names = media_cache.download_all(items)
+    
+    for m in media_list:
+        name = names.get(('media', m.id))
+        m.cache_name = name or ''
+        m.cache_failed = not name
+    Media.objects.bulk_update(media_list, ['cache_name', 'cache_failed'])
+    
+    for u in users:
+        u.profile_image_cache = names.get(('user', u.id)) or ''
+    MonitoredUser.objects.bulk_update(users, ['profile_image_cache'])
+    
+    # 淘汰超出容量、最久未使用的文件, 并清除对应引用以便下次重新下载
+    evicted = media_cache.evict()
+    if evicted:
+        Media.objects.filter(cache_name__in=evicted).update(cache_name='')
+        MonitoredUser.objects.filter(profile_image_cache__in=evicted).update(profile_image_cache='')
+    
+    cached = sum(1 for name in names.values() if name)
+    logger.info(f"媒体缓存完成: 下载 {cached}/{len(items)} 个文件, 淘汰 {len(evicted)} 个")
+    
+    return {
+        'downloaded': cached,
+        'failed': len(items) - cached,
+        'evicted': len(evicted),
+    }
+
+
+@shared_task
+def deliver_notifications_task():
+    """
+    投递待发送的 Webhook 通知 (新事件入队后调度, 另有定时任务兜底)
+    """
+    from . import notifications
+    
+    return notifications.deliver()
+
+
+@shared_task
+def flush_api_usage_task():
+    """
+    把缓存中的 API 用量计数写入数据库 (定时任务)
+    """
+    from . import quota
+    
+    flushed = quota.flush()
+    return {'flushed': flushed}
+
+
+@shared_task
+def cleanup_old_data_task(days=30):
+    """
+    归档旧数据 (定时任务)
     
-    # 删除旧推文
-    old_tweets = Tweet.objects.filter(created_at__lt=cutoff_date)
-    tweets_count = old_tweets.count()
-    old_tweets.delete()
+    过期的推文 (连同回复) 和监控日志写入冷存储分段文件后从数据库删除,
+    API 按时间范围查询时仍可读取, 见 archive 模块。
     
-    # 删除旧回复
-    old_replies = Reply.objects.filter(created_at__lt=cutoff_date)
-    replies_count = old_replies.count()
-    old_replies.delete()
+    Args:
+        days: 数据库中保留最近多少天的数据
+    """
+    from datetime import timedelta
+    from . import archive
+    
+    cutoff_date = timezone.now() - timedelta(days=days)
+    try:
+        result = archive.archive_before(cutoff_date)
+    except archive.ArchiveUnavailable as e:
+        # 不能确认归档已持久保存时不删除数据库中的数据
+        logger.error(f"归档失败, 未删除数据: {str(e)}")
+        return {'error': str(e)}
     
-    # 删除旧日志
-    old_logs = MonitorLog.objects.filter(created_at__lt=cutoff_date)
-    logs_count = old_logs.count()
-    old_logs.delete()
+    metrics.ROWS_DELETED.labels(model='tweet').inc(result['tweets'])
+    metrics.ROWS_DELETED.labels(model='reply').inc(result['replies'])
+    metrics.ROWS_DELETED.labels(model='monitorlog').inc(result['logs'])
     
-    logger.info(f"清理完成: 删除 {tweets_count} 条推文, {replies_count} 条回复, {logs_count} 条日志")
+    logger.info(
+        f"归档完成: {result['tweets']} 条推文, {result['replies']} 条回复, {result['logs']} 条日志, "
+        f"新增 {result['segments']} 个分段"
+    )
     
     return {
-        'tweets_deleted': tweets_count,
-        'replies_deleted': replies_count,
-        'logs_deleted': logs_count,
+        'tweets_archived': result['tweets'],
+        'replies_archived': result['replies'],
+        'logs_archived': result['logs'],
+        'segments_written': result['segments'],
     }
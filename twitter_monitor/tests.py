@@ -1,3 +1,777 @@
-from django.test import TestCase
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import tweepy
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+
+from . import analytics, archive, async_db, duplicates, entities, live, locks, media_cache, rules, trending
+from .bulk import _default_fields
+from .db_router import PIN_COOKIE, ReplicaRoutingMiddleware, _use_replica
+from .threads import MAX_DEPTH, build_paths
+from .models import (
+    AlertRule, ArchiveSegment, EntityDailyCount, Media, MediaCacheFile, MonitorLog, MonitoredUser, Reply, RuleMatch,
+    Tweet, TweetFingerprint, TwitterAccount, UserBackfill,
+)
+from .services import TwitterMonitorService
+
+
+class FakeMediaSource:
+    """只提供 _save_media 需要的接口"""
+
+    def __init__(self, media_items):
+        self.media_items = media_items
+
+    def pop_media_items(self):
+        media_items, self.media_items = self.media_items, []
+        return media_items
+
+
+def media_item(tweet_id, key='3_1'):
+    # 与 TwitterService._collect_media 收集的字段相同
+    return {
+        'media_key': key,
+        'tweet_id': tweet_id,
+        'media_type': 'photo',
+        'width': 1200,
+        'height': 800,
+        'url': 'https://pbs.twimg.com/media/1.jpg',
+        'preview_image_url': '',
+    }
+
+
+class SaveMediaTests(TestCase):
+    """媒体写入: 行中没有的 cache_name / cache_failed 使用模型默认值, 重复写入不覆盖缓存状态"""
+
+    def setUp(self):
+        user = MonitoredUser.objects.create(username='u', user_id='42')
+        self.tweet = Tweet.objects.create(author=user, tweet_id='100', text='t', created_at=timezone.now())
+
+    def save_media(self, *media_items):
+        TwitterMonitorService(twitter_service=FakeMediaSource(list(media_items)))._save_media()
+
+    def test_copy_fills_model_defaults(self):
+        fields = {f.name for f in _default_fields(Media, list(media_item('100')) + ['tweet_id'])}
+        self.assertEqual(fields, {'cache_name', 'cache_failed'})
+
+    def test_save_media_keeps_cache_state(self):
+        self.save_media(media_item('100'))
+        media = Media.objects.get(media_key='3_1')
+        self.assertEqual((media.tweet_id, media.cache_name, media.cache_failed), (self.tweet.id, '', False))
+
+        Media.objects.filter(pk=media.pk).update(cache_name='abc.jpg', cache_failed=True)
+        self.save_media(media_item('100'))
+        media.refresh_from_db()
+        self.assertEqual((media.cache_name, media.cache_failed), ('abc.jpg', True))
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY 路径只在 PostgreSQL 下使用')
+    def test_save_media_postgres_copy_path(self):
+        self.save_media(media_item('100'), media_item('100', key='3_2'))
+        self.assertEqual(
+            list(Media.objects.order_by('media_key').values_list('media_key', 'cache_name', 'cache_failed')),
+            [('3_1', '', False), ('3_2', '', False)],
+        )
+
+
+def use_temporary_storage(test, alias, **overrides):
+    """测试期间把 STORAGES[alias] 指向临时目录, 同时覆盖其它设置"""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    storages = {
+        **settings.STORAGES,
+        alias: {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': directory.name}},
+    }
+    override = test.settings(STORAGES=storages, **overrides)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+class MediaCacheTests(TestCase):
+    """媒体缓存: 文件在共享存储中, 按数据库记录的使用时间淘汰, 请求时不写入"""
+
+    def setUp(self):
+        use_temporary_storage(self, 'media_cache', MEDIA_CACHE_PUBLIC_URL='')
+
+    def test_store_is_content_addressed(self):
+        name = media_cache.store(b'jpeg', 'jpg')
+        self.assertEqual(media_cache.store(b'jpeg', 'jpg'), name)
+        self.assertEqual(media_cache.storage().listdir(name[:2]), ([], [name]))
+
+    def test_evict_least_recently_used(self):
+        names = [media_cache.store(content, 'jpg') for content in (b'old' * 10, b'new' * 10)]
+        media_cache.record({names[0]: 30})
+        MediaCacheFile.objects.filter(name=names[0]).update(last_used_at=timezone.now() - timedelta(days=1))
+        media_cache.record({names[1]: 30})
+
+        self.assertEqual(media_cache.evict(max_bytes=40), [names[0]])
+        self.assertFalse(media_cache.storage().exists(media_cache.path_for(names[0])))
+        self.assertEqual(list(MediaCacheFile.objects.values_list('name', flat=True)), [names[1]])
+        self.assertEqual(media_cache.evict(max_bytes=40), [])
+
+    def test_serve_and_public_url(self):
+        name = media_cache.store(b'jpeg', 'jpg')
+        response = self.client.get(media_cache.url(name))
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(media_cache.url('0' * 64 + '.jpg')).status_code, 404)
+
+        with self.settings(MEDIA_CACHE_PUBLIC_URL='https://cdn.example.com/media_cache'):
+            self.assertEqual(media_cache.url(name), f'https://cdn.example.com/media_cache/{name[:2]}/{name}')
+
+
+class ArchiveDurabilityTests(TestCase):
+    """归档: 只写入持久存储, 校验通过后才删除数据库中的行, 分段缺失时查询报错"""
+
+    def setUp(self):
+        use_temporary_storage(self, 'archive', ARCHIVE_DURABLE=True)
+        self.user = MonitoredUser.objects.create(username='u', user_id='42')
+        self.created_at = timezone.now() - timedelta(days=60)
+        for i in range(3):
+            tweet = Tweet.objects.create(author=self.user, tweet_id=str(100 + i), text=f't{i}', created_at=self.created_at)
+            Reply.objects.create(tweet=tweet, reply_id=str(200 + i), text='r', created_at=self.created_at)
+        self.cutoff = timezone.now() - timedelta(days=30)
+
+    def test_refuses_without_durable_storage(self):
+        with self.settings(ARCHIVE_DURABLE=False), self.assertRaises(archive.ArchiveUnavailable):
+            archive.archive_before(self.cutoff)
+        self.assertEqual(Tweet.objects.count(), 3)
+        self.assertFalse(ArchiveSegment.objects.exists())
+
+    def test_verification_failure_keeps_rows(self):
+        stored = archive.storage()
+        original_open = stored.open
+
+        def corrupted_open(name, mode='rb'):
+            f = original_open(name, mode)
+            f.seek(4)
+            return f
+
+        with mock.patch.object(stored, 'open', corrupted_open), self.assertRaises(archive.ArchiveUnavailable):
+            archive.archive_before(self.cutoff)
+        self.assertEqual((Tweet.objects.count(), Reply.objects.count()), (3, 3))
+        self.assertFalse(ArchiveSegment.objects.exists())
+        # 未写入索引的文件已删除
+        partition = f'tweet/{timezone.localtime(self.created_at):%Y-%m}/author-{self.user.pk}'
+        self.assertEqual(stored.listdir(partition)[1], [])
+
+    def test_missing_segment_is_an_error(self):
+        result = archive.archive_before(self.cutoff)
+        self.assertEqual((result['tweets'], result['replies']), (3, 3))
+        self.assertFalse(Tweet.objects.exists())
+
+        response = self.client.get('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z'})
+        self.assertEqual(len(response.json()['results']), 3)
+
+        archive.storage().delete(ArchiveSegment.objects.get(kind='tweet').path)
+        with self.assertLogs('twitter_monitor.archive', 'ERROR'):
+            response = self.client.get('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 503)
+
+
+class ArchiveRoundTripTests(TestCase):
+    """归档后删除, 列表 API 按时间范围查询仍返回相同的行, 游标分页只读取需要的块"""
+
+    def setUp(self):
+        use_temporary_storage(self, 'archive', ARCHIVE_DURABLE=True)
+        for patcher in (mock.patch.object(archive, 'BLOCK_ROWS', 2), mock.patch.object(PageNumberPagination, 'page_size', 7)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.now = timezone.now()
+        self.users = [MonitoredUser.objects.create(username=f'u{i}', user_id=str(i)) for i in range(2)]
+        for i in range(40):
+            # 每两条推文时间相同, 分页需要按 id 区分
+            created_at = self.now - timedelta(days=10 + i - i % 2)
+            tweet = Tweet.objects.create(
+                author=self.users[i % 2], tweet_id=str(1000 + i), text=f'{"cat" if i % 3 else "dog"} {i}',
+                created_at=created_at, like_count=i,
+            )
+            Reply.objects.create(tweet=tweet, reply_id=str(5000 + i), text='r', created_at=created_at + timedelta(hours=1))
+            log = MonitorLog.objects.create(user=self.users[i % 2], status='success')
+            MonitorLog.objects.filter(pk=log.pk).update(created_at=created_at)
+
+        # 归档后相同时间的行按 id 倒序排列
+        self.before = {
+            path: sorted(self.walk(path, {'created_after': '2000-01-01T00:00:00Z'}), key=lambda row: (row['created_at'], row['id']), reverse=True)
+            for path in ('/twitter/api/tweets/', '/twitter/api/replies/', '/twitter/api/logs/')
+        }
+        # 保留最近 25 天: 较早的 24 条推文归档, 其余仍在数据库中
+        result = archive.archive_before(self.now - timedelta(days=25))
+        self.assertEqual(result['tweets'], 24)
+        self.assertEqual(Tweet.objects.count(), 16)
+
+    def walk(self, path, params):
+        """按 next 翻完所有页"""
+        rows = []
+        response = self.client.get(path, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            rows.extend(data['results'])
+            if not data['next']:
+                return rows
+            response = self.client.get(data['next'])
+
+    def test_round_trip(self):
+        for path, rows in self.before.items():
+            with self.subTest(path=path):
+                self.assertEqual(self.walk(path, {'created_after': '2000-01-01T00:00:00Z'}), rows)
+        ascending = self.walk('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z', 'ordering': 'created_at'})
+        self.assertEqual(ascending, self.before['/twitter/api/tweets/'][::-1])
+
+    def test_date_range_and_filters(self):
+        start, end = self.now - timedelta(days=28), self.now - timedelta(days=21)
+        params = {'created_after': start.isoformat(), 'created_before': end.isoformat(), 'author': self.users[0].pk}
+        expected = [
+            row for row in self.before['/twitter/api/tweets/']
+            if start.isoformat() <= row['created_at'] < end.isoformat() and row['author'] == self.users[0].pk
+        ]
+        self.assertTrue(expected)
+        self.assertEqual(self.walk('/twitter/api/tweets/', params), expected)
+
+        rows = self.walk('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z', 'search': 'dog'})
+        self.assertEqual([row['tweet_id'] for row in rows], [
+            row['tweet_id'] for row in self.before['/twitter/api/tweets/'] if row['text'].startswith('dog')
+        ])
+
+    def test_backfilled_hot_rows_interleave(self):
+        # 回填写入的旧推文比部分归档数据更早, 仍按时间归并到正确位置
+        Tweet.objects.create(author=self.users[0], tweet_id='9999', text='late', created_at=self.now - timedelta(days=30, hours=12))
+        rows = self.walk('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z'})
+        positions = [(row['created_at'], row['id']) for row in rows]
+        self.assertEqual(len(rows), 41)
+        self.assertEqual(positions, sorted(positions, reverse=True))
+
+    def test_first_page_reads_few_blocks(self):
+        blocks = sum(len(segment.blocks) for segment in ArchiveSegment.objects.filter(kind='tweet'))
+        with mock.patch.object(archive, '_read_block', wraps=archive._read_block) as read_block:
+            response = self.client.get('/twitter/api/tweets/', {'created_before': (self.now - timedelta(days=20)).isoformat()})
+        self.assertEqual(len(response.json()['results']), 7)
+        self.assertEqual(blocks, 12)
+        self.assertLessEqual(read_block.call_count, 4)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/twitter/api/tweets/', {'created_after': '2000-01-01T00:00:00Z', 'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FakeEntitySource:
+    """只提供 _save_entities 需要的接口"""
+
+    def __init__(self, entity_items):
+        self.entity_items = entity_items
+
+    def pop_entity_items(self):
+        entity_items, self.entity_items = self.entity_items, []
+        return entity_items
+
+
+class SaveEntitiesTests(TestCase):
+    """实体汇总失败时只记录错误, 不中断监控和回填进度"""
+
+    def test_failure_is_logged(self):
+        user = MonitoredUser.objects.create(username='u', user_id='42')
+        created_at = timezone.now()
+        Tweet.objects.create(author=user, tweet_id='100', text='t', created_at=created_at)
+        service = TwitterMonitorService(twitter_service=FakeEntitySource([
+            {'tweet_id': '100', 'kind': 'hashtag', 'value': 'django', 'created_at': created_at},
+        ]))
+        with mock.patch('twitter_monitor.entities.save', side_effect=RuntimeError('boom')), \
+                self.assertLogs('twitter_monitor.services', 'ERROR'):
+            service._save_entities()
+
+
+class EntityDailyCountTests(TestCase):
+    """实体每日汇总: 重复抓取或回填同一推文不重复计数, 按当前时区的日期汇总"""
+
+    def setUp(self):
+        self.user = MonitoredUser.objects.create(username='u', user_id='42')
+
+    def ingest(self, tweet_id, created_at, entities_data):
+        Tweet.objects.get_or_create(
+            tweet_id=tweet_id, defaults={'author': self.user, 'text': 't', 'created_at': created_at},
+        )
+        TwitterMonitorService(twitter_service=FakeEntitySource(
+            entities.from_tweet(tweet_id, created_at, entities_data)
+        ))._save_entities()
+
+    def counts(self):
+        return sorted(EntityDailyCount.objects.values_list('date', 'kind', 'value', 'count'))
+
+    def test_reingest_is_idempotent(self):
+        now = timezone.now()
+        tags = {'hashtags': [{'tag': 'Python'}, {'tag': '#python'}], 'mentions': [{'username': 'Django'}]}
+        self.ingest('100', now, tags)
+        self.ingest('101', now, {'hashtags': [{'tag': 'PYTHON'}]})
+        expected = [
+            (timezone.localdate(now), 'hashtag', 'python', 2),
+            (timezone.localdate(now), 'mention', 'django', 1),
+        ]
+        self.assertEqual(self.counts(), expected)
+
+        # 再次抓取同一批推文
+        self.ingest('100', now, tags)
+        self.ingest('101', now, {'hashtags': [{'tag': 'PYTHON'}]})
+        self.assertEqual(self.counts(), expected)
+
+        # 回填更早的推文只影响它所在的日期
+        earlier = now - timedelta(days=3)
+        self.ingest('50', earlier, {'hashtags': [{'tag': 'python'}]})
+        self.assertEqual(self.counts(), sorted(expected + [(timezone.localdate(earlier), 'hashtag', 'python', 1)]))
+        self.assertEqual(entities.top('hashtag', days=7), [{'value': 'python', 'count': 3}])
+        self.assertEqual(entities.top('hashtag', days=1), [{'value': 'python', 'count': 2}])
+
+    @override_settings(TIME_ZONE='Asia/Shanghai')
+    def test_local_date(self):
+        # UTC 3 月 1 日 17:00 是北京时间 3 月 2 日 01:00
+        created_at = datetime(2024, 3, 1, 17, 0, tzinfo=dt_timezone.utc)
+        self.ingest('100', created_at, {'cashtags': [{'tag': '$TSLA'}]})
+        self.ingest('101', created_at - timedelta(hours=2), {'cashtags': [{'tag': 'tsla'}]})
+        self.assertEqual(self.counts(), [
+            (date(2024, 3, 1), 'cashtag', 'tsla', 1),
+            (date(2024, 3, 2), 'cashtag', 'tsla', 1),
+        ])
+
+
+class BrokenRedis:
+    """所有命令都连接失败的 Redis 客户端"""
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            raise ConnectionError('Connection refused')
+        return command
+
+
+@override_settings(
+    REDIS_URL='',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'locks-tests'}},
+)
+class LeaseLockTests(SimpleTestCase):
+    """租约锁: 同一时间只有一个持有者, 只有持有者能续约和释放"""
+
+    def test_acquire_renew_release(self):
+        lock = locks.LeaseLock('test:lock', owner='a', ttl=60)
+        self.assertTrue(lock.acquire())
+        self.assertEqual(locks.owner('test:lock'), 'a')
+        self.assertTrue(lock.renew())
+
+        lock.release()
+        self.assertFalse(lock.acquired)
+        self.assertIsNone(locks.owner('test:lock'))
+        self.assertFalse(lock.renew())
+
+    def test_concurrent_owners(self):
+        first = locks.LeaseLock('test:lock', owner='a', ttl=60)
+        second = locks.LeaseLock('test:lock', owner='b', ttl=60)
+        with first as acquired:
+            self.assertTrue(acquired)
+            self.assertFalse(second.acquire())
+            self.assertFalse(second.renew())
+            # 未持有锁时释放不会删除别人的锁
+            second.release()
+            self.assertEqual(locks.owner('test:lock'), 'a')
+        self.assertTrue(second.acquire())
+        self.assertEqual(locks.owner('test:lock'), 'b')
+        second.release()
+
+    def test_backend_down(self):
+        lock = locks.LeaseLock('test:lock', owner='a', ttl=60)
+        with mock.patch.object(locks, '_redis', return_value=BrokenRedis()):
+            with self.assertRaises(locks.LockUnavailable):
+                lock.acquire()
+            self.assertFalse(lock.acquired)
+            with self.assertLogs('twitter_monitor.locks', 'WARNING'):
+                self.assertIsNone(locks.owner('test:lock'))
+
+
+class MonitorLockUnavailableTests(TestCase):
+    """锁服务不可用时批量监控不中断, 每个用户不加锁执行"""
+
+    def test_cycle_continues(self):
+        for i in range(3):
+            MonitoredUser.objects.create(username=f'u{i}', user_id=str(i))
+        service = TwitterMonitorService(twitter_service=FakeMediaSource([]))
+        result = {'tweets': 1, 'replies': 0, 'status': 'success'}
+        with mock.patch.object(locks, '_redis', return_value=BrokenRedis()), \
+                mock.patch.object(TwitterMonitorService, '_monitor_user', return_value=result) as monitor, \
+                self.assertLogs('twitter_monitor.services', 'WARNING'):
+            summary = service.monitor_all_users(lock_owner='task-1')
+        self.assertEqual(monitor.call_count, 3)
+        self.assertEqual((summary['success'], summary['failed'], summary['total_tweets']), (3, 0, 3))
+
+
+class FailingTimeline(FakeMediaSource):
+    """时间线接口每次都抛出给定异常"""
+
+    def __init__(self, error):
+        super().__init__([])
+        self.error = error
+
+    def fetch_user_tweets_page(self, **kwargs):
+        raise self.error
+
+
+def http_error(error_class, status_code):
+    response = mock.Mock(status_code=status_code, reason='error')
+    response.json.return_value = {}
+    return error_class(response)
+
+
+@override_settings(TWITTER_BACKFILL_MAX_ATTEMPTS=3)
+class BackfillRetryTests(TestCase):
+    """回填出错: 临时错误按指数退避重试, 超过次数或永久错误才标记为失败"""
+
+    def setUp(self):
+        self.user = MonitoredUser.objects.create(username='u', user_id='42')
+
+    def backfill(self, error):
+        with self.assertLogs('twitter_monitor.services', 'WARNING'):
+            return TwitterMonitorService(twitter_service=FailingTimeline(error)).backfill_user(self.user)
+
+    def test_transient_error_backs_off(self):
+        retry_after = []
+        for _ in range(2):
+            result = self.backfill(ConnectionError('reset'))
+            self.assertEqual(result['status'], 'retrying')
+            retry_after.append(result['retry_after'])
+            progress = UserBackfill.objects.get(user=self.user)
+            self.assertEqual(progress.status, 'pending')
+            self.assertGreater(progress.next_attempt_at, timezone.now())
+        self.assertEqual(retry_after[1], retry_after[0] * 2)
+
+        result = self.backfill(ConnectionError('reset'))
+        self.assertEqual(result['status'], 'failed')
+        progress = UserBackfill.objects.get(user=self.user)
+        self.assertEqual((progress.status, progress.attempts), ('failed', 3))
+
+    def test_permanent_error_fails(self):
+        result = self.backfill(http_error(tweepy.errors.NotFound, 404))
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(UserBackfill.objects.get(user=self.user).attempts, 0)
+
+
+class ReplyStrTests(TestCase):
+    """回复者账号被删除后 __str__ 仍可用 (Admin 列表、删除确认页)"""
+
+    def test_deleted_account(self):
+        user = MonitoredUser.objects.create(username='u', user_id='42')
+        tweet = Tweet.objects.create(author=user, tweet_id='100', text='t', created_at=timezone.now())
+        account = TwitterAccount.objects.create(user_id='99', username='stranger')
+        reply = Reply.objects.create(tweet=tweet, reply_id='200', account=account, text='r', created_at=timezone.now())
+        self.assertEqual(str(reply), 'stranger 回复 u')
+
+        account.delete()
+        reply.refresh_from_db()
+        self.assertEqual(str(reply), '#200 回复 u')
+
+
+class BuildPathsTests(SimpleTestCase):
+    """回复线程路径: 超过 MAX_DEPTH 的回复截断层级, 路径长度不超过 Reply.path"""
+
+    def test_deep_chain_is_capped(self):
+        # 根推文 1000, 每条回复回复上一条, 共 MAX_DEPTH + 30 层
+        replies = [
+            {'reply_id': str(1001 + i), 'in_reply_to_tweet_id': str(1000 + i)}
+            for i in range(MAX_DEPTH + 30)
+        ]
+        paths = build_paths(replies)
+        max_length = Reply._meta.get_field('path').max_length
+
+        self.assertEqual(max(depth for _, depth in paths.values()), MAX_DEPTH)
+        self.assertTrue(all(len(path) <= max_length for path, _ in paths.values()))
+        # 截断后的回复与其它深层回复同级, 按 path 排序仍是时间顺序
+        ordered = sorted(paths, key=lambda reply_id: paths[reply_id][0])
+        self.assertEqual(ordered, [reply['reply_id'] for reply in replies])
+        deepest = paths[replies[-1]['reply_id']][0]
+        self.assertTrue(deepest.startswith(paths[replies[MAX_DEPTH - 2]['reply_id']][0] + '/'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=15)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    """读写分离中间件在同步和异步调用链中都只在本次请求内允许读取副本"""
+
+    def call(self, mode, request):
+        seen = []
+
+        def sync_view(request):
+            seen.append(_use_replica.get())
+            return HttpResponse()
+
+        async def async_view(request):
+            return sync_view(request)
+
+        middleware = ReplicaRoutingMiddleware(async_view if mode == 'async' else sync_view)
+        if iscoroutinefunction(middleware):
+            response = async_to_sync(middleware)(request)
+        else:
+            response = middleware(request)
+        return middleware, seen, response
+
+    def test_sync_and_async(self):
+        factory = RequestFactory()
+        for mode in ('sync', 'async'):
+            with self.subTest(mode=mode):
+                middleware, seen, response = self.call(mode, factory.get('/'))
+                self.assertEqual(iscoroutinefunction(middleware), mode == 'async')
+                self.assertEqual(seen, [True])
+                self.assertNotIn(PIN_COOKIE, response.cookies)
+
+                _, seen, response = self.call(mode, factory.post('/'))
+                self.assertEqual(seen, [False])
+                self.assertIn(PIN_COOKIE, response.cookies)
+                self.assertFalse(_use_replica.get())
+
+
+class AsyncGatherTests(SimpleTestCase):
+    """并发查询在专用的有界线程池中执行, 并继承请求的上下文 (读写分离标记)"""
+
+    def test_bounded_executor(self):
+        def query():
+            return threading.current_thread().name, _use_replica.get()
+
+        async def view():
+            token = _use_replica.set(True)
+            try:
+                return await async_db.gather(**{f'q{i}': query for i in range(10)})
+            finally:
+                _use_replica.reset(token)
+
+        with mock.patch.object(async_db, '_executor', None), self.settings(ASYNC_DB_WORKERS=2):
+            results = async_to_sync(view)()
+            self.assertEqual(async_db._executor._max_workers, 2)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(name.startswith('async-db') and replica for name, replica in results.values()))
+
+
+class RuleMatchingTests(TestCase):
+    """告警规则: 自动机多模式匹配、英文整词边界、合并正则, 以及用户/类型过滤"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(rules._compiled, {'version': None, 'ruleset': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = MonitoredUser.objects.create(username='u', user_id='1')
+        self.other = MonitoredUser.objects.create(username='o', user_id='2')
+
+    def rule(self, name, keywords='', regex='', users=(), tweet_types=''):
+        rule = AlertRule.objects.create(name=name, keywords=keywords, regex=regex, tweet_types=tweet_types)
+        rule.users.set(users)
+        return rule
+
+    def match(self, text, user=None, tweet_type='tweet'):
+        return rules.ruleset().match(text, (user or self.user).id, tweet_type)
+
+    def test_automaton_overlapping_patterns(self):
+        automaton = rules.Automaton({'he': 1, 'she': 2, 'his': 3, 'hers': 4})
+        self.assertEqual(
+            sorted(automaton.iter('ushers')),
+            [(3, 'he', 1), (3, 'she', 2), (5, 'hers', 4)],
+        )
+
+    def test_keywords_whole_word(self):
+        cat = self.rule('cat', keywords='Cat\nbig dog')
+        coin = self.rule('coin', keywords='比特币')
+        self.assertEqual(self.match('CAT!'), {cat.id: 'cat'})
+        self.assertEqual(self.match('concatenate cats'), {})
+        self.assertEqual(self.match('a big dog, a bigger dog'), {cat.id: 'big dog'})
+        # 中文关键词不要求词边界
+        self.assertEqual(self.match('我买了比特币了'), {coin.id: '比特币'})
+        self.assertEqual(self.match('cat比特币'), {cat.id: 'cat', coin.id: '比特币'})
+
+    def test_regex_rules_share_positions(self):
+        version = self.rule('version', regex=r'v\d+\.\d+')
+        prefix = self.rule('prefix', regex=r'v\d')
+        invalid = self.rule('invalid', regex='(')
+        with self.assertLogs('twitter_monitor.rules', 'WARNING'):
+            compiled = rules.ruleset()
+        self.assertTrue(compiled.combinable)
+        self.assertEqual(compiled.match('Released V2.10', self.user.id, 'tweet'), {version.id: 'V2.10', prefix.id: 'V2'})
+        self.assertNotIn(invalid.id, compiled.match('(', self.user.id, 'tweet'))
+
+    def test_duplicate_group_names_fall_back(self):
+        first = self.rule('first', regex=r'(?P<n>\d+) cats')
+        second = self.rule('second', regex=r'(?P<n>\d+) dogs')
+        with self.assertLogs('twitter_monitor.rules', 'WARNING'):
+            compiled = rules.ruleset()
+        self.assertFalse(compiled.combinable)
+        self.assertEqual(compiled.match('3 cats and 4 dogs', self.user.id, 'tweet'), {first.id: '3 cats', second.id: '4 dogs'})
+
+    def test_user_and_type_filters(self):
+        scoped = self.rule('scoped', keywords='launch', users=[self.user], tweet_types='tweet, reply')
+        anything = self.rule('anything', users=[self.other])
+        self.assertEqual(self.match('Launch day'), {scoped.id: 'launch'})
+        self.assertEqual(self.match('Launch day', tweet_type='retweet'), {})
+        self.assertEqual(self.match('Launch day', user=self.other), {anything.id: ''})
+
+    def test_apply_records_matches(self):
+        rule = self.rule('rule', keywords='launch')
+        tweet = Tweet.objects.create(author=self.user, tweet_id='100', text='launch', created_at=timezone.now())
+        Reply.objects.create(tweet=tweet, reply_id='200', text='no launch yet', created_at=timezone.now())
+        Reply.objects.create(tweet=tweet, reply_id='201', text='relaunched', created_at=timezone.now())
+        events = [live.tweet_event(tweet), live.reply_event('200', tweet), live.reply_event('201', tweet)]
+        self.assertEqual(rules.apply(events), 2)
+        # 重复处理同一批事件不会重复记录
+        rules.apply(events)
+        self.assertEqual(
+            set(RuleMatch.objects.filter(rule=rule).values_list('tweet__tweet_id', 'reply__reply_id')),
+            {('100', None), (None, '200')},
+        )
+
+
+class EngagementHeatmapTests(TestCase):
+    """互动分析按指定时区分桶, 夏令时切换前后的小时和日期都按当地时间计算"""
+
+    tz = ZoneInfo('America/New_York')
+
+    def setUp(self):
+        self.user = MonitoredUser.objects.create(username='u', user_id='42')
+
+    def engagement(self, start, end, *created_at):
+        for i, value in enumerate(created_at):
+            Tweet.objects.create(author=self.user, tweet_id=str(100 + i), text='t', created_at=value, like_count=i)
+        return analytics.engagement(self.user, *analytics.window(self.tz, start=start, end=end), self.tz)
+
+    def cells(self, heatmap):
+        return {(weekday, hour): count for weekday, row in enumerate(heatmap) for hour, count in enumerate(row) if count}
+
+    def test_spring_forward(self):
+        # 2024-03-10 (星期日) 当地 02:00 跳到 03:00
+        result = self.engagement(
+            date(2024, 3, 9), date(2024, 3, 11),
+            datetime(2024, 3, 10, 6, 30, tzinfo=dt_timezone.utc),  # 01:30 EST
+            datetime(2024, 3, 10, 7, 30, tzinfo=dt_timezone.utc),  # 03:30 EDT
+            datetime(2024, 3, 11, 3, 59, 59, 600000, tzinfo=dt_timezone.utc),  # 星期日 23:59:59.6 EDT
+            datetime(2024, 3, 11, 4, 0, tzinfo=dt_timezone.utc),  # 星期一 00:00 EDT
+        )
+        self.assertEqual(self.cells(result['heatmap']), {(6, 1): 1, (6, 3): 1, (6, 23): 1, (0, 0): 1})
+        self.assertEqual(
+            [(day['date'], day['tweets']) for day in result['daily']],
+            [('2024-03-09', 0), ('2024-03-10', 3), ('2024-03-11', 1)],
+        )
+
+    def test_fall_back(self):
+        # 2024-11-03 (星期日) 当地 01:00-02:00 出现两次
+        result = self.engagement(
+            date(2024, 11, 3), date(2024, 11, 3),
+            datetime(2024, 11, 3, 4, 0, tzinfo=dt_timezone.utc),  # 00:00 EDT, 窗口开始
+            datetime(2024, 11, 3, 5, 30, tzinfo=dt_timezone.utc),  # 01:30 EDT
+            datetime(2024, 11, 3, 6, 30, tzinfo=dt_timezone.utc),  # 01:30 EST
+            datetime(2024, 11, 4, 4, 59, tzinfo=dt_timezone.utc),  # 23:59 EST
+            datetime(2024, 11, 4, 5, 0, tzinfo=dt_timezone.utc),  # 星期一, 窗口之外
+        )
+        self.assertEqual(result['tweets'], 4)
+        self.assertEqual(self.cells(result['heatmap']), {(6, 0): 1, (6, 1): 2, (6, 23): 1})
+        self.assertEqual([(day['date'], day['tweets']) for day in result['daily']], [('2024-11-03', 4)])
+        self.assertEqual(result['totals']['likes_median'], 1.5)
+
+
+def trending_tweet(pk, created_at, likes):
+    # record 只读取主键、发布时间和统计字段
+    return SimpleNamespace(
+        id=pk, created_at=datetime.fromtimestamp(created_at, dt_timezone.utc),
+        like_count=likes, retweet_count=0, reply_count=0, quote_count=0,
+    )
+
+
+@override_settings(REDIS_URL='', TRENDING_HALF_LIFE_HOURS=6, TRENDING_MAX_AGE_HOURS=48, TRENDING_MAX_SIZE=100)
+class TrendingTests(SimpleTestCase):
+    """热门排行: 按衰减后的速度排序, 速度按两次记录之间的增量计算"""
+
+    start = 1717200000
+
+    def setUp(self):
+        cache.delete(trending.TRENDING_KEY)
+        cache.delete_many([f'{trending.SNAPSHOT_PREFIX}{pk}' for pk in range(1, 4)])
+
+    def at(self, hours):
+        return self.start + hours * 3600
+
+    def test_decay_ordering(self):
+        # A 发布 1 小时后有 100 个互动 (100/小时), 6 小时 (一个半衰期) 后 B 达到 60/小时
+        trending.record([trending_tweet(1, self.at(-1), 100)], now=self.at(0))
+        self.assertEqual(trending.top(now=self.at(0)), [(1, 100.0)])
+        trending.record([trending_tweet(2, self.at(5), 60)], now=self.at(6))
+        self.assertEqual(trending.top(now=self.at(6)), [(2, 60.0), (1, 50.0)])
+        # 排序不随读取时间变化
+        self.assertEqual(trending.top(now=self.at(30)), [(2, 3.75), (1, 3.12)])
+
+        # 第二次记录按增量计算: 7 小时增加 300 个互动
+        trending.record([trending_tweet(1, self.at(-1), 400)], now=self.at(7))
+        self.assertEqual(trending.top(now=self.at(7)), [(2, 53.45), (1, 42.86)])
+        # 没有新增互动的推文移出排行
+        trending.record([trending_tweet(2, self.at(5), 60)], now=self.at(8))
+        self.assertEqual([pk for pk, _ in trending.top(now=self.at(8))], [1])
+
+    def test_prune_and_max_age(self):
+        trending.record([trending_tweet(1, self.at(-1), 1)], now=self.at(0))
+        # 1/小时 约 20 小时后衰减到 0.1 以下, 下次写入时移除
+        trending.record([trending_tweet(2, self.at(23), 10)], now=self.at(24))
+        self.assertEqual(trending.top(now=self.at(24)), [(2, 10.0)])
+        # 发布超过 48 小时的推文不参与排行
+        self.assertEqual(trending.record([trending_tweet(3, self.at(-25), 1000)], now=self.at(24)), 0)
+        self.assertEqual(trending.velocity(10, self.at(0), None, self.at(0) + 60), 40.0)
+
+
+class DuplicateClusterTests(TestCase):
+    """近似重复: 规范化后相同的文本归入同一簇, 后续批次中连接两个簇的推文会合并它们"""
+
+    def setUp(self):
+        self.user = MonitoredUser.objects.create(username='u', user_id='42')
+
+    def tweets(self, *texts, tweet_type='tweet'):
+        start = Tweet.objects.count()
+        return [
+            Tweet.objects.create(
+                author=self.user, tweet_id=str(100 + start + i), text=text, tweet_type=tweet_type, created_at=timezone.now(),
+            )
+            for i, text in enumerate(texts)
+        ]
+
+    def cluster_of(self, tweets):
+        return [TweetFingerprint.objects.get(tweet=tweet).cluster for tweet in tweets]
+
+    def test_normalized_text(self):
+        press = 'Breaking: the quarterly report is out now, read it here'
+        first, second, short = self.tweets(
+            f'{press} https://t.co/aaa', f'@someone {press.upper()}!! https://t.co/bbb', 'too short',
+        )
+        retweet, = self.tweets(press, tweet_type='retweet')
+        self.assertEqual(duplicates.index([first, second, short, retweet]), 1)
+        self.assertEqual(self.cluster_of([first, second]), [first.id, first.id])
+        self.assertFalse(TweetFingerprint.objects.filter(tweet__in=[short, retweet]).exists())
+        # 已有指纹的推文不会重复计算
+        self.assertEqual(duplicates.index([first, second]), 0)
+
+    def test_clusters_merge_across_batches(self):
+        values = {
+            'a1': 0,
+            'a2': 0b1,
+            # 与 A 簇的距离都大于 3
+            'b1': 0b111111,
+            'b2': 0b1111111,
+            # 与 b1 的距离为 3, 但 4 个分段都与 c 不同, 合并时不会作为候选取出
+            'd': 0b111111 | 1 << 16 | 1 << 32 | 1 << 48,
+            # 与 a1、a2、b1 的距离都不超过 3
+            'c': 0b111,
+        }
+        a1, a2, b1, b2, d, c = self.tweets(*values)
+        with mock.patch.object(duplicates, 'simhash', side_effect=lambda text: values[text]):
+            self.assertEqual(duplicates.index([a2, a1]), 1)
+            self.assertEqual(duplicates.index([b1, b2, d]), 2)
+            self.assertEqual(self.cluster_of([a1, a2, b1, b2, d]), [a1.id, a1.id, b1.id, b1.id, b1.id])
+
+            self.assertEqual(duplicates.index([c]), 1)
+        self.assertEqual(set(self.cluster_of([a1, a2, b1, b2, d, c])), {a1.id})
+
+        clusters = duplicates.clusters(author=self.user)
+        self.assertEqual([(row['cluster'], row['size'], row['tweet']) for row in clusters], [(a1.id, 6, a1)])
@@ -0,0 +1,59 @@
+"""
+回复线程的物化路径
+
+每条回复的 path 由从根推文下第一级回复到自身的各级推文 ID 组成, 每段左侧补零
+到固定宽度并以 / 分隔。推文 ID 随时间递增, 因此按 path 排序就是按时间排列的
+先序遍历, 整个会话可以通过 (tweet, path) 索引一次范围扫描取出。
+
+层级最多 MAX_DEPTH 层, 路径不超过 Reply.path 的长度 (也在 PostgreSQL B-tree 索引项的大小限制内);
+更深的回复挂在第 MAX_DEPTH - 1 层的祖先下, 与该祖先的其它深层后代同级, 按时间排列。
+"""
+
+SEGMENT_WIDTH = 20
+SEPARATOR = '/'
+# 64 层的路径为 64 * 21 - 1 = 1343 个字符
+MAX_DEPTH = 64
+
+
+def segment(tweet_id):
+    """路径中的一段"""
+    return str(tweet_id).zfill(SEGMENT_WIDTH)
+
+
+def depth_of(path):
+    """路径对应的层级 (直接回复根推文为 1)"""
+    return path.count(SEPARATOR) + 1
+
+
+def build_paths(replies, known_paths=None):
+    """
+    计算一批回复的物化路径
+
+    父回复不在本批次也不在 known_paths 中时 (已删除或未抓取),
+    该回复挂在根推文下; 父回复已在第 MAX_DEPTH 层时, 层级截断为 MAX_DEPTH。
+
+    Args:
+        replies: 回复字典列表, 包含 reply_id 和 in_reply_to_tweet_id
+        known_paths: 已入库回复的 {reply_id: path}
+
+    Returns:
+        dict: reply_id -> (path, depth)
+    """
+    paths = dict(known_paths or {})
+    result = {}
+
+    # 父回复总是早于子回复发布, 按 ID 升序处理即可保证父路径已计算
+    for reply in sorted(replies, key=lambda r: int(r['reply_id'])):
+        reply_id = str(reply['reply_id'])
+        parent_path = paths.get(str(reply.get('in_reply_to_tweet_id') or ''))
+        if parent_path:
+            if depth_of(parent_path) >= MAX_DEPTH:
+                # 保留前 MAX_DEPTH - 1 段
+                parent_path = parent_path[:(MAX_DEPTH - 1) * (SEGMENT_WIDTH + len(SEPARATOR)) - len(SEPARATOR)]
+            path = parent_path + SEPARATOR + segment(reply_id)
+        else:
+            path = segment(reply_id)
+        paths[reply_id] = path
+        result[reply_id] = (path, depth_of(path))
+
+    return result
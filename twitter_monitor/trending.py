@@ -0,0 +1,183 @@
+"""
+热门推文排行 (互动增长速度)
+
+每次写入推文的统计数据时增量更新排行, 读取时不需要对推文表排序:
+- 速度: 距上次记录的互动数增量 / 小时; 第一次记录时按发布以来的平均速度计算
+- 时间衰减: 速度按 TRENDING_HALF_LIFE_HOURS 半衰期指数衰减
+
+衰减通过分数的对数形式实现: score = ln(速度) + (记录时间 - DECAY_EPOCH) / tau,
+任意时刻按 score 排序都等价于按衰减后的速度排序, 已有条目不需要随时间重新计算。
+Redis 有序集合上每次更新 O(log n), 读取前 k 条 O(log n + k)。
+
+未配置 REDIS_URL 时退回 Django 缓存 (仅限单进程开发环境)。
+"""
+
+import heapq
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TRENDING_KEY = 'twitter:trending'
+SNAPSHOT_PREFIX = 'twitter:trending:last:'
+# 衰减的参考时间 (2024-01-01 UTC), 只影响分数的绝对值, 不影响排序
+DECAY_EPOCH = 1704067200
+# 两次记录间隔过短时按此间隔计算, 避免速度被放大 (小时)
+MIN_ELAPSED_HOURS = 0.25
+# 衰减后低于此速度 (互动数 / 小时) 的条目从排行中移除
+MIN_VELOCITY = 0.1
+
+_client = None
+
+
+def _redis():
+    """排行使用的 Redis 客户端, 未配置 REDIS_URL 时返回 None"""
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _tau():
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+
+def _score(velocity, now):
+    return math.log(velocity) + (now - DECAY_EPOCH) / _tau()
+
+
+def _decayed(score, now):
+    """分数换算为 now 时刻衰减后的速度"""
+    return math.exp(score - (now - DECAY_EPOCH) / _tau())
+
+
+def engagement(tweet):
+    """推文的总互动数"""
+    return tweet.like_count + tweet.retweet_count + tweet.reply_count + tweet.quote_count
+
+
+def velocity(total, created_at, previous, now):
+    """
+    互动增长速度
+
+    Args:
+        total: 当前总互动数
+        created_at: 发布时间 (Unix 秒数)
+        previous: 上次记录 (总互动数, Unix 秒数), 没有时为 None
+        now: 当前时间 (Unix 秒数)
+
+    Returns:
+        float: 互动数 / 小时
+    """
+    if previous is None:
+        return total / max((now - created_at) / 3600, MIN_ELAPSED_HOURS)
+    previous_total, previous_at = previous
+    return max(total - previous_total, 0) / max((now - previous_at) / 3600, MIN_ELAPSED_HOURS)
+
+
+def is_recent(created_at, now=None):
+    """发布时间在 TRENDING_MAX_AGE_HOURS 以内的推文才参与排行"""
+    return (now or time.time()) - created_at.timestamp() <= settings.TRENDING_MAX_AGE_HOURS * 3600
+
+
+def _parse_snapshot(value):
+    if not value:
+        return None
+    total, observed_at = value.split(':')
+    return int(total), float(observed_at)
+
+
+def record(tweets, now=None):
+    """
+    记录推文的最新统计数据并更新排行
+
+    超过 TRENDING_MAX_AGE_HOURS 的推文不参与排行。
+
+    Args:
+        tweets: Tweet 对象 (需要 id、created_at 和各项统计字段)
+        now: 当前时间 (Unix 秒数), 默认为当前时间
+
+    Returns:
+        int: 更新的推文数
+    """
+    now = now or time.time()
+    items = {
+        tweet.id: (engagement(tweet), tweet.created_at.timestamp())
+        for tweet in tweets
+        if is_recent(tweet.created_at, now)
+    }
+    if not items:
+        return 0
+
+    client = _redis()
+    keys = [f'{SNAPSHOT_PREFIX}{pk}' for pk in items]
+    if client:
+        previous = client.mget(keys)
+    else:
+        cached = cache.get_many(keys)
+        previous = [cached.get(key) for key in keys]
+
+    scores, removed, snapshots = {}, [], {}
+    for (pk, (total, created_at)), value in zip(items.items(), previous):
+        speed = velocity(total, created_at, _parse_snapshot(value), now)
+        if speed > 0:
+            scores[pk] = _score(speed, now)
+        else:
+            removed.append(pk)
+        snapshots[f'{SNAPSHOT_PREFIX}{pk}'] = f'{total}:{now}'
+
+    # 衰减后低于 MIN_VELOCITY 的条目的分数上限
+    floor = _score(MIN_VELOCITY, now)
+    max_age = settings.TRENDING_MAX_AGE_HOURS * 3600
+    if client:
+        pipe = client.pipeline(transaction=False)
+        if scores:
+            pipe.zadd(TRENDING_KEY, scores)
+        if removed:
+            pipe.zrem(TRENDING_KEY, *removed)
+        pipe.zremrangebyscore(TRENDING_KEY, '-inf', f'({floor}')
+        pipe.zremrangebyrank(TRENDING_KEY, 0, -settings.TRENDING_MAX_SIZE - 1)
+        pipe.mset(snapshots)
+        for key in snapshots:
+            pipe.expire(key, max_age)
+        pipe.execute()
+    else:
+        ranking = cache.get(TRENDING_KEY) or {}
+        ranking.update(scores)
+        for pk in removed:
+            ranking.pop(pk, None)
+        ranking = dict(heapq.nlargest(
+            settings.TRENDING_MAX_SIZE,
+            ((pk, score) for pk, score in ranking.items() if score >= floor),
+            key=lambda item: item[1],
+        ))
+        cache.set(TRENDING_KEY, ranking, timeout=None)
+        cache.set_many(snapshots, timeout=max_age)
+    return len(items)
+
+
+def top(limit=20, now=None):
+    """
+    当前增长最快的推文
+
+    Args:
+        limit: 返回数量
+        now: 当前时间 (Unix 秒数), 默认为当前时间
+
+    Returns:
+        list: [(推文主键, 衰减后的速度), ...], 按速度降序
+    """
+    now = now or time.time()
+    client = _redis()
+    if client:
+        entries = client.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+    else:
+        entries = heapq.nlargest(limit, (cache.get(TRENDING_KEY) or {}).items(), key=lambda item: item[1])
+    return [(int(pk), round(_decayed(score, now), 2)) for pk, score in entries]
@@ -14,6 +14,7 @@ router.register(r'monitored-users', views.MonitoredUserViewSet, basename='monito
 router.register(r'tweets', views.TweetViewSet, basename='tweet')
 router.register(r'replies', views.ReplyViewSet, basename='reply')
 router.register(r'logs', views.MonitorLogViewSet, basename='monitorlog')
+router.register(r'analytics/users', views.AnalyticsViewSet, basename='analytics-user')
 
 urlpatterns = [
     # Web 可视化界面
@@ -25,6 +26,8 @@ urlpatterns = [
     path('api-docs/', web_views.api_docs, name='api_docs'),
     path('logs/', web_views.logs, name='logs'),  # 新增：日志页面
     path('test-api/', web_views.test_api, name='test_api'),  # 新增：API 测试
+    path('media-cache/<str:name>', web_views.media_cache_file, name='media_cache'),
+    path('live/', web_views.live_feed, name='live_feed'),
     
     # REST API
     path('api/', include(router.urls)),
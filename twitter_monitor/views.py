@@ -2,10 +2,15 @@
 REST API 视图
 """
 
+import logging
+import re
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
@@ -14,8 +19,85 @@ from .serializers import (
     MonitoredUserSerializer, TweetSerializer,
     ReplySerializer, MonitorLogSerializer
 )
-from .services import TwitterMonitorService
-from .tasks import monitor_single_user_task
+from . import locks
+from .filters import TweetFilter, ReplyFilter, MonitorLogFilter
+
+logger = logging.getLogger(__name__)
+
+# 归档范围查询的游标参数: <created_at 的 UTC 微秒数>.<id>
+ARCHIVE_CURSOR_PARAM = 'cursor'
+CURSOR_PATTERN = re.compile(r'^(-?\d+)\.(\d+)$')
+
+
+class ArchiveListMixin:
+    """
+    查询的时间范围早于热数据时, 列表接口合并冷存储中的归档数据
+
+    只在指定了 created_after / created_before 且范围早于最晚的归档时间时读取归档;
+    归档数据只支持 archive_params 中的精确匹配条件和 search, 以及按 created_at 排序,
+    使用其它过滤条件或排序时只查询数据库。
+
+    读取归档时按 (created_at, id) 游标分页: 返回 {'next', 'results'}, 翻页使用 next 中的 cursor 参数,
+    不返回总数 (需要读取全部归档才能得到)。
+    """
+    archive_kind = None
+    archive_params = []
+    
+    def list(self, request, *args, **kwargs):
+        from . import archive
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        # filter_queryset 已校验过查询参数, 这里只取清洗后的值
+        filterset = DjangoFilterBackend().get_filterset(request, self.get_queryset(), self)
+        filterset.is_valid()
+        data = filterset.form.cleaned_data
+        start, end = data.get('created_after'), data.get('created_before')
+        ordering = filters.OrderingFilter().get_ordering(request, queryset, self)[0]
+        unsupported = [
+            name for name, value in data.items()
+            if value not in (None, '') and name not in self.archive_params + ['created_after', 'created_before']
+        ]
+        if ordering.lstrip('-') != 'created_at':
+            unsupported.append('ordering')
+        latest = archive.horizon(self.archive_kind) if (start or end) and not unsupported else None
+        if latest is None or (start and start > latest):
+            return super().list(request, *args, **kwargs)
+        
+        after = None
+        cursor = request.query_params.get(ARCHIVE_CURSOR_PARAM)
+        if cursor:
+            match = CURSOR_PATTERN.match(cursor)
+            if not match:
+                return Response({'error': '无效的游标'}, status=status.HTTP_400_BAD_REQUEST)
+            after = (int(match[1]), int(match[2]))
+        
+        conditions = {name: data[name] for name in self.archive_params if data.get(name) not in (None, '')}
+        search = request.query_params.get('search', '') if filters.SearchFilter in self.filter_backends else ''
+        try:
+            rows, position = archive.page_rows(
+                self.archive_kind,
+                queryset,
+                lambda objects: self.get_serializer(objects, many=True).data,
+                self.paginator.get_page_size(request) if self.paginator else api_settings.PAGE_SIZE,
+                descending=ordering.startswith('-'),
+                after=after,
+                start=start,
+                end=end,
+                filters=conditions,
+                text=search,
+            )
+        except archive.ArchiveUnavailable as e:
+            # 不返回缺少部分归档数据的结果
+            return Response({'error': f'归档数据暂时不可用: {e}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        next_url = None
+        if position:
+            next_url = replace_query_param(
+                remove_query_param(request.build_absolute_uri(), 'page'),
+                ARCHIVE_CURSOR_PARAM,
+                f'{position[0]}.{position[1]}',
+            )
+        return Response({'next': next_url, 'results': rows})
 
 
 class MonitoredUserViewSet(viewsets.ModelViewSet):
@@ -35,6 +117,10 @@ class MonitoredUserViewSet(viewsets.ModelViewSet):
         POST /api/monitored-users/add_user/
         Body: {"username": "twitter_username"}
         """
+        # 服务和任务模块依赖 tweepy 等较重的包, 只在需要时导入, 缩短 Web 进程启动时间
+        from .services import TwitterMonitorService
+        from .tasks import queue_initial_backfill
+        
         username = request.data.get('username', '').strip().lstrip('@')
         
         if not username:
@@ -60,6 +146,12 @@ class MonitoredUserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        # 后台回填历史推文
+        try:
+            queue_initial_backfill(user.id)
+        except Exception as e:
+            logger.warning(f'回填任务排队失败，请检查 Redis 服务: {str(e)}')
+        
         serializer = self.get_serializer(user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
@@ -69,8 +161,20 @@ class MonitoredUserViewSet(viewsets.ModelViewSet):
         立即监控指定用户
         POST /api/monitored-users/{id}/monitor_now/
         """
+        from .tasks import monitor_single_user_task
+        
         user = self.get_object()
         
+        # 该用户正在监控中时合并到进行中的任务, 不重复抓取
+        running = locks.owner(locks.user_lock_name(user.id))
+        if running:
+            return Response({
+                'message': '该用户的监控任务正在执行',
+                'task_id': running,
+                'username': user.username,
+                'coalesced': True,
+            })
+        
         # 异步执行监控任务
         task = monitor_single_user_task.delay(user.id)
         
@@ -96,15 +200,17 @@ class MonitoredUserViewSet(viewsets.ModelViewSet):
         })
 
 
-class TweetViewSet(viewsets.ReadOnlyModelViewSet):
+class TweetViewSet(ArchiveListMixin, viewsets.ReadOnlyModelViewSet):
     """推文 API (只读)"""
-    queryset = Tweet.objects.select_related('author').all()
+    queryset = Tweet.objects.select_related('author', 'original').prefetch_related('media').all()
     serializer_class = TweetSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['author', 'tweet_type', 'has_media']
+    filterset_class = TweetFilter
     search_fields = ['text', 'tweet_id']
     ordering_fields = ['created_at', 'like_count', 'retweet_count']
     ordering = ['-created_at']
+    archive_kind = 'tweet'
+    archive_params = ['author', 'tweet_type', 'has_media']
     
     @action(detail=True, methods=['get'])
     def replies(self, request, pk=None):
@@ -113,27 +219,200 @@ class TweetViewSet(viewsets.ReadOnlyModelViewSet):
         GET /api/tweets/{id}/replies/
         """
         tweet = self.get_object()
-        replies = tweet.replies.select_related('author').all()
+        replies = tweet.replies.select_related('account').all()
         serializer = ReplySerializer(replies, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def thread(self, request, pk=None):
+        """
+        获取推文的完整回复线程 (按树的先序排列, depth 为层级)
+        GET /api/tweets/{id}/thread/
+        """
+        tweet = self.get_object()
+        # (tweet, path) 索引上的一次范围扫描
+        replies = tweet.replies.select_related('account', 'tweet').order_by('path')
+        return Response({
+            'tweet': self.get_serializer(tweet).data,
+            'replies': ReplySerializer(replies, many=True).data,
+        })
+    
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, pk=None):
+        """
+        与该推文近似重复的其它推文 (同一个重复簇)
+        GET /api/tweets/{id}/duplicates/
+        """
+        from .models import TweetFingerprint
+        
+        tweet = self.get_object()
+        cluster = TweetFingerprint.objects.filter(tweet=tweet).values_list('cluster', flat=True).first()
+        if cluster is None:
+            return Response({'cluster': None, 'results': []})
+        tweets = self.get_queryset().filter(fingerprint__cluster=cluster).exclude(pk=tweet.pk).order_by('created_at')
+        return Response({
+            'cluster': cluster,
+            'results': self.get_serializer(tweets, many=True).data,
+        })
+    
+    @action(detail=False, methods=['get'], url_path='duplicate-clusters')
+    def duplicate_clusters(self, request):
+        """
+        近似重复簇列表, 按最近一条推文倒序
+        GET /api/tweets/duplicate-clusters/?author=1&limit=20
+        """
+        from . import duplicates
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            author = request.query_params.get('author')
+            author = int(author) if author else None
+        except ValueError:
+            return Response({'error': 'author 和 limit 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = []
+        for cluster in duplicates.clusters(author=author, limit=limit):
+            tweet = cluster.pop('tweet')
+            results.append({**cluster, 'tweet': self.get_serializer(tweet).data if tweet else None})
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        当前互动增长最快的推文 (所有监控用户, 速度为按时间衰减后的互动数 / 小时)
+        GET /api/tweets/trending/?limit=20
+        """
+        from . import trending
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({'error': 'limit 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit 必须大于 0'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ranking = trending.top(limit)
+        tweets = self.get_queryset().in_bulk([pk for pk, _ in ranking])
+        results = []
+        for pk, velocity in ranking:
+            # 排行中的推文可能已被清理
+            if pk in tweets:
+                results.append({**self.get_serializer(tweets[pk]).data, 'velocity': velocity})
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'], url_path='top-entities')
+    def top_entities(self, request):
+        """
+        最近若干天出现最多的话题标签/提及/股票代码/链接 (读取每日汇总)
+        GET /api/tweets/top-entities/?kind=hashtag&days=7&limit=20
+        """
+        from . import entities
+        
+        kind = request.query_params.get('kind', 'hashtag')
+        if kind not in entities.KINDS:
+            return Response(
+                {'error': f"kind 必须是 {', '.join(entities.KINDS)} 之一"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            days = int(request.query_params.get('days', 7))
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({'error': 'days 和 limit 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        if days < 1 or limit < 1:
+            return Response({'error': 'days 和 limit 必须大于 0'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'kind': kind,
+            'days': days,
+            'results': entities.top(kind, days=days, limit=limit),
+        })
 
 
-class ReplyViewSet(viewsets.ReadOnlyModelViewSet):
+class ReplyViewSet(ArchiveListMixin, viewsets.ReadOnlyModelViewSet):
     """回复 API (只读)"""
-    queryset = Reply.objects.select_related('author', 'tweet').all()
+    queryset = Reply.objects.select_related('account', 'tweet').all()
     serializer_class = ReplySerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['author', 'tweet']
+    filterset_class = ReplyFilter
     search_fields = ['text', 'reply_id']
     ordering_fields = ['created_at', 'like_count']
     ordering = ['-created_at']
+    archive_kind = 'reply'
+    archive_params = ['author', 'account', 'tweet']
 
 
-class MonitorLogViewSet(viewsets.ReadOnlyModelViewSet):
+class MonitorLogViewSet(ArchiveListMixin, viewsets.ReadOnlyModelViewSet):
     """监控日志 API (只读)"""
     queryset = MonitorLog.objects.select_related('user').all()
     serializer_class = MonitorLogSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['user', 'status']
-    ordering_fields = ['created_at']
+    filterset_class = MonitorLogFilter
+    ordering_fields = ['created_at', 'duration_ms']
     ordering = ['-created_at']
+    archive_kind = 'log'
+    archive_params = ['user', 'status']
+    
+    @action(detail=False, methods=['get'])
+    def timing(self, request):
+        """
+        按用户统计各阶段耗时的 p95
+        GET /api/logs/timing/?days=7
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+        from .metrics import monitor_p95_by_user
+        
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'error': 'days 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        since = timezone.now() - timedelta(days=days)
+        logs = self.filter_queryset(self.get_queryset()).filter(created_at__gte=since)
+        return Response({'days': days, 'users': monitor_p95_by_user(logs)})
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """分析 API (只读)"""
+    
+    @action(detail=True, methods=['get'])
+    def engagement(self, request, pk=None):
+        """
+        用户的互动分析: 发布时间热力图、点赞/转发的滚动中位数和 p90、互动率、推文类型构成
+        GET /api/analytics/users/{id}/engagement/?days=30&rolling=7&tz=Asia/Shanghai
+        GET /api/analytics/users/{id}/engagement/?start=2024-01-01&end=2024-03-31
+        """
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+        from django.conf import settings
+        from django.shortcuts import get_object_or_404
+        from django.utils.dateparse import parse_date
+        from . import analytics
+        
+        user = get_object_or_404(MonitoredUser, pk=pk)
+        params = request.query_params
+        try:
+            tz = ZoneInfo(params.get('tz') or settings.TIME_ZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'error': f"未知的时区: {params.get('tz')}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(params.get('days', 30))
+            rolling = int(params.get('rolling', 7))
+            start = parse_date(params['start']) if params.get('start') else None
+            end = parse_date(params['end']) if params.get('end') else None
+            if (params.get('start') and start is None) or (params.get('end') and end is None):
+                raise ValueError
+            if not 1 <= days <= 3660:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'days (1-3660) 和 rolling 必须是整数, start 和 end 格式为 YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        start, end = analytics.window(tz, days=days, start=start, end=end)
+        if not 0 < (end - start).days <= 3660 or not 1 <= rolling <= 365:
+            return Response({'error': '时间窗口或滚动天数超出范围'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(analytics.engagement(user, start, end, tz, rolling=rolling))
+
@@ -2,63 +2,66 @@
 Web 可视化界面视图
 """
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, aget_object_or_404
 from django.contrib import messages
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
-from celery.schedules import crontab
+from asgiref.sync import sync_to_async
 
+from . import async_db, duplicates
 from .models import MonitoredUser, Tweet, Reply, MonitorLog
-from .services import TwitterMonitorService
-from .tasks import monitor_all_users_task
 from .schedule_manager import update_monitoring_schedule, stop_monitoring_schedule, get_current_schedule
 
 
-def dashboard(request):
+async def dashboard(request):
     """
     主控制台
+    
+    各项统计互不依赖, 并发查询
     """
-    # 统计数据
-    total_users = MonitoredUser.objects.count()
-    active_users = MonitoredUser.objects.filter(is_active=True).count()
+    from django.conf import settings
+    from . import clients, quota
     
     # 最近30天的数据
     thirty_days_ago = timezone.now() - timedelta(days=30)
-    total_tweets = Tweet.objects.filter(created_at__gte=thirty_days_ago).count()
-    total_replies = Reply.objects.filter(created_at__gte=thirty_days_ago).count()
     
-    # 监控日志
-    monitor_logs_count = MonitorLog.objects.count()
-    last_log = MonitorLog.objects.order_by('-created_at').first()
-    last_monitor_time = last_log.created_at.strftime('%m-%d %H:%M') if last_log else '暂无记录'
+    results = await async_db.gather(
+        total_users=lambda: MonitoredUser.objects.count(),
+        active_users=lambda: MonitoredUser.objects.filter(is_active=True).count(),
+        total_tweets=lambda: Tweet.objects.filter(created_at__gte=thirty_days_ago).count(),
+        total_replies=lambda: Reply.objects.filter(created_at__gte=thirty_days_ago).count(),
+        # 监控日志
+        monitor_logs=lambda: MonitorLog.objects.count(),
+        last_log=lambda: MonitorLog.objects.order_by('-created_at').first(),
+        # 用户列表
+        users=lambda: list(MonitoredUser.objects.all().order_by('-created_at')[:10]),
+        # API 月度额度
+        budget=quota.budget_status,
+    )
     
-    # 用户列表
-    users = MonitoredUser.objects.all().order_by('-created_at')[:10]
+    last_log = results['last_log']
+    last_monitor_time = last_log.created_at.strftime('%m-%d %H:%M') if last_log else '暂无记录'
     
-    # 检查 API 可用性
-    api_available = True
-    try:
-        from .services import TwitterService
-        service = TwitterService()
-        # 简单检查，不实际调用 API
-        api_available = bool(service.client)
-    except:
-        api_available = False
+    # API 可用性 (读取最近一次请求记录的状态, 不创建客户端)
+    api_available = clients.health()['available']
     
     context = {
         'stats': {
-            'total_users': total_users,
-            'active_users': active_users,
-            'total_tweets': total_tweets,
-            'total_replies': total_replies,
-            'monitor_logs': monitor_logs_count,
+            'total_users': results['total_users'],
+            'active_users': results['active_users'],
+            'total_tweets': results['total_tweets'],
+            'total_replies': results['total_replies'],
+            'monitor_logs': results['monitor_logs'],
             'last_monitor_time': last_monitor_time,
         },
-        'users': users,
+        'users': results['users'],
         'api_available': api_available,
+        'budget': results['budget'],
+        'live_enabled': bool(settings.REDIS_URL),
     }
     
-    return render(request, 'twitter_monitor/dashboard.html', context)
+    return await sync_to_async(render)(request, 'twitter_monitor/dashboard.html', context)
 
 
 def add_user(request):
@@ -66,6 +69,10 @@ def add_user(request):
     添加监控用户
     """
     if request.method == 'POST':
+        # 服务和任务模块依赖 tweepy 等较重的包, 只在需要时导入
+        from .services import TwitterMonitorService
+        from .tasks import queue_initial_backfill
+        
         username = request.POST.get('username', '').strip().lstrip('@')
         
         if not username:
@@ -83,6 +90,14 @@ def add_user(request):
             user = service.add_monitored_user(username)
             
             if user:
+                # 后台回填历史推文
+                try:
+                    queue_initial_backfill(user.id)
+                except Exception as celery_error:
+                    import logging
+                    logger = logging.getLogger(__name__)
+                    logger.warning(f'回填任务排队失败，请检查 Redis 服务: {str(celery_error)}')
+                
                 messages.success(request, f'成功添加监控用户 @{username}')
                 return redirect('twitter_monitor:dashboard')
             else:
@@ -123,6 +138,8 @@ def start_monitoring(request):
     if request.method != 'POST':
         return redirect('twitter_monitor:monitor_config')
     
+    from .tasks import monitor_all_users_task
+    
     action = request.POST.get('action')
     
     if action == 'start':
@@ -202,35 +219,52 @@ def start_monitoring(request):
     return redirect('twitter_monitor:monitor_config')
 
 
-def user_detail(request, user_id):
+async def user_detail(request, user_id):
     """
     用户详情页面
     """
-    user = get_object_or_404(MonitoredUser, id=user_id)
-    
-    # 用户的推文
-    tweets = user.tweets.all().order_by('-created_at')[:20]
+    user = await aget_object_or_404(MonitoredUser, id=user_id)
     
-    # 用户的回复
-    replies = user.replies.all().order_by('-created_at')[:20]
-    
-    # 监控日志
-    logs = user.logs.all().order_by('-created_at')[:10]
-    
-    # 统计
-    total_tweets = user.tweets.count()
-    total_replies = user.replies.count()
+    results = await async_db.gather(
+        # 用户的推文
+        tweets=lambda: list(
+            user.tweets.select_related('original').prefetch_related('media').order_by('-created_at')[:20]
+        ),
+        # 用户的回复
+        replies=lambda: list(user.replies.all().order_by('-created_at')[:20]),
+        # 监控日志
+        logs=lambda: list(user.logs.all().order_by('-created_at')[:10]),
+        # 统计
+        total_tweets=lambda: user.tweets.count(),
+        total_replies=lambda: user.replies.count(),
+        # 包含该用户推文的近似重复簇
+        duplicate_clusters=lambda: duplicates.clusters(author=user, limit=10),
+    )
     
     context = {
         'user': user,
-        'tweets': tweets,
-        'replies': replies,
-        'logs': logs,
-        'total_tweets': total_tweets,
-        'total_replies': total_replies,
+        **results,
     }
     
-    return render(request, 'twitter_monitor/user_detail.html', context)
+    return await sync_to_async(render)(request, 'twitter_monitor/user_detail.html', context)
+
+
+def media_cache_file(request, name):
+    """
+    从媒体缓存存储中返回文件 (未配置 MEDIA_CACHE_PUBLIC_URL 时使用)
+    
+    文件名是内容哈希, 内容不会变化, 可以长期缓存
+    """
+    from django.http import FileResponse, Http404
+    from . import media_cache
+    
+    f = media_cache.open_file(name)
+    if f is None:
+        raise Http404('缓存文件不存在')
+    
+    response = FileResponse(f)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 def api_docs(request):
@@ -240,32 +274,41 @@ def api_docs(request):
     return render(request, 'twitter_monitor/api_docs.html')
 
 
-def logs(request):
+async def logs(request):
     """
     监控日志页面
     """
-    # 获取最近 100 条日志
-    logs = MonitorLog.objects.all().order_by('-created_at')[:100]
+    from .metrics import monitor_p95_by_user
     
-    # 统计数据
-    total_logs = MonitorLog.objects.count()
-    success_logs = MonitorLog.objects.filter(status='success').count()
-    failed_logs = MonitorLog.objects.filter(status='failed').count()
-    total_tweets = sum(MonitorLog.objects.values_list('tweets_fetched', flat=True))
-    total_replies = sum(MonitorLog.objects.values_list('replies_fetched', flat=True))
+    seven_days_ago = timezone.now() - timedelta(days=7)
+    
+    results = await async_db.gather(
+        # 最近 100 条日志
+        logs=lambda: list(MonitorLog.objects.select_related('user').order_by('-created_at')[:100]),
+        # 统计数据
+        total=lambda: MonitorLog.objects.count(),
+        success=lambda: MonitorLog.objects.filter(status='success').count(),
+        failed=lambda: MonitorLog.objects.filter(status='failed').count(),
+        totals=lambda: MonitorLog.objects.aggregate(
+            total_tweets=Sum('tweets_fetched'), total_replies=Sum('replies_fetched')
+        ),
+        # 最近 7 天每个用户的耗时 p95, 用于找出拖慢监控周期的账号和阶段
+        timing=lambda: monitor_p95_by_user(MonitorLog.objects.filter(created_at__gte=seven_days_ago)),
+    )
     
     context = {
-        'logs': logs,
+        'logs': results['logs'],
+        'timing': results['timing'],
         'stats': {
-            'total': total_logs,
-            'success': success_logs,
-            'failed': failed_logs,
-            'total_tweets': total_tweets,
-            'total_replies': total_replies,
+            'total': results['total'],
+            'success': results['success'],
+            'failed': results['failed'],
+            'total_tweets': results['totals']['total_tweets'] or 0,
+            'total_replies': results['totals']['total_replies'] or 0,
         }
     }
     
-    return render(request, 'twitter_monitor/logs.html', context)
+    return await sync_to_async(render)(request, 'twitter_monitor/logs.html', context)
 
 
 from django.http import JsonResponse
@@ -385,3 +428,55 @@ def test_api(request):
             'traceback': traceback.format_exc(),
             'hint': '请检查 Railway 日志获取详细错误信息'
         })
+
+
+def metrics_endpoint(request):
+    """
+    Prometheus 指标
+
+    设置 METRICS_TOKEN 后需要携带 Authorization: Bearer <token>
+    """
+    from django.conf import settings
+    from django.http import HttpResponse
+    from . import metrics
+    
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    
+    content, content_type = metrics.render()
+    return HttpResponse(content, content_type=content_type)
+
+
+async def live_feed(request):
+    """
+    新推文/回复的实时推送 (Server-Sent Events)
+    
+    查询参数:
+        author: 只推送这些监控用户的事件, 多个用逗号分隔
+        type: tweet / reply, 多个用逗号分隔
+        last_event_id: 从该事件之后补发 (EventSource 重连时改用 Last-Event-ID 请求头)
+    """
+    import re
+    from django.conf import settings
+    from django.http import JsonResponse, StreamingHttpResponse
+    from . import live
+    
+    if not settings.REDIS_URL:
+        return JsonResponse({'error': '实时推送需要配置 REDIS_URL'}, status=503)
+    
+    def _split(name):
+        return {value for value in request.GET.get(name, '').split(',') if value}
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id and not re.fullmatch(r'\d+-\d+', last_event_id):
+        last_event_id = None
+    
+    response = StreamingHttpResponse(
+        live.stream(last_event_id, authors=_split('author'), types=_split('type') & set(live.EVENT_TYPES)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 等反向代理的响应缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response